@@ -9,8 +9,8 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
 
+from app.adapters import models  # noqa: F401
 from app.adapters.database import Base
-from app.adapters.models import EntryModel, MedicationModel, SymptomModel, UserModel
 from app.config import settings
 
 # this is the Alembic Config object, which provides
@@ -33,8 +33,9 @@ target_metadata = Base.metadata
 
 
 def get_url() -> str:
-    """Получить URL БД из настроек."""
-    return settings.postgres_dsn
+    """Получить URL БД шарда из `-x shard=N` (по умолчанию шард 0)."""
+    shard = int(context.get_x_argument(as_dictionary=True).get("shard", "0"))
+    return settings.shard_dsn_list[shard]
 
 
 def run_migrations_offline() -> None:
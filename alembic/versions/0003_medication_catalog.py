@@ -0,0 +1,86 @@
+"""Справочник препаратов вместо свободного текста в medications.name."""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_medication_catalog"
+down_revision: Union[str, None] = "0002_add_pain_score_description"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _clean(column: str) -> str:
+    return f"regexp_replace(trim({column}), '\\s+', ' ', 'g')"
+
+
+def _normalized(column: str) -> str:
+    # Приближение app.domain.validators.normalize_medication_name: \s не
+    # покрывает NBSP и другие пробелы Unicode, их доводит 0014_medication_names
+    return f"lower({_clean(column)})"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "medication_catalog",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("normalized_name", sa.String(length=200), nullable=False),
+    )
+    op.create_index(
+        "ix_medication_catalog_normalized_name",
+        "medication_catalog",
+        ["normalized_name"],
+        unique=True,
+    )
+
+    # Дедупликация: одна строка справочника на нормализованное имя,
+    # в качестве названия берется самое раннее написание.
+    op.execute(
+        f"""
+        INSERT INTO medication_catalog (name, normalized_name)
+        SELECT DISTINCT ON ({_normalized("name")}) {_clean("name")}, {_normalized("name")}
+        FROM medications
+        ORDER BY {_normalized("name")}, id
+        """
+    )
+
+    op.add_column("medications", sa.Column("catalog_id", sa.Integer(), nullable=True))
+    op.execute(
+        f"""
+        UPDATE medications
+        SET catalog_id = medication_catalog.id
+        FROM medication_catalog
+        WHERE medication_catalog.normalized_name = {_normalized("medications.name")}
+        """
+    )
+    op.alter_column("medications", "catalog_id", nullable=False)
+    op.create_foreign_key(
+        "fk_medications_catalog_id",
+        "medications",
+        "medication_catalog",
+        ["catalog_id"],
+        ["id"],
+    )
+    op.create_index("ix_medications_catalog_id", "medications", ["catalog_id"])
+    op.drop_column("medications", "name")
+
+
+def downgrade() -> None:
+    op.add_column("medications", sa.Column("name", sa.String(length=200), nullable=True))
+    op.execute(
+        """
+        UPDATE medications
+        SET name = medication_catalog.name
+        FROM medication_catalog
+        WHERE medication_catalog.id = medications.catalog_id
+        """
+    )
+    op.alter_column("medications", "name", nullable=False)
+    op.drop_index("ix_medications_catalog_id", table_name="medications")
+    op.drop_constraint("fk_medications_catalog_id", "medications", type_="foreignkey")
+    op.drop_column("medications", "catalog_id")
+    op.drop_index("ix_medication_catalog_normalized_name", table_name="medication_catalog")
+    op.drop_table("medication_catalog")
@@ -0,0 +1,41 @@
+"""Полнотекстовый поиск по заметкам и описанию боли."""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_entries_search"
+down_revision: Union[str, None] = "0003_medication_catalog"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('russian', coalesce(pain_description, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(notes, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "entries",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_SQL, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_entries_search_vector",
+        "entries",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_entries_search_vector", table_name="entries")
+    op.drop_column("entries", "search_vector")
@@ -0,0 +1,47 @@
+"""Покрывающий индекс entries (user_id, entry_date DESC) вместо трех отдельных."""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_entries_covering_index"
+down_revision: Union[str, None] = "0004_entries_search"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Индексы строятся и удаляются без блокировки записи, вне транзакции миграции.
+    # Текстовые колонки не включаются: строка btree-индекса ограничена ~2.7 КБ.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_entries_user_date_covering",
+            "entries",
+            ["user_id", sa.text("entry_date DESC")],
+            unique=True,
+            postgresql_include=["id", "pain_level", "pain_score", "had_attack"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_entries_user_date", table_name="entries", postgresql_concurrently=True)
+        op.drop_index("ix_entries_user_id", table_name="entries", postgresql_concurrently=True)
+        op.drop_index("ix_entries_entry_date", table_name="entries", postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_entries_entry_date", "entries", ["entry_date"], postgresql_concurrently=True
+        )
+        op.create_index("ix_entries_user_id", "entries", ["user_id"], postgresql_concurrently=True)
+        op.create_index(
+            "ix_entries_user_date",
+            "entries",
+            ["user_id", "entry_date"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_entries_user_date_covering", table_name="entries", postgresql_concurrently=True
+        )
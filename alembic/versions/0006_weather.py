@@ -0,0 +1,26 @@
+"""Местоположение пользователя и погода в записях."""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_weather"
+down_revision: Union[str, None] = "0005_entries_covering_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("users", sa.Column("longitude", sa.Float(), nullable=True))
+    op.add_column("entries", sa.Column("pressure_hpa", sa.Float(), nullable=True))
+    op.add_column("entries", sa.Column("temperature_c", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("entries", "temperature_c")
+    op.drop_column("entries", "pressure_hpa")
+    op.drop_column("users", "longitude")
+    op.drop_column("users", "latitude")
@@ -0,0 +1,20 @@
+"""Адрес почты пользователя для выгрузок и отчетов."""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_user_email"
+down_revision: Union[str, None] = "0006_weather"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("email", sa.String(length=254), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "email")
@@ -0,0 +1,31 @@
+"""Задания на удаление данных пользователей."""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_purge_jobs"
+down_revision: Union[str, None] = "0007_user_email"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "purge_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("stage", sa.String(length=20), nullable=False),
+        sa.Column("deleted_rows", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint("user_id", name="uq_purge_jobs_user_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("purge_jobs")
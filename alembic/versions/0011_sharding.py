@@ -0,0 +1,71 @@
+"""Справочник шардов и чередующиеся последовательности id."""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision: str = "0011_sharding"
+down_revision: Union[str, None] = "0010_entry_events"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Максимум шардов: шард k выдает id вида n * 64 + k, поэтому id строк,
+# перенесенных между шардами, не пересекаются с id на новом месте. Строки,
+# созданные до шардирования, имеют произвольные id до floor — максимального
+# id шарда 0, и последовательности всех шардов начинаются выше него
+SHARD_ID_STEP = 64
+SHARDED_TABLES = ("users", "entries", "medications", "symptoms", "subscriptions", "entry_events")
+
+
+def _shard() -> int:
+    """Номер шарда из `alembic -x shard=N` (см. app.tools.migrate_shards)."""
+    return int(context.get_x_argument(as_dictionary=True).get("shard", "0"))
+
+
+def _floor(shard: int) -> int:
+    """Нижняя граница id из `alembic -x floor=N`; обязательна для шардов кроме 0."""
+    floor = context.get_x_argument(as_dictionary=True).get("floor")
+    if floor is None:
+        if shard != 0:
+            raise RuntimeError("Shards other than 0 are migrated by app.tools.migrate_shards")
+        return 0
+    return int(floor)
+
+
+def upgrade() -> None:
+    shard = _shard()
+    floor = _floor(shard)
+    op.create_table(
+        "shard_directory",
+        sa.Column("telegram_id", sa.BigInteger(), primary_key=True, autoincrement=False),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column("moving", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    if shard == 0:
+        # До шардирования все пользователи жили в единственной БД
+        op.execute(
+            "INSERT INTO shard_directory (telegram_id, shard) SELECT telegram_id, 0 FROM users"
+        )
+
+    bind = op.get_bind()
+    for table in SHARDED_TABLES:
+        sequence = bind.scalar(sa.text(f"SELECT pg_get_serial_sequence('{table}', 'id')"))
+        op.execute(f"ALTER SEQUENCE {sequence} INCREMENT BY {SHARD_ID_STEP}")
+        op.execute(
+            f"SELECT setval('{sequence}', "
+            f"(greatest(coalesce(max(id), 0), {floor}) / {SHARD_ID_STEP} + 1) "
+            f"* {SHARD_ID_STEP} + {shard}, false) "
+            f"FROM {table}"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in SHARDED_TABLES:
+        sequence = bind.scalar(sa.text(f"SELECT pg_get_serial_sequence('{table}', 'id')"))
+        op.execute(f"ALTER SEQUENCE {sequence} INCREMENT BY 1")
+    op.drop_table("shard_directory")
@@ -0,0 +1,48 @@
+"""Арендаторы: несколько ботов в одной БД."""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0012_tenants"
+down_revision: Union[str, None] = "0011_sharding"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_TENANT = "default"
+
+
+def _tenant_column() -> sa.Column:
+    return sa.Column(
+        "tenant_id", sa.String(length=32), nullable=False, server_default=DEFAULT_TENANT
+    )
+
+
+def upgrade() -> None:
+    # Существующие пользователи принадлежат единственному боту
+    op.add_column("users", _tenant_column())
+    op.drop_index("ix_users_telegram_id", table_name="users")
+    op.create_index(
+        "ix_users_tenant_id_telegram_id", "users", ["tenant_id", "telegram_id"], unique=True
+    )
+
+    op.add_column("purge_jobs", _tenant_column())
+
+    op.add_column("shard_directory", _tenant_column())
+    op.drop_constraint("shard_directory_pkey", "shard_directory", type_="primary")
+    op.create_primary_key("shard_directory_pkey", "shard_directory", ["tenant_id", "telegram_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("shard_directory_pkey", "shard_directory", type_="primary")
+    op.drop_column("shard_directory", "tenant_id")
+    op.create_primary_key("shard_directory_pkey", "shard_directory", ["telegram_id"])
+
+    op.drop_column("purge_jobs", "tenant_id")
+
+    op.drop_index("ix_users_tenant_id_telegram_id", table_name="users")
+    op.drop_column("users", "tenant_id")
+    op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
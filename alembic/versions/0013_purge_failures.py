@@ -0,0 +1,25 @@
+"""Ошибки заданий на удаление данных."""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0013_purge_failures"
+down_revision: Union[str, None] = "0012_tenants"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "purge_jobs",
+        sa.Column("failures", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("purge_jobs", sa.Column("last_error", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("purge_jobs", "last_error")
+    op.drop_column("purge_jobs", "failures")
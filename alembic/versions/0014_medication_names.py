@@ -0,0 +1,77 @@
+"""Нормализация справочника препаратов по правилу приложения.
+
+0003_medication_catalog нормализовала имена в SQL (trim и \\s), а
+приложение — через str.split(), который считает пробелами и NBSP, и
+прочие пробелы Unicode. Строки, разошедшиеся с правилом приложения,
+приводятся к нему, а совпавшие после этого дубликаты сливаются в
+строку с меньшим id.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0014_medication_names"
+down_revision: Union[str, None] = "0013_purge_failures"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _clean(name: str) -> str:
+    return " ".join(name.split())
+
+
+def _normalized(name: str) -> str:
+    # Должно совпадать с app.domain.validators.normalize_medication_name
+    return _clean(name).lower()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, name, normalized_name FROM medication_catalog"))
+
+    canonical: dict[str, int] = {}
+    merged: dict[int, int] = {}
+    renamed: list[dict[str, object]] = []
+    for catalog_id, name, normalized_name in sorted(rows):
+        key = _normalized(name)
+        if key in canonical:
+            merged[catalog_id] = canonical[key]
+            continue
+        canonical[key] = catalog_id
+        if key != normalized_name or _clean(name) != name:
+            renamed.append({"id": catalog_id, "name": _clean(name), "normalized_name": key})
+
+    for duplicate, target in merged.items():
+        bind.execute(
+            sa.text("UPDATE medications SET catalog_id = :target WHERE catalog_id = :duplicate"),
+            {"target": target, "duplicate": duplicate},
+        )
+    if merged:
+        bind.execute(
+            sa.text("DELETE FROM medication_catalog WHERE id = ANY(:ids)"),
+            {"ids": list(merged)},
+        )
+    if renamed:
+        # Сначала временные значения, чтобы обмен именами не нарушил уникальный индекс
+        bind.execute(
+            sa.text(
+                "UPDATE medication_catalog SET normalized_name = '#' || id WHERE id = ANY(:ids)"
+            ),
+            {"ids": [row["id"] for row in renamed]},
+        )
+        bind.execute(
+            sa.text(
+                "UPDATE medication_catalog SET name = :name, normalized_name = :normalized_name "
+                "WHERE id = :id"
+            ),
+            renamed,
+        )
+
+
+def downgrade() -> None:
+    # Слитые строки справочника не восстанавливаются
+    pass
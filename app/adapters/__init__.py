@@ -1,26 +1,65 @@
 """Адаптеры для внешних сервисов (БД, Redis, почта, погода)."""
 
-from app.adapters.database import async_session_maker, engine, get_session
-from app.adapters.models import EntryModel, MedicationModel, SymptomModel, UserModel
+from app.adapters.database import (
+    async_session_maker,
+    current_shard,
+    engine,
+    get_session,
+    shard_ids,
+    use_shard,
+)
+from app.adapters.models import (
+    EntryEventModel,
+    EntryModel,
+    MedicationCatalogModel,
+    MedicationModel,
+    PurgeJobModel,
+    ShardDirectoryModel,
+    SubscriptionModel,
+    SymptomModel,
+    UserModel,
+)
 from app.adapters.redis_client import redis_client
 from app.adapters.repository import (
+    EntryEventRepository,
     EntryRepository,
+    MedicationCatalogRepository,
     MedicationRepository,
+    PurgeJobRepository,
+    ShardDirectoryRepository,
+    SubscriptionRepository,
     SymptomRepository,
     UserRepository,
 )
+from app.adapters.tenant import current_tenant, tenant_key, use_tenant
 
 __all__ = [
     "engine",
     "async_session_maker",
     "get_session",
+    "current_shard",
+    "shard_ids",
+    "use_shard",
+    "current_tenant",
+    "use_tenant",
+    "tenant_key",
     "UserModel",
     "EntryModel",
+    "MedicationCatalogModel",
     "MedicationModel",
     "SymptomModel",
+    "PurgeJobModel",
+    "SubscriptionModel",
+    "EntryEventModel",
+    "ShardDirectoryModel",
     "UserRepository",
     "EntryRepository",
+    "MedicationCatalogRepository",
     "MedicationRepository",
     "SymptomRepository",
+    "PurgeJobRepository",
+    "SubscriptionRepository",
+    "EntryEventRepository",
+    "ShardDirectoryRepository",
     "redis_client",
 ]
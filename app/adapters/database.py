@@ -1,10 +1,22 @@
 """Настройка подключения к БД."""
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
 
+# Шард со справочником шардов и общим справочником препаратов
+DIRECTORY_SHARD = 0
+
 
 class Base(DeclarativeBase):
     """Базовый класс для моделей SQLAlchemy."""
@@ -12,27 +24,63 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(
-    settings.postgres_dsn,
-    echo=False,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-)
+def _create_engine(dsn: str) -> AsyncEngine:
+    return create_async_engine(
+        dsn,
+        echo=False,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+    )
 
-async_session_maker = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
 
+# Движок и пул на каждый шард; без SHARD_DSNS шард один — POSTGRES_DSN
+engines = [_create_engine(dsn) for dsn in settings.shard_dsn_list]
+
+session_makers = [
+    async_sessionmaker(
+        shard_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+    for shard_engine in engines
+]
+
+engine = engines[DIRECTORY_SHARD]
+async_session_maker = session_makers[DIRECTORY_SHARD]
+
+# Шард текущего пользователя; выставляется UserMiddleware и фоновыми задачами
+current_shard: ContextVar[int] = ContextVar("current_shard", default=DIRECTORY_SHARD)
 
-async def get_session() -> AsyncSession:
-    """Получить сессию БД."""
-    async with async_session_maker() as session:
+
+def shard_ids() -> range:
+    """Номера всех шардов."""
+    return range(len(engines))
+
+
+@contextmanager
+def use_shard(shard: int) -> Iterator[None]:
+    """Выполнить блок на указанном шарде."""
+    token = current_shard.set(shard)
+    try:
+        yield
+    finally:
+        current_shard.reset(token)
+
+
+async def get_session(shard: int | None = None) -> AsyncSession:
+    """Получить сессию БД текущего (или указанного) шарда."""
+    maker = session_makers[current_shard.get() if shard is None else shard]
+    async with maker() as session:
         try:
             yield session
         finally:
             await session.close()
+
+
+async def dispose_engines() -> None:
+    """Закрыть пулы соединений всех шардов."""
+    for shard_engine in engines:
+        await shard_engine.dispose()
@@ -0,0 +1,309 @@
+"""Адаптер почты: пакетная отправка писем через постоянные SMTP-соединения."""
+
+import asyncio
+import logging
+import random
+import smtplib
+from collections.abc import Awaitable, Callable
+from email.message import EmailMessage
+
+from pydantic import BaseModel, Field
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MailAttachment(BaseModel):
+    """Вложение письма."""
+
+    filename: str
+    content: bytes
+    mime_type: str = "application/octet-stream"
+
+
+class OutgoingMail(BaseModel):
+    """Письмо в очереди отправки."""
+
+    to: str
+    subject: str
+    body: str
+    attachments: list[MailAttachment] = Field(default_factory=list)
+    attempt: int = 0
+    # Метка для обработчиков результата (см. MailSender.add_callback)
+    tag: str | None = None
+
+
+# Обработчик итога письма: (письмо, стоит ли отправить его позже)
+MailCallback = Callable[[OutgoingMail, bool], Awaitable[None]]
+
+
+class SmtpConnection:
+    """Постоянное SMTP-соединение одного воркера.
+
+    smtplib блокирующий, поэтому методы вызываются из потока через
+    asyncio.to_thread. Соединение открывается лениво и переоткрывается,
+    если сервер закрыл его за время простоя.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+        starttls: bool = False,
+        timeout: float = 30.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+
+    def _open(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        return smtp
+
+    def send(self, message: EmailMessage) -> None:
+        """Отправить письмо, при необходимости переподключившись один раз."""
+        if self._smtp is None:
+            self._smtp = self._open()
+        try:
+            self._smtp.send_message(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.close()
+            self._smtp = self._open()
+            self._smtp.send_message(message)
+
+    def close(self) -> None:
+        """Закрыть соединение."""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Ошибку 5xx или отказ в адресе повторять бессмысленно."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class MailSender:
+    """Очередь писем с пакетной отправкой и повторами.
+
+    Хендлеры только ставят письмо в очередь и сразу отвечают. Воркеры (по
+    одному на SMTP-соединение) забирают письма пачками до batch_size и
+    отправляют их подряд по уже открытому соединению. Временные ошибки
+    повторяются с экспоненциальной задержкой, постоянные — логируются.
+    Итог каждого письма передается обработчикам из add_callback: отправлено
+    или отклонено навсегда — повторять не нужно; попытки кончились, очередь
+    переполнена или не успела отправиться до остановки — стоит повторить.
+    """
+
+    def __init__(
+        self,
+        sender: str,
+        host: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+        starttls: bool = False,
+        timeout: float = 30.0,
+        connections: int = 2,
+        batch_size: int = 50,
+        queue_size: int = 10000,
+        max_attempts: int = 5,
+        retry_base_delay: float = 5.0,
+    ) -> None:
+        self.sender = sender
+        self.connection_options = {
+            "host": host,
+            "port": port,
+            "username": username,
+            "password": password,
+            "starttls": starttls,
+            "timeout": timeout,
+        }
+        self.connections = connections
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self._queue: asyncio.Queue[OutgoingMail] | None = None
+        self._workers: list[asyncio.Task[None]] = []
+        self._retries: dict[asyncio.TimerHandle, OutgoingMail] = {}
+        self._callbacks: list[MailCallback] = []
+        self._notifications: set[asyncio.Task[None]] = set()
+
+    @property
+    def queue(self) -> asyncio.Queue[OutgoingMail]:
+        if self._queue is None:
+            raise RuntimeError("Mail sender is not started")
+        return self._queue
+
+    def add_callback(self, callback: MailCallback) -> None:
+        """Подписаться на итоги отправки писем."""
+        self._callbacks.append(callback)
+
+    def _notify(self, mail: OutgoingMail, retry: bool) -> None:
+        if not self._callbacks:
+            return
+        task = asyncio.create_task(self._run_callbacks(mail, retry))
+        self._notifications.add(task)
+        task.add_done_callback(self._notifications.discard)
+
+    async def _run_callbacks(self, mail: OutgoingMail, retry: bool) -> None:
+        for callback in self._callbacks:
+            await callback(mail, retry)
+
+    async def start(self) -> None:
+        """Запустить воркеров отправки."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(
+                self._worker(SmtpConnection(**self.connection_options)), name=f"mail-worker-{i}"
+            )
+            for i in range(self.connections)
+        ]
+
+    async def stop(self, drain_seconds: float = 10.0) -> None:
+        """Дождаться отправки очереди и остановить воркеров."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_seconds)
+        except TimeoutError:
+            logger.warning("Mail sender stopped with %d mails unsent", self._queue.qsize())
+        while not self._queue.empty():
+            self._notify(self._queue.get_nowait(), retry=True)
+        for handle, mail in self._retries.items():
+            handle.cancel()
+            self._notify(mail, retry=True)
+        self._retries.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        await asyncio.gather(*self._notifications, return_exceptions=True)
+
+    def enqueue(self, mail: OutgoingMail) -> bool:
+        """Поставить письмо в очередь без ожидания; False, если очередь полна."""
+        try:
+            self.queue.put_nowait(mail)
+        except asyncio.QueueFull:
+            logger.warning("Mail queue is full, dropping mail to %s", mail.to)
+            self._notify(mail, retry=True)
+            return False
+        return True
+
+    async def put(self, mail: OutgoingMail) -> None:
+        """Поставить письмо в очередь, дождавшись места (для фоновых рассылок)."""
+        await self.queue.put(mail)
+
+    def _build(self, mail: OutgoingMail) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = mail.to
+        message["Subject"] = mail.subject
+        message.set_content(mail.body)
+        for attachment in mail.attachments:
+            maintype, _, subtype = attachment.mime_type.partition("/")
+            message.add_attachment(
+                attachment.content,
+                maintype=maintype,
+                subtype=subtype or "octet-stream",
+                filename=attachment.filename,
+            )
+        return message
+
+    def _send_batch(
+        self, connection: SmtpConnection, batch: list[OutgoingMail]
+    ) -> list[Exception | None]:
+        errors: list[Exception | None] = []
+        for mail in batch:
+            try:
+                connection.send(self._build(mail))
+                errors.append(None)
+            except (smtplib.SMTPException, OSError) as error:
+                if not isinstance(error, smtplib.SMTPResponseException):
+                    # Состояние соединения неизвестно — следующее письмо откроет новое
+                    connection.close()
+                errors.append(error)
+        return errors
+
+    async def _worker(self, connection: SmtpConnection) -> None:
+        queue = self.queue
+        try:
+            while True:
+                batch = [await queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+                try:
+                    errors = await asyncio.to_thread(self._send_batch, connection, batch)
+                    for mail, error in zip(batch, errors, strict=True):
+                        if error is None:
+                            self._notify(mail, retry=False)
+                        else:
+                            self._retry(mail, error)
+                    logger.info(
+                        "Mail batch sent: %d ok, %d failed",
+                        errors.count(None),
+                        len(errors) - errors.count(None),
+                    )
+                finally:
+                    for _ in batch:
+                        queue.task_done()
+        finally:
+            await asyncio.to_thread(connection.close)
+
+    def _retry(self, mail: OutgoingMail, error: Exception) -> None:
+        attempt = mail.attempt + 1
+        permanent = _is_permanent(error)
+        if permanent or attempt >= self.max_attempts:
+            logger.error("Mail to %s failed after %d attempts: %r", mail.to, attempt, error)
+            self._notify(mail, retry=not permanent)
+            return
+        delay = self.retry_base_delay * 2**mail.attempt * (0.5 + random.random())
+        logger.warning("Mail to %s failed (%r), retry in %.0f s", mail.to, error, delay)
+        retry = mail.model_copy(update={"attempt": attempt})
+
+        def requeue() -> None:
+            self._retries.pop(handle, None)
+            if self._queue is not None:
+                self.enqueue(retry)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retries[handle] = retry
+
+
+# Глобальный экземпляр
+mail_sender = MailSender(
+    sender=settings.mail_from,
+    host=settings.smtp_host,
+    port=settings.smtp_port,
+    username=settings.smtp_username,
+    password=settings.smtp_password,
+    starttls=settings.smtp_starttls,
+    timeout=settings.smtp_timeout,
+    connections=settings.mail_connections,
+    batch_size=settings.mail_batch_size,
+    queue_size=settings.mail_queue_size,
+    max_attempts=settings.mail_max_attempts,
+    retry_base_delay=settings.mail_retry_base_delay,
+)
@@ -6,29 +6,57 @@ from sqlalchemy import (
     BigInteger,
     Boolean,
     CheckConstraint,
+    Computed,
     Date,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Integer,
+    SmallInteger,
     String,
     Text,
+    UniqueConstraint,
+    func,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.ext.associationproxy import AssociationProxy, association_proxy
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.adapters.database import Base
+from app.domain.models import DEFAULT_TENANT
+
+# Поисковый вектор: описание боли важнее заметок при ранжировании
+ENTRY_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('russian', coalesce(pain_description, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(notes, '')), 'B')"
+)
 
 
 class UserModel(Base):
     """Модель пользователя."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Один человек в двух ботах — два разных пользователя
+        Index("ix_users_tenant_id_telegram_id", "tenant_id", "telegram_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False, index=True)
+    tenant_id: Mapped[str] = mapped_column(
+        String(32), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT
+    )
+    telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     username: Mapped[str | None] = mapped_column(String(255), nullable=True)
     first_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
     last_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
     notification_time: Mapped[str | None] = mapped_column(String(5), nullable=True)  # HH:MM
+    # Центр ячейки сетки погоды, а не точные координаты
+    latitude: Mapped[float | None] = mapped_column(Float, nullable=True)
+    longitude: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Адрес для выгрузок и ежемесячных отчетов (например, врача)
+    email: Mapped[str | None] = mapped_column(String(254), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
@@ -46,18 +74,29 @@ class EntryModel(Base):
             "pain_score >= 1 AND pain_score <= 10",
             name="ck_entries_pain_score_range",
         ),
+        Index(
+            "ix_entries_user_date_covering",
+            "user_id",
+            text("entry_date DESC"),
+            unique=True,
+            postgresql_include=["id", "pain_level", "pain_score", "had_attack"],
+        ),
+        Index("ix_entries_search_vector", "search_vector", postgresql_using="gin"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("users.id"), nullable=False, index=True
-    )
-    entry_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    entry_date: Mapped[date] = mapped_column(Date, nullable=False)
     pain_level: Mapped[str | None] = mapped_column(String(20), nullable=True)
     pain_score: Mapped[int | None] = mapped_column(Integer, nullable=True)
     pain_description: Mapped[str | None] = mapped_column(Text, nullable=True)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
     had_attack: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    pressure_hpa: Mapped[float | None] = mapped_column(Float, nullable=True)
+    temperature_c: Mapped[float | None] = mapped_column(Float, nullable=True)
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR, Computed(ENTRY_SEARCH_VECTOR_SQL, persisted=True), deferred=True
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
@@ -72,6 +111,18 @@ class EntryModel(Base):
     )
 
 
+class MedicationCatalogModel(Base):
+    """Справочник названий препаратов."""
+
+    __tablename__ = "medication_catalog"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    normalized_name: Mapped[str] = mapped_column(
+        String(200), unique=True, nullable=False, index=True
+    )
+
+
 class MedicationModel(Base):
     """Модель препарата."""
 
@@ -81,12 +132,18 @@ class MedicationModel(Base):
     entry_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("entries.id"), nullable=False, index=True
     )
-    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    catalog_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("medication_catalog.id"), nullable=False, index=True
+    )
     medication_type: Mapped[str] = mapped_column(String(20), nullable=False)
     dosage: Mapped[str | None] = mapped_column(String(100), nullable=True)
     taken_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     entry: Mapped["EntryModel"] = relationship("EntryModel", back_populates="medications")
+    drug: Mapped["MedicationCatalogModel"] = relationship(
+        "MedicationCatalogModel", lazy="joined", innerjoin=True
+    )
+    name: AssociationProxy[str] = association_proxy("drug", "name")
 
 
 class SymptomModel(Base):
@@ -102,3 +159,105 @@ class SymptomModel(Base):
     severity: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     entry: Mapped["EntryModel"] = relationship("EntryModel", back_populates="symptoms")
+
+
+class PurgeJobModel(Base):
+    """Задание на удаление данных пользователя.
+
+    Хранит этап и прогресс, поэтому удаление продолжается после перезапуска.
+    Ссылки на users нет: строка пользователя удаляется последней.
+    """
+
+    __tablename__ = "purge_jobs"
+    __table_args__ = (UniqueConstraint("user_id", name="uq_purge_jobs_user_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    tenant_id: Mapped[str] = mapped_column(
+        String(32), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT
+    )
+    telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    stage: Mapped[str] = mapped_column(String(20), nullable=False, default="medications")
+    deleted_rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failures: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+
+class SubscriptionModel(Base):
+    """Оплаченный период Migrebot+."""
+
+    __tablename__ = "subscriptions"
+    __table_args__ = (
+        Index(
+            "ix_subscriptions_active_expires_at",
+            "expires_at",
+            postgresql_where=text("status = 'active'"),
+        ),
+        UniqueConstraint("telegram_charge_id", name="uq_subscriptions_telegram_charge_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    plan: Mapped[str] = mapped_column(String(20), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="active")
+    starts_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    telegram_charge_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    stars_amount: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class EntryEventModel(Base):
+    """Журнал изменений записей, препаратов и симптомов (только добавление).
+
+    Строки пишет фоновый сбросчик пачками через COPY; stream_id — id
+    сообщения в Redis Stream, по нему повторная доставка не создает дублей.
+    """
+
+    __tablename__ = "entry_events"
+    __table_args__ = (
+        UniqueConstraint("stream_id", name="uq_entry_events_stream_id"),
+        Index("ix_entry_events_user_id_id", "user_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    stream_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    action: Mapped[str] = mapped_column(String(20), nullable=False)
+    changes: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    previous: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    recorded_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+
+
+class ShardDirectoryModel(Base):
+    """Справочник шардов: в какой БД лежат данные пользователя.
+
+    Используется только на шарде 0. moving — пользователь переносится
+    между шардами, его апдейты временно не обрабатываются.
+    """
+
+    __tablename__ = "shard_directory"
+
+    tenant_id: Mapped[str] = mapped_column(
+        String(32), primary_key=True, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT
+    )
+    telegram_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    shard: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    moving: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
@@ -1,29 +1,115 @@
 """Redis клиент для кэша и сессий."""
 
 import json
-from typing import Optional
+from collections.abc import AsyncIterator, Iterable, Mapping
+from contextlib import asynccontextmanager
+from typing import Any, Optional, Protocol
 
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline, PubSub
+from redis.commands.core import AsyncScript
+from redis.exceptions import ResponseError
 
 from app.config import settings
 
 
+class Serializer(Protocol):
+    """Кодек значений, хранимых в Redis."""
+
+    def dumps(self, value: Any) -> bytes: ...
+
+    def loads(self, data: bytes) -> Any: ...
+
+
+class JsonSerializer:
+    """Сериализация через stdlib json."""
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    """Сериализация через orjson (опциональная зависимость)."""
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgpackSerializer:
+    """Бинарная сериализация через msgpack (опциональная зависимость)."""
+
+    def __init__(self) -> None:
+        import msgpack
+
+        self._msgpack = msgpack
+
+    def dumps(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS: dict[str, type[Serializer]] = {
+    "json": JsonSerializer,
+    "orjson": OrjsonSerializer,
+    "msgpack": MsgpackSerializer,
+}
+
+
+def get_serializer(name: str) -> Serializer:
+    """Создать сериализатор по имени из настроек."""
+    try:
+        serializer_cls = SERIALIZERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown redis serializer {name!r}, expected one of: {', '.join(SERIALIZERS)}"
+        ) from None
+    return serializer_cls()
+
+
 class RedisClient:
     """Клиент для работы с Redis."""
 
-    def __init__(self) -> None:
+    def __init__(self, serializer: Serializer | None = None) -> None:
         self._client: Optional[redis.Redis] = None
+        self._serializer = serializer
+        self._script_sources: dict[str, str] = {}
+        self._scripts: dict[str, AsyncScript] = {}
 
     async def connect(self) -> None:
-        """Подключиться к Redis."""
+        """Подключиться к Redis с пулом соединений фиксированного размера."""
         if self._client is None:
-            self._client = redis.from_url(settings.redis_url, decode_responses=True)
+            pool = redis.BlockingConnectionPool.from_url(
+                settings.redis_url,
+                max_connections=settings.redis_pool_size,
+                timeout=settings.redis_pool_timeout,
+                socket_timeout=settings.redis_socket_timeout,
+                health_check_interval=30,
+            )
+            self._client = redis.Redis(connection_pool=pool)
+            if self._serializer is None:
+                self._serializer = get_serializer(settings.redis_serializer)
+            for name, source in self._script_sources.items():
+                self._scripts[name] = self._client.register_script(source)
 
     async def disconnect(self) -> None:
         """Отключиться от Redis."""
         if self._client is not None:
-            await self._client.close()
+            await self._client.aclose(close_connection_pool=True)
             self._client = None
+            self._scripts.clear()
 
     @property
     def client(self) -> redis.Redis:
@@ -32,33 +118,190 @@ class RedisClient:
             raise RuntimeError("Redis client not connected. Call connect() first.")
         return self._client
 
+    @property
+    def serializer(self) -> Serializer:
+        """Текущий кодек значений."""
+        if self._serializer is None:
+            self._serializer = get_serializer(settings.redis_serializer)
+        return self._serializer
+
     async def get(self, key: str) -> Optional[str]:
         """Получить значение по ключу."""
-        return await self.client.get(key)
+        value = await self.client.get(key)
+        return value.decode("utf-8") if value is not None else None
 
-    async def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+    async def set(self, key: str, value: str | bytes, ex: Optional[int] = None) -> None:
         """Установить значение с опциональным TTL."""
         await self.client.set(key, value, ex=ex)
 
-    async def delete(self, key: str) -> None:
-        """Удалить ключ."""
-        await self.client.delete(key)
+    async def set_if_absent(self, key: str, value: str | bytes, ex: Optional[int] = None) -> bool:
+        """Установить значение, только если ключа еще нет (SET NX)."""
+        return bool(await self.client.set(key, value, ex=ex, nx=True))
+
+    async def delete(self, *keys: str) -> None:
+        """Удалить ключи."""
+        if keys:
+            await self.client.delete(*keys)
+
+    async def hash_get(self, key: str, field: str) -> Optional[str]:
+        """Получить поле хеша."""
+        value = await self.client.hget(key, field)
+        return value.decode("utf-8") if value is not None else None
 
-    async def get_json(self, key: str) -> Optional[dict]:
-        """Получить JSON значение."""
-        value = await self.get(key)
+    async def hash_set(self, key: str, field: str, value: str, ex: Optional[int] = None) -> None:
+        """Установить поле хеша; ex продлевает TTL всего хеша."""
+        async with self.pipeline(transaction=False) as pipe:
+            pipe.hset(key, field, value)
+            if ex is not None:
+                pipe.expire(key, ex)
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        """Получить сериализованное значение."""
+        value = await self.client.get(key)
         if value is None:
             return None
-        return json.loads(value)
+        return self.serializer.loads(value)
+
+    async def set_json(self, key: str, value: Any, ex: Optional[int] = None) -> None:
+        """Установить сериализованное значение."""
+        await self.client.set(key, self.serializer.dumps(value), ex=ex)
+
+    async def mget_json(self, keys: Iterable[str]) -> list[Optional[Any]]:
+        """Получить несколько значений одним MGET."""
+        keys = list(keys)
+        if not keys:
+            return []
+        loads = self.serializer.loads
+        return [None if v is None else loads(v) for v in await self.client.mget(keys)]
 
-    async def set_json(self, key: str, value: dict, ex: Optional[int] = None) -> None:
-        """Установить JSON значение."""
-        await self.set(key, json.dumps(value), ex=ex)
+    async def mset_json(self, mapping: Mapping[str, Any], ex: Optional[int] = None) -> None:
+        """Записать несколько значений за один round trip.
+
+        Без TTL используется MSET, с TTL — конвейер из SET EX без транзакции.
+        """
+        if not mapping:
+            return
+        dumps = self.serializer.dumps
+        if ex is None:
+            await self.client.mset({k: dumps(v) for k, v in mapping.items()})
+            return
+        async with self.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, dumps(value), ex=ex)
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True) -> AsyncIterator[Pipeline]:
+        """Конвейер команд (MULTI/EXEC при transaction=True).
+
+        Команды отправляются одним пакетом при выходе из блока, если
+        вызывающий код не выполнил execute() сам, чтобы получить результаты.
+        """
+        async with self.client.pipeline(transaction=transaction) as pipe:
+            yield pipe
+            if len(pipe):
+                await pipe.execute()
+
+    def register_script(self, name: str, source: str) -> None:
+        """Зарегистрировать Lua-скрипт для атомарных операций.
+
+        Скрипт вызывается через EVALSHA; при отсутствии в кэше Redis
+        автоматически загружается заново.
+        """
+        self._script_sources[name] = source
+        if self._client is not None:
+            self._scripts[name] = self._client.register_script(source)
+
+    async def run_script(
+        self, name: str, keys: Iterable[str] = (), args: Iterable[Any] = ()
+    ) -> Any:
+        """Выполнить зарегистрированный Lua-скрипт."""
+        if self._client is None:
+            raise RuntimeError("Redis client not connected. Call connect() first.")
+        return await self._scripts[name](keys=list(keys), args=list(args))
 
     async def exists(self, key: str) -> bool:
         """Проверить существование ключа."""
         return bool(await self.client.exists(key))
 
+    async def publish(self, channel: str, message: str) -> int:
+        """Опубликовать сообщение в канал; вернуть число получателей."""
+        return await self.client.publish(channel, message)
+
+    def pubsub(self) -> PubSub:
+        """Подписка на каналы; занимает отдельное соединение из пула."""
+        return self.client.pubsub(ignore_subscribe_messages=True)
+
+    async def stream_add_many(
+        self, stream: str, messages: Iterable[Mapping[str, str]], maxlen: int | None = None
+    ) -> list[str]:
+        """Добавить сообщения в поток одним конвейером XADD; вернуть их id.
+
+        maxlen ограничивает длину потока приблизительно (MAXLEN ~), чтобы
+        обрезка не стоила лишней работы на каждой записи.
+        """
+        async with self.pipeline(transaction=False) as pipe:
+            for fields in messages:
+                pipe.xadd(stream, dict(fields), maxlen=maxlen, approximate=True)
+            ids = await pipe.execute()
+        return [i.decode() if isinstance(i, bytes) else i for i in ids]
+
+    async def stream_ensure_group(self, stream: str, group: str) -> None:
+        """Создать группу потребителей (и сам поток), если ее еще нет."""
+        try:
+            await self.client.xgroup_create(stream, group, id="0", mkstream=True)
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    async def stream_read_group(
+        self,
+        stream: str,
+        group: str,
+        consumer: str,
+        count: int,
+        block_ms: int | None = None,
+        pending: bool = False,
+    ) -> list[tuple[str, dict[str, str]]]:
+        """Прочитать сообщения группы (XREADGROUP).
+
+        pending=True возвращает уже выданные этому потребителю, но не
+        подтвержденные сообщения — так они дочитываются после перезапуска.
+        """
+        response = await self.client.xreadgroup(
+            group, consumer, {stream: "0" if pending else ">"}, count=count, block=block_ms
+        )
+        if not response:
+            return []
+        return [_decode_stream_message(message) for message in response[0][1]]
+
+    async def stream_claim(
+        self, stream: str, group: str, consumer: str, min_idle_ms: int, count: int
+    ) -> list[tuple[str, dict[str, str]]]:
+        """Забрать сообщения, зависшие у других потребителей (XAUTOCLAIM)."""
+        response = await self.client.xautoclaim(
+            stream, group, consumer, min_idle_time=min_idle_ms, start_id="0", count=count
+        )
+        return [_decode_stream_message(message) for message in response[1] if message[1]]
+
+    async def stream_ack(self, stream: str, group: str, ids: Iterable[str]) -> None:
+        """Подтвердить обработку и удалить сообщения из потока."""
+        ids = list(ids)
+        if not ids:
+            return
+        async with self.pipeline(transaction=False) as pipe:
+            pipe.xack(stream, group, *ids)
+            pipe.xdel(stream, *ids)
+
+
+def _decode_stream_message(message: tuple[Any, Any]) -> tuple[str, dict[str, str]]:
+    message_id, fields = message
+    if isinstance(message_id, bytes):
+        message_id = message_id.decode()
+    return message_id, {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in (fields or {}).items()
+    }
+
 
 # Глобальный экземпляр
 redis_client = RedisClient()
@@ -1,24 +1,73 @@
 """Репозитории для работы с БД."""
 
+import json
 from datetime import date, datetime
 
-from sqlalchemy import select
+from sqlalchemy import (
+    REAL,
+    and_,
+    cast,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.adapters.models import EntryModel, MedicationModel, SymptomModel, UserModel
-from app.domain.models import Entry, Medication, Symptom, User
-from app.domain.validators import EntryCreate, EntryUpdate, MedicationCreate, SymptomCreate
+from app.adapters.models import (
+    EntryEventModel,
+    EntryModel,
+    MedicationCatalogModel,
+    MedicationModel,
+    PurgeJobModel,
+    ShardDirectoryModel,
+    SubscriptionModel,
+    SymptomModel,
+    UserModel,
+)
+from app.adapters.tenant import current_tenant
+from app.domain.models import (
+    Entry,
+    EntryEvent,
+    Medication,
+    PurgeJob,
+    PurgeStage,
+    ShardPlacement,
+    Subscription,
+    SubscriptionStatus,
+    Symptom,
+    User,
+    WeeklySummary,
+)
+from app.domain.validators import (
+    EntryCreate,
+    EntryUpdate,
+    MedicationCreate,
+    SymptomCreate,
+    normalize_medication_name,
+)
 
 
 class UserRepository:
-    """Репозиторий для работы с пользователями."""
+    """Репозиторий для работы с пользователями.
+
+    Поиск и создание по Telegram ID идут в пределах текущего арендатора
+    (current_tenant).
+    """
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
     async def get_by_telegram_id(self, telegram_id: int) -> User | None:
         """Получить пользователя по Telegram ID."""
-        stmt = select(UserModel).where(UserModel.telegram_id == telegram_id)
+        stmt = select(UserModel).where(
+            UserModel.tenant_id == current_tenant.get(), UserModel.telegram_id == telegram_id
+        )
         result = await self.session.execute(stmt)
         model = result.scalar_one_or_none()
         if model is None:
@@ -27,12 +76,48 @@ class UserRepository:
 
     async def create(self, telegram_id: int, username: str | None = None) -> User:
         """Создать нового пользователя."""
-        model = UserModel(telegram_id=telegram_id, username=username)
+        model = UserModel(
+            tenant_id=current_tenant.get(), telegram_id=telegram_id, username=username
+        )
         self.session.add(model)
         await self.session.flush()
         await self.session.refresh(model)
         return User.model_validate(model)
 
+    async def set_location(self, user_id: int, latitude: float, longitude: float) -> None:
+        """Сохранить местоположение пользователя."""
+        stmt = (
+            update(UserModel)
+            .where(UserModel.id == user_id)
+            .values(latitude=latitude, longitude=longitude, updated_at=datetime.utcnow())
+        )
+        await self.session.execute(stmt)
+
+    async def set_email(self, user_id: int, email: str | None) -> None:
+        """Сохранить адрес для выгрузок и отчетов."""
+        stmt = (
+            update(UserModel)
+            .where(UserModel.id == user_id)
+            .values(email=email, updated_at=datetime.utcnow())
+        )
+        await self.session.execute(stmt)
+
+    async def list_with_email(self, after_id: int = 0, limit: int = 500) -> list[User]:
+        """Пользователи с адресом почты, страница по id после after_id."""
+        stmt = (
+            select(UserModel)
+            .where(UserModel.id > after_id, UserModel.email.is_not(None))
+            .order_by(UserModel.id)
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return [User.model_validate(m) for m in result.scalars().all()]
+
+    async def delete(self, user_id: int) -> int:
+        """Удалить пользователя (после удаления всех его записей)."""
+        result = await self.session.execute(delete(UserModel).where(UserModel.id == user_id))
+        return result.rowcount
+
     async def get_or_create(self, telegram_id: int, username: str | None = None) -> User:
         """Получить или создать пользователя."""
         user = await self.get_by_telegram_id(telegram_id)
@@ -108,9 +193,45 @@ class EntryRepository:
         await self.session.refresh(model)
         return Entry.model_validate(model)
 
-    async def list_by_user(
-        self, user_id: int, limit: int = 30, offset: int = 0
-    ) -> list[Entry]:
+    async def lock_by_user_dates(
+        self, keys: list[tuple[int, date]]
+    ) -> dict[tuple[int, date], Entry]:
+        """Записи по парам (пользователь, дата), заблокированные до конца транзакции."""
+        if not keys:
+            return {}
+        stmt = (
+            select(EntryModel)
+            .where(tuple_(EntryModel.user_id, EntryModel.entry_date).in_(keys))
+            .order_by(EntryModel.id)
+            .with_for_update()
+        )
+        result = await self.session.execute(stmt)
+        return {
+            (model.user_id, model.entry_date): Entry.model_validate(model)
+            for model in result.scalars()
+        }
+
+    async def apply_update(self, entry_id: int, data: EntryUpdate) -> None:
+        """Записать заданные поля одним UPDATE, без чтения строки."""
+        stmt = (
+            update(EntryModel)
+            .where(EntryModel.id == entry_id)
+            .values(**data.model_dump(mode="json", exclude_none=True), updated_at=datetime.utcnow())
+        )
+        await self.session.execute(stmt)
+
+    async def set_weather(
+        self, entry_id: int, pressure_hpa: float | None, temperature_c: float | None
+    ) -> None:
+        """Сохранить давление и температуру за день записи."""
+        stmt = (
+            update(EntryModel)
+            .where(EntryModel.id == entry_id)
+            .values(pressure_hpa=pressure_hpa, temperature_c=temperature_c)
+        )
+        await self.session.execute(stmt)
+
+    async def list_by_user(self, user_id: int, limit: int = 30, offset: int = 0) -> list[Entry]:
         """Получить список записей пользователя."""
         stmt = (
             select(EntryModel)
@@ -140,6 +261,224 @@ class EntryRepository:
         models = result.scalars().all()
         return [Entry.model_validate(m) for m in models]
 
+    async def list_by_users_and_range(
+        self, user_ids: list[int], start_date: date, end_date: date
+    ) -> dict[int, list[Entry]]:
+        """Получить записи нескольких пользователей за период одним запросом."""
+        if not user_ids:
+            return {}
+        stmt = select(EntryModel).where(
+            EntryModel.user_id.in_(user_ids),
+            EntryModel.entry_date >= start_date,
+            EntryModel.entry_date <= end_date,
+        )
+        result = await self.session.execute(stmt)
+        entries: dict[int, list[Entry]] = {user_id: [] for user_id in user_ids}
+        for model in result.scalars().all():
+            entries[model.user_id].append(Entry.model_validate(model))
+        # Порядок сортируется здесь: ORDER BY по списку id потребовал бы Sort в плане
+        for user_entries in entries.values():
+            user_entries.sort(key=lambda entry: entry.entry_date, reverse=True)
+        return entries
+
+    async def delete_batch_by_user(self, user_id: int, limit: int) -> int:
+        """Удалить до limit записей пользователя; вернуть число удаленных."""
+        ids = (
+            select(EntryModel.id).where(EntryModel.user_id == user_id).limit(limit)
+        ).scalar_subquery()
+        result = await self.session.execute(delete(EntryModel).where(EntryModel.id.in_(ids)))
+        return result.rowcount
+
+    async def weekly_summaries(
+        self, after_id: int, limit: int, start_date: date, end_date: date
+    ) -> list[WeeklySummary]:
+        """Итоги периода для страницы пользователей с id больше after_id.
+
+        Один запрос: страница users по первичному ключу и два агрегата,
+        по записям и по препаратам, сгруппированные по user_id. В ответе
+        есть и пользователи без записей, чтобы курсор всегда продвигался.
+        """
+        page = (
+            select(UserModel.id, UserModel.tenant_id, UserModel.telegram_id)
+            .where(UserModel.id > after_id)
+            .order_by(UserModel.id)
+            .limit(limit)
+            .cte("page")
+        )
+        in_range = (
+            EntryModel.entry_date >= start_date,
+            EntryModel.entry_date <= end_date,
+        )
+        headache = or_(
+            EntryModel.had_attack,
+            EntryModel.pain_score.is_not(None),
+            and_(EntryModel.pain_level.is_not(None), EntryModel.pain_level != "none"),
+        )
+        entry_stats = (
+            select(
+                EntryModel.user_id,
+                func.count().label("entry_days"),
+                func.count().filter(headache).label("headache_days"),
+                func.avg(EntryModel.pain_score).label("mean_score"),
+                func.count().filter(EntryModel.had_attack).label("attacks"),
+            )
+            .join(page, page.c.id == EntryModel.user_id)
+            .where(*in_range)
+            .group_by(EntryModel.user_id)
+            .subquery()
+        )
+        medication_stats = (
+            select(EntryModel.user_id, func.count().label("medications_taken"))
+            .join(page, page.c.id == EntryModel.user_id)
+            .join(MedicationModel, MedicationModel.entry_id == EntryModel.id)
+            .where(*in_range)
+            .group_by(EntryModel.user_id)
+            .subquery()
+        )
+        stmt = (
+            select(
+                page.c.id,
+                page.c.tenant_id,
+                page.c.telegram_id,
+                entry_stats.c.entry_days,
+                entry_stats.c.headache_days,
+                entry_stats.c.mean_score,
+                entry_stats.c.attacks,
+                medication_stats.c.medications_taken,
+            )
+            .outerjoin(entry_stats, entry_stats.c.user_id == page.c.id)
+            .outerjoin(medication_stats, medication_stats.c.user_id == page.c.id)
+            .order_by(page.c.id)
+        )
+        result = await self.session.execute(stmt)
+        return [
+            WeeklySummary(
+                user_id=row.id,
+                tenant_id=row.tenant_id,
+                telegram_id=row.telegram_id,
+                entry_days=row.entry_days or 0,
+                headache_days=row.headache_days or 0,
+                mean_score=None if row.mean_score is None else float(row.mean_score),
+                attacks=row.attacks or 0,
+                medications_taken=row.medications_taken or 0,
+            )
+            for row in result.all()
+        ]
+
+    async def search(
+        self,
+        user_id: int,
+        query: str,
+        limit: int = 5,
+        after: tuple[float, int] | None = None,
+    ) -> list[tuple[Entry, float]]:
+        """Полнотекстовый поиск по описанию боли и заметкам.
+
+        Результаты упорядочены по (релевантность, id) по убыванию; следующая
+        страница запрашивается курсором after=(rank, id) последней записи.
+        """
+        tsquery = func.websearch_to_tsquery("russian", query)
+        rank = func.ts_rank_cd(EntryModel.search_vector, tsquery)
+        stmt = select(EntryModel, rank.label("rank")).where(
+            EntryModel.user_id == user_id,
+            EntryModel.search_vector.op("@@")(tsquery),
+        )
+        if after is not None:
+            after_rank, after_id = after
+            stmt = stmt.where(
+                tuple_(rank, EntryModel.id) < tuple_(cast(after_rank, REAL), after_id)
+            )
+        stmt = stmt.order_by(rank.desc(), EntryModel.id.desc()).limit(limit)
+        result = await self.session.execute(stmt)
+        return [(Entry.model_validate(model), float(score)) for model, score in result.all()]
+
+    async def list_score_columns(self, user_id: int) -> list[tuple[int, int | None, bool]]:
+        """Получить (id, pain_score, had_attack) всех записей пользователя.
+
+        Выбираются только нужные колонки, без гидрации ORM-объектов; все они
+        есть в покрывающем индексе, поэтому запрос читает только индекс.
+        """
+        stmt = (
+            select(EntryModel.id, EntryModel.pain_score, EntryModel.had_attack)
+            .where(EntryModel.user_id == user_id)
+            .order_by(EntryModel.entry_date)
+        )
+        result = await self.session.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def month_days(
+        self, user_id: int, start_date: date, end_date: date
+    ) -> list[tuple[date, int | None, bool]]:
+        """Получить (дата, pain_score, had_attack) за период одной строкой.
+
+        Диапазон читается из покрывающего индекса (user_id, entry_date) и
+        упаковывается в массивы через array_agg: в ответе одна строка вместо
+        строки на каждый день. Массивы собираются из одних и тех же строк в
+        одном порядке, поэтому их элементы соответствуют друг другу.
+        """
+        stmt = select(
+            func.array_agg(EntryModel.entry_date),
+            func.array_agg(EntryModel.pain_score),
+            func.array_agg(EntryModel.had_attack),
+        ).where(
+            EntryModel.user_id == user_id,
+            EntryModel.entry_date >= start_date,
+            EntryModel.entry_date <= end_date,
+        )
+        dates, scores, attacks = (await self.session.execute(stmt)).one()
+        if dates is None:
+            return []
+        return list(zip(dates, scores, attacks, strict=True))
+
+
+class MedicationCatalogRepository:
+    """Репозиторий справочника препаратов."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def list_all(self) -> list[tuple[int, str]]:
+        """Получить (id, название) всех препаратов справочника."""
+        stmt = select(MedicationCatalogModel.id, MedicationCatalogModel.name)
+        result = await self.session.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def ensure(self, names: list[str]) -> dict[str, tuple[int, str]]:
+        """Найти или добавить препараты одним upsert.
+
+        Возвращает словарь «нормализованное имя → (id, название в справочнике)».
+        """
+        rows = {}
+        for name in names:
+            rows.setdefault(normalize_medication_name(name), " ".join(name.split()))
+        if not rows:
+            return {}
+        stmt = pg_insert(MedicationCatalogModel).values(
+            [{"name": name, "normalized_name": key} for key, name in rows.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MedicationCatalogModel.normalized_name],
+            set_={"normalized_name": stmt.excluded.normalized_name},
+        ).returning(
+            MedicationCatalogModel.id,
+            MedicationCatalogModel.normalized_name,
+            MedicationCatalogModel.name,
+        )
+        result = await self.session.execute(stmt)
+        return {key: (catalog_id, name) for catalog_id, key, name in result.all()}
+
+    async def insert_known(self, items: list[tuple[int, str]]) -> None:
+        """Скопировать препараты справочника с их id (зеркало на другом шарде)."""
+        if not items:
+            return
+        stmt = pg_insert(MedicationCatalogModel).values(
+            [
+                {"id": catalog_id, "name": name, "normalized_name": normalize_medication_name(name)}
+                for catalog_id, name in items
+            ]
+        )
+        await self.session.execute(stmt.on_conflict_do_nothing())
+
 
 class MedicationRepository:
     """Репозиторий для работы с препаратами."""
@@ -149,17 +488,74 @@ class MedicationRepository:
 
     async def create(self, data: MedicationCreate) -> Medication:
         """Создать запись о препарате."""
-        model = MedicationModel(
-            entry_id=data.entry_id,
-            name=data.name,
-            medication_type=data.medication_type,
-            dosage=data.dosage,
-            taken_at=data.taken_at,
+        (medication,) = await self.create_many([data])
+        return medication
+
+    async def create_many(self, items: list[MedicationCreate]) -> list[Medication]:
+        """Создать несколько препаратов одним INSERT ... RETURNING.
+
+        catalog_id обязателен: id препаратов выдает общий справочник на
+        шарде 0 (services.sharding.resolve_catalog), а не шард сессии.
+        """
+        if not items:
+            return []
+        if any(data.catalog_id is None for data in items):
+            raise ValueError("catalog_id must be resolved via the shared catalog")
+
+        stmt = (
+            insert(MedicationModel)
+            .values(
+                [
+                    {
+                        "entry_id": data.entry_id,
+                        "catalog_id": data.catalog_id,
+                        "medication_type": data.medication_type,
+                        "dosage": data.dosage,
+                        "taken_at": data.taken_at,
+                    }
+                    for data in items
+                ]
+            )
+            .returning(
+                MedicationModel.id,
+                MedicationModel.entry_id,
+                MedicationModel.catalog_id,
+                MedicationModel.medication_type,
+                MedicationModel.dosage,
+                MedicationModel.taken_at,
+            )
         )
-        self.session.add(model)
-        await self.session.flush()
-        await self.session.refresh(model)
-        return Medication.model_validate(model)
+        result = await self.session.execute(stmt)
+        names = {data.catalog_id: data.name for data in items}
+        return [
+            Medication(
+                id=row.id,
+                entry_id=row.entry_id,
+                catalog_id=row.catalog_id,
+                name=names[row.catalog_id],
+                medication_type=row.medication_type,
+                dosage=row.dosage,
+                taken_at=row.taken_at,
+            )
+            for row in result.all()
+        ]
+
+    async def usage_counts(self) -> list[tuple[int, int, str, int]]:
+        """Частота приема: (user_id, catalog_id, тип, количество) по всем пользователям."""
+        stmt = (
+            select(
+                EntryModel.user_id,
+                MedicationModel.catalog_id,
+                MedicationModel.medication_type,
+                func.count(),
+            )
+            .join(EntryModel, EntryModel.id == MedicationModel.entry_id)
+            .group_by(
+                EntryModel.user_id, MedicationModel.catalog_id, MedicationModel.medication_type
+            )
+        )
+        result = await self.session.execute(stmt)
+        return [tuple(row) for row in result.all()]
 
     async def list_by_entry(self, entry_id: int) -> list[Medication]:
         """Получить все препараты для записи."""
@@ -168,6 +564,31 @@ class MedicationRepository:
         models = result.scalars().all()
         return [Medication.model_validate(m) for m in models]
 
+    async def entry_ids_with_medications(self, entry_ids: list[int]) -> set[int]:
+        """Получить ID записей, в которых есть хотя бы один препарат."""
+        if not entry_ids:
+            return set()
+        stmt = (
+            select(MedicationModel.entry_id)
+            .where(MedicationModel.entry_id.in_(entry_ids))
+            .distinct()
+        )
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
+
+    async def delete_batch_by_user(self, user_id: int, limit: int) -> int:
+        """Удалить до limit препаратов из записей пользователя."""
+        ids = (
+            select(MedicationModel.id)
+            .join(EntryModel, EntryModel.id == MedicationModel.entry_id)
+            .where(EntryModel.user_id == user_id)
+            .limit(limit)
+        ).scalar_subquery()
+        result = await self.session.execute(
+            delete(MedicationModel).where(MedicationModel.id.in_(ids))
+        )
+        return result.rowcount
+
 
 class SymptomRepository:
     """Репозиторий для работы с симптомами."""
@@ -187,9 +608,339 @@ class SymptomRepository:
         await self.session.refresh(model)
         return Symptom.model_validate(model)
 
+    async def create_many(self, items: list[SymptomCreate]) -> list[Symptom]:
+        """Создать несколько симптомов одним INSERT ... RETURNING."""
+        if not items:
+            return []
+        stmt = (
+            insert(SymptomModel)
+            .values(
+                [
+                    {"entry_id": data.entry_id, "name": data.name, "severity": data.severity}
+                    for data in items
+                ]
+            )
+            .returning(SymptomModel)
+        )
+        result = await self.session.scalars(stmt)
+        return [Symptom.model_validate(m) for m in result.all()]
+
     async def list_by_entry(self, entry_id: int) -> list[Symptom]:
         """Получить все симптомы для записи."""
         stmt = select(SymptomModel).where(SymptomModel.entry_id == entry_id)
         result = await self.session.execute(stmt)
         models = result.scalars().all()
         return [Symptom.model_validate(m) for m in models]
+
+    async def list_names_by_user(self, user_id: int) -> list[tuple[int, str]]:
+        """Получить пары (entry_id, название симптома) по всем записям пользователя."""
+        stmt = (
+            select(SymptomModel.entry_id, SymptomModel.name)
+            .join(EntryModel, EntryModel.id == SymptomModel.entry_id)
+            .where(EntryModel.user_id == user_id)
+        )
+        result = await self.session.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def delete_batch_by_user(self, user_id: int, limit: int) -> int:
+        """Удалить до limit симптомов из записей пользователя."""
+        ids = (
+            select(SymptomModel.id)
+            .join(EntryModel, EntryModel.id == SymptomModel.entry_id)
+            .where(EntryModel.user_id == user_id)
+            .limit(limit)
+        ).scalar_subquery()
+        result = await self.session.execute(delete(SymptomModel).where(SymptomModel.id.in_(ids)))
+        return result.rowcount
+
+
+class PurgeJobRepository:
+    """Репозиторий заданий на удаление данных."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def create(self, user_id: int, telegram_id: int) -> PurgeJob:
+        """Создать задание; повторный запрос возвращает существующее."""
+        stmt = (
+            pg_insert(PurgeJobModel)
+            .values(
+                user_id=user_id,
+                tenant_id=current_tenant.get(),
+                telegram_id=telegram_id,
+                stage=PurgeStage.MEDICATIONS.value,
+                deleted_rows=0,
+            )
+            .on_conflict_do_nothing(constraint="uq_purge_jobs_user_id")
+        )
+        await self.session.execute(stmt)
+        result = await self.session.execute(
+            select(PurgeJobModel).where(PurgeJobModel.user_id == user_id)
+        )
+        return PurgeJob.model_validate(result.scalar_one())
+
+    async def list_pending(self) -> list[PurgeJob]:
+        """Незавершенные задания в порядке создания."""
+        stmt = (
+            select(PurgeJobModel)
+            .where(PurgeJobModel.finished_at.is_(None))
+            .order_by(PurgeJobModel.id)
+        )
+        result = await self.session.execute(stmt)
+        return [PurgeJob.model_validate(m) for m in result.scalars().all()]
+
+    async def get_pending_by_user(self, user_id: int) -> PurgeJob | None:
+        """Незавершенное задание пользователя."""
+        stmt = select(PurgeJobModel).where(
+            PurgeJobModel.user_id == user_id, PurgeJobModel.finished_at.is_(None)
+        )
+        result = await self.session.execute(stmt)
+        model = result.scalar_one_or_none()
+        return None if model is None else PurgeJob.model_validate(model)
+
+    async def advance(self, job_id: int, stage: PurgeStage, deleted: int) -> None:
+        """Сохранить этап и прибавить число удаленных строк."""
+        values = {
+            "stage": stage.value,
+            "deleted_rows": PurgeJobModel.deleted_rows + deleted,
+            "updated_at": datetime.utcnow(),
+        }
+        if stage is PurgeStage.DONE:
+            values["finished_at"] = datetime.utcnow()
+        await self.session.execute(
+            update(PurgeJobModel).where(PurgeJobModel.id == job_id).values(**values)
+        )
+
+    async def record_failure(self, job_id: int, error: str) -> None:
+        """Увеличить счетчик неудачных запусков и сохранить последнюю ошибку."""
+        await self.session.execute(
+            update(PurgeJobModel)
+            .where(PurgeJobModel.id == job_id)
+            .values(
+                failures=PurgeJobModel.failures + 1,
+                last_error=error,
+                updated_at=datetime.utcnow(),
+            )
+        )
+
+
+class SubscriptionRepository:
+    """Репозиторий оплаченных периодов подписки."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def create(
+        self,
+        user_id: int,
+        plan: str,
+        starts_at: datetime,
+        expires_at: datetime,
+        telegram_charge_id: str,
+        stars_amount: int,
+    ) -> Subscription:
+        """Сохранить оплаченный период."""
+        model = SubscriptionModel(
+            user_id=user_id,
+            plan=plan,
+            status=SubscriptionStatus.ACTIVE.value,
+            starts_at=starts_at,
+            expires_at=expires_at,
+            telegram_charge_id=telegram_charge_id,
+            stars_amount=stars_amount,
+        )
+        self.session.add(model)
+        await self.session.flush()
+        await self.session.refresh(model)
+        return Subscription.model_validate(model)
+
+    async def active_until(self, user_id: int) -> datetime | None:
+        """Окончание последнего активного периода пользователя."""
+        stmt = select(func.max(SubscriptionModel.expires_at)).where(
+            SubscriptionModel.user_id == user_id,
+            SubscriptionModel.status == SubscriptionStatus.ACTIVE.value,
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def list_active(self) -> list[tuple[int, datetime]]:
+        """(user_id, окончание) для всех пользователей с активной подпиской."""
+        stmt = (
+            select(SubscriptionModel.user_id, func.max(SubscriptionModel.expires_at))
+            .where(SubscriptionModel.status == SubscriptionStatus.ACTIVE.value)
+            .group_by(SubscriptionModel.user_id)
+        )
+        result = await self.session.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def expire_due(self, now: datetime) -> list[int]:
+        """Перевести истекшие периоды в expired; вернуть затронутых пользователей."""
+        stmt = (
+            update(SubscriptionModel)
+            .where(
+                SubscriptionModel.status == SubscriptionStatus.ACTIVE.value,
+                SubscriptionModel.expires_at <= now,
+            )
+            .values(status=SubscriptionStatus.EXPIRED.value)
+            .returning(SubscriptionModel.user_id)
+        )
+        result = await self.session.execute(stmt)
+        return sorted(set(result.scalars().all()))
+
+
+EVENT_COPY_COLUMNS = (
+    "stream_id",
+    "user_id",
+    "entity",
+    "entity_id",
+    "action",
+    "changes",
+    "previous",
+    "occurred_at",
+)
+
+
+class EntryEventRepository:
+    """Репозиторий журнала изменений дневника."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def copy_many(self, events: list[tuple[str, EntryEvent]]) -> int:
+        """Записать пачку событий через COPY; вернуть число добавленных строк.
+
+        COPY идет во временную таблицу, откуда строки переносятся одним
+        INSERT ... SELECT: уже записанные stream_id пропускаются, как и
+        события пользователей, удаленных до сброса пачки.
+        """
+        if not events:
+            return 0
+        await self.session.execute(
+            text(
+                "CREATE TEMP TABLE IF NOT EXISTS entry_events_staging ("
+                "stream_id varchar(32), user_id integer, entity varchar(20), "
+                "entity_id integer, action varchar(20), changes jsonb, previous jsonb, "
+                "occurred_at timestamp) ON COMMIT DELETE ROWS"
+            )
+        )
+        connection = await self.session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "entry_events_staging",
+            records=[
+                (
+                    stream_id,
+                    event.user_id,
+                    event.entity.value,
+                    event.entity_id,
+                    event.action.value,
+                    json.dumps(event.changes, ensure_ascii=False),
+                    None
+                    if event.previous is None
+                    else json.dumps(event.previous, ensure_ascii=False),
+                    event.occurred_at,
+                )
+                for stream_id, event in events
+            ],
+            columns=EVENT_COPY_COLUMNS,
+        )
+        columns = ", ".join(EVENT_COPY_COLUMNS)
+        result = await self.session.execute(
+            text(
+                f"INSERT INTO entry_events ({columns}) "
+                f"SELECT {columns} FROM entry_events_staging s "
+                "WHERE EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id) "
+                "ON CONFLICT ON CONSTRAINT uq_entry_events_stream_id DO NOTHING"
+            )
+        )
+        return result.rowcount
+
+    async def list_after(self, after_id: int = 0, limit: int = 1000) -> list[EntryEvent]:
+        """События с id больше after_id — постраничное чтение для аналитики."""
+        stmt = (
+            select(EntryEventModel)
+            .where(EntryEventModel.id > after_id)
+            .order_by(EntryEventModel.id)
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return [EntryEvent.model_validate(m) for m in result.scalars().all()]
+
+    async def list_by_user(self, user_id: int, limit: int = 100) -> list[EntryEvent]:
+        """Последние события пользователя, новые первыми."""
+        stmt = (
+            select(EntryEventModel)
+            .where(EntryEventModel.user_id == user_id)
+            .order_by(EntryEventModel.id.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return [EntryEvent.model_validate(m) for m in result.scalars().all()]
+
+    async def delete_batch_by_user(self, user_id: int, limit: int) -> int:
+        """Удалить до limit событий пользователя."""
+        ids = (
+            select(EntryEventModel.id).where(EntryEventModel.user_id == user_id).limit(limit)
+        ).scalar_subquery()
+        result = await self.session.execute(
+            delete(EntryEventModel).where(EntryEventModel.id.in_(ids))
+        )
+        return result.rowcount
+
+
+class ShardDirectoryRepository:
+    """Репозиторий справочника шардов (только на шарде 0).
+
+    Пользователь определяется парой (current_tenant, telegram_id).
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    @staticmethod
+    def _where(telegram_id: int) -> tuple:
+        return (
+            ShardDirectoryModel.tenant_id == current_tenant.get(),
+            ShardDirectoryModel.telegram_id == telegram_id,
+        )
+
+    async def get(self, telegram_id: int) -> ShardPlacement | None:
+        """Шард пользователя."""
+        model = await self.session.get(ShardDirectoryModel, (current_tenant.get(), telegram_id))
+        return None if model is None else ShardPlacement.model_validate(model)
+
+    async def assign(self, telegram_id: int, shard: int) -> ShardPlacement:
+        """Закрепить нового пользователя за шардом; при гонке вернуть уже записанный."""
+        tenant_id = current_tenant.get()
+        stmt = (
+            pg_insert(ShardDirectoryModel)
+            .values(tenant_id=tenant_id, telegram_id=telegram_id, shard=shard, moving=False)
+            .on_conflict_do_nothing(
+                index_elements=[ShardDirectoryModel.tenant_id, ShardDirectoryModel.telegram_id]
+            )
+        )
+        await self.session.execute(stmt)
+        model = await self.session.get(
+            ShardDirectoryModel, (tenant_id, telegram_id), populate_existing=True
+        )
+        return ShardPlacement.model_validate(model)
+
+    async def set_moving(self, telegram_id: int, moving: bool) -> None:
+        """Отметить начало или отмену переноса пользователя."""
+        await self.session.execute(
+            update(ShardDirectoryModel)
+            .where(*self._where(telegram_id))
+            .values(moving=moving, updated_at=datetime.utcnow())
+        )
+
+    async def move(self, telegram_id: int, shard: int) -> None:
+        """Переключить пользователя на новый шард и снять отметку переноса."""
+        await self.session.execute(
+            update(ShardDirectoryModel)
+            .where(*self._where(telegram_id))
+            .values(shard=shard, moving=False, updated_at=datetime.utcnow())
+        )
+
+    async def delete(self, telegram_id: int) -> None:
+        """Удалить пользователя из справочника."""
+        await self.session.execute(delete(ShardDirectoryModel).where(*self._where(telegram_id)))
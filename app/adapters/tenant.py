@@ -0,0 +1,30 @@
+"""Текущий арендатор (бот) для репозиториев и ключей Redis."""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.domain.models import DEFAULT_TENANT
+
+# Бот, чей апдейт обрабатывается; выставляется TenantMiddleware
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+
+@contextmanager
+def use_tenant(tenant_id: str) -> Iterator[None]:
+    """Выполнить блок от имени арендатора."""
+    token = current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+def tenant_key(key: str) -> str:
+    """Ключ Redis с префиксом текущего арендатора.
+
+    У арендатора по умолчанию префикса нет, поэтому ключи развертывания с
+    одним ботом не меняются.
+    """
+    tenant_id = current_tenant.get()
+    return key if tenant_id == DEFAULT_TENANT else f"{tenant_id}:{key}"
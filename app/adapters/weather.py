@@ -0,0 +1,179 @@
+"""Адаптер погоды: среднесуточные давление и температура по координатам."""
+
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+from statistics import fmean
+from typing import Any
+
+import httpx
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from app.adapters.redis_client import redis_client
+from app.config import settings
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Прошедшие дни больше не меняются, их можно держать долго
+PAST_DAY_TTL_SECONDS = 7 * 24 * 60 * 60
+
+WeatherKey = tuple[float, float, date]
+
+
+class DailyWeather(BaseModel):
+    """Погода за день в ячейке сетки координат."""
+
+    day: date
+    latitude: float
+    longitude: float
+    pressure_hpa: float | None = None
+    temperature_c: float | None = None
+
+
+def geo_bucket(latitude: float, longitude: float, grid: float) -> tuple[float, float]:
+    """Центр ячейки сетки, в которую попадают координаты."""
+    return (
+        round(round(latitude / grid) * grid, 4),
+        round(round(longitude / grid) * grid, 4),
+    )
+
+
+def _mean(values: list[float | None]) -> float | None:
+    present = [v for v in values if v is not None]
+    return round(fmean(present), 1) if present else None
+
+
+class WeatherClient:
+    """Клиент погодного API (формат Open-Meteo) с общим кэшем.
+
+    Координаты округляются до ячейки сетки, ключ кэша — (ячейка, день),
+    поэтому все пользователи одного города стоят одного запроса наверх.
+    Результат кэшируется в процессе и в Redis, а одновременные запросы
+    одного ключа объединяются в одну задачу загрузки.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 10,
+        timeout: float = 5.0,
+        grid: float = 0.25,
+        ttl: int = 3 * 60 * 60,
+        cache_size: int = 4096,
+    ) -> None:
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.grid = grid
+        self.ttl = ttl
+        self._client: httpx.AsyncClient | None = None
+        self._cache: LRUCache[WeatherKey, tuple[float, DailyWeather]] = LRUCache(cache_size)
+        self._inflight: dict[WeatherKey, asyncio.Task[DailyWeather | None]] = {}
+
+    async def connect(self) -> None:
+        """Создать HTTP-клиент с ограниченным пулом соединений."""
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+            ),
+            timeout=httpx.Timeout(self.timeout),
+        )
+
+    async def disconnect(self) -> None:
+        """Закрыть HTTP-клиент."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("Weather client is not connected")
+        return self._client
+
+    def bucket(self, latitude: float, longitude: float) -> tuple[float, float]:
+        """Ячейка сетки для координат."""
+        return geo_bucket(latitude, longitude, self.grid)
+
+    async def get_daily(self, latitude: float, longitude: float, day: date) -> DailyWeather | None:
+        """Погода за день; None, если API недоступен."""
+        key = (*self.bucket(latitude, longitude), day)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Отмена одного ожидающего не должна отменять загрузку для остальных
+        return await asyncio.shield(task)
+
+    def _ttl_for(self, day: date) -> int:
+        return PAST_DAY_TTL_SECONDS if day < date.today() - timedelta(days=1) else self.ttl
+
+    async def _load(self, key: WeatherKey) -> DailyWeather | None:
+        latitude, longitude, day = key
+        redis_key = f"weather:{latitude}:{longitude}:{day.isoformat()}"
+        ttl = self._ttl_for(day)
+
+        try:
+            raw = await redis_client.get_json(redis_key)
+        except (RedisError, RuntimeError):
+            logger.warning("Weather cache unavailable", exc_info=True)
+            raw = None
+        if raw is not None:
+            weather = DailyWeather.model_validate(raw)
+        else:
+            weather = await self._fetch(latitude, longitude, day)
+            if weather is None:
+                return None
+            try:
+                await redis_client.set_json(redis_key, weather.model_dump(mode="json"), ex=ttl)
+            except (RedisError, RuntimeError):
+                logger.warning("Weather cache unavailable", exc_info=True)
+
+        self._cache.set(key, (time.monotonic() + ttl, weather))
+        return weather
+
+    async def _fetch(self, latitude: float, longitude: float, day: date) -> DailyWeather | None:
+        params: dict[str, Any] = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "hourly": "pressure_msl,temperature_2m",
+            "start_date": day.isoformat(),
+            "end_date": day.isoformat(),
+            "timezone": "UTC",
+        }
+        try:
+            response = await self.client.get("/v1/forecast", params=params)
+            response.raise_for_status()
+            hourly = response.json()["hourly"]
+            return DailyWeather(
+                day=day,
+                latitude=latitude,
+                longitude=longitude,
+                pressure_hpa=_mean(hourly.get("pressure_msl", [])),
+                temperature_c=_mean(hourly.get("temperature_2m", [])),
+            )
+        except (httpx.HTTPError, KeyError, TypeError, ValueError):
+            logger.warning(
+                "Weather lookup failed for %s,%s on %s", latitude, longitude, day, exc_info=True
+            )
+            return None
+
+
+# Глобальный экземпляр
+weather_client = WeatherClient(
+    base_url=settings.weather_api_url,
+    pool_size=settings.weather_pool_size,
+    timeout=settings.weather_timeout,
+    grid=settings.weather_grid_degrees,
+    ttl=settings.weather_cache_ttl_seconds,
+)
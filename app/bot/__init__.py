@@ -19,6 +19,13 @@ async def setup_commands_menu(bot: Bot) -> None:
         BotCommand(command="edit", description="Редактировать запись"),
         BotCommand(command="recent", description="Последние записи"),
         BotCommand(command="export", description="Выгрузить записи (CSV/XLSX)"),
+        BotCommand(command="insights", description="Связь симптомов с болью"),
+        BotCommand(command="chart", description="График боли за период"),
+        BotCommand(command="calendar", description="Календарь боли за месяц"),
+        BotCommand(command="search", description="Поиск по заметкам и описаниям"),
+        BotCommand(command="set_location", description="Район для данных о погоде"),
+        BotCommand(command="set_email", description="Почта для выгрузок и отчетов"),
+        BotCommand(command="delete_me", description="Удалить все свои данные"),
         BotCommand(command="migrebotplus", description="Статус подписки"),
     ]
     await bot.set_my_commands(commands)
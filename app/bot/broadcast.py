@@ -0,0 +1,154 @@
+"""Массовая отправка сообщений в Telegram с ограничением скорости."""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterable, Awaitable, Callable, Mapping
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramRetryAfter
+from pydantic import BaseModel
+
+from app.domain.models import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastMessage(BaseModel):
+    """Сообщение рассылки."""
+
+    chat_id: int
+    text: str
+    tenant_id: str = DEFAULT_TENANT
+
+
+# Обработчик итога сообщения: (сообщение, стоит ли отправить его позже)
+ResultCallback = Callable[[BroadcastMessage, bool], Awaitable[None]]
+
+
+class BroadcastStats(BaseModel):
+    """Итоги рассылки."""
+
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+
+
+class RateLimiter:
+    """Равномерный лимит: не больше rate запросов в секунду на процесс."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        """Дождаться своего слота."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float) -> None:
+        """Сдвинуть все следующие слоты (ответ 429 от Telegram)."""
+        self._next = max(self._next, asyncio.get_running_loop().time() + seconds)
+
+
+class Broadcaster:
+    """Рассылка из асинхронного потока сообщений.
+
+    Производитель читает поток и кладет сообщения в ограниченную очередь,
+    поэтому следующая пачка готовится, пока отправляется текущая, а в
+    памяти не больше queue_size сообщений. Несколько воркеров отправляют их
+    ботом арендатора сообщения через RateLimiter этого бота (лимиты Telegram
+    у каждого бота свои); на TelegramRetryAfter лимитер ставится на паузу
+    для всех воркеров, и сообщение повторяется. Итог каждого сообщения
+    передается в on_result: доставлено или бот заблокирован — повторять не
+    нужно, остальные ошибки — стоит повторить позже.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 25.0,
+        workers: int = 8,
+        queue_size: int = 1000,
+        max_attempts: int = 3,
+    ) -> None:
+        self.rate_per_second = rate_per_second
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+
+    async def send(
+        self,
+        bots: Mapping[str, Bot],
+        messages: AsyncIterable[BroadcastMessage],
+        on_result: ResultCallback | None = None,
+    ) -> BroadcastStats:
+        """Отправить все сообщения потока; bots — боты по tenant_id."""
+        limiters = {tenant_id: RateLimiter(self.rate_per_second) for tenant_id in bots}
+        queue: asyncio.Queue[BroadcastMessage | None] = asyncio.Queue(maxsize=self.queue_size)
+        stats = BroadcastStats()
+        workers = [
+            asyncio.create_task(self._worker(bots, queue, limiters, stats, on_result))
+            for _ in range(self.workers)
+        ]
+        try:
+            async for message in messages:
+                await queue.put(message)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            # При отмене задачи недоотправленная очередь отбрасывается
+            for task in workers:
+                task.cancel()
+        return stats
+
+    async def _worker(
+        self,
+        bots: Mapping[str, Bot],
+        queue: asyncio.Queue[BroadcastMessage | None],
+        limiters: Mapping[str, RateLimiter],
+        stats: BroadcastStats,
+        on_result: ResultCallback | None,
+    ) -> None:
+        while (message := await queue.get()) is not None:
+            retry = await self._deliver(bots, message, limiters, stats)
+            if on_result is not None:
+                await on_result(message, retry)
+
+    async def _deliver(
+        self,
+        bots: Mapping[str, Bot],
+        message: BroadcastMessage,
+        limiters: Mapping[str, RateLimiter],
+        stats: BroadcastStats,
+    ) -> bool:
+        """Отправить одно сообщение; True, если его стоит повторить позже."""
+        bot = bots.get(message.tenant_id)
+        if bot is None:
+            # Бот арендатора не запущен в этом процессе
+            stats.failed += 1
+            return True
+        limiter = limiters[message.tenant_id]
+        for attempt in range(1, self.max_attempts + 1):
+            await limiter.acquire()
+            try:
+                await bot.send_message(message.chat_id, message.text)
+            except TelegramRetryAfter as exc:
+                limiter.pause(exc.retry_after)
+                if attempt < self.max_attempts:
+                    continue
+            except TelegramForbiddenError:
+                # Пользователь заблокировал бота
+                stats.blocked += 1
+                return False
+            except TelegramAPIError:
+                logger.warning("Broadcast to %s failed", message.chat_id, exc_info=True)
+            else:
+                stats.sent += 1
+                return False
+            break
+        stats.failed += 1
+        return True
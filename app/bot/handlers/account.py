@@ -0,0 +1,106 @@
+"""Настройки аккаунта пользователя."""
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from pydantic import ValidationError
+
+from app.adapters import get_session
+from app.adapters.repository import PurgeJobRepository, UserRepository
+from app.config import settings
+from app.domain.models import User
+from app.domain.validators import EmailUpdate
+from app.services.purge import invalidate_user_caches, request_purge_run
+
+router = Router()
+
+
+class DeleteMeCallback(CallbackData, prefix="delme"):
+    """Подтверждение удаления аккаунта."""
+
+    confirm: bool
+
+
+@router.message(Command("set_email"))
+async def cmd_set_email(message: Message, user: User) -> None:
+    """Указать адрес для выгрузок и ежемесячных отчетов."""
+    if not settings.mail_enabled:
+        await message.answer("Отправка на почту пока недоступна.")
+        return
+
+    args = message.text.split(maxsplit=1)[1:] if message.text else []
+    if not args:
+        current = user.email or "не указан"
+        await message.answer(
+            f"Текущий адрес: {current}\n"
+            "Укажите адрес: /set_email doctor@example.com\n"
+            "Отключить отправку: /set_email off\n"
+            "На адрес приходят выгрузки (/export csv email) и отчет в начале каждого месяца."
+        )
+        return
+
+    value = args[0].strip()
+    try:
+        data = EmailUpdate(email=None if value.lower() == "off" else value)
+    except ValidationError:
+        await message.answer("Некорректный адрес. Пример: /set_email doctor@example.com")
+        return
+
+    async for session in get_session():
+        await UserRepository(session).set_email(user.id, data.email)
+        await session.commit()
+        break
+
+    if data.email is None:
+        await message.answer("✅ Отправка на почту отключена.")
+    else:
+        await message.answer(f"✅ Выгрузки и ежемесячные отчеты будут приходить на {data.email}.")
+
+
+@router.message(Command("delete_me"))
+async def cmd_delete_me(message: Message, user: User) -> None:
+    """Запросить удаление всех данных пользователя."""
+    async for session in get_session():
+        pending = await PurgeJobRepository(session).get_pending_by_user(user.id)
+        break
+    if pending is not None:
+        await message.answer("⏳ Ваши данные уже удаляются.")
+        return
+
+    builder = InlineKeyboardBuilder()
+    builder.button(text="Да, удалить всё", callback_data=DeleteMeCallback(confirm=True))
+    builder.button(text="Отмена", callback_data=DeleteMeCallback(confirm=False))
+    await message.answer(
+        "⚠️ Будут безвозвратно удалены все записи, препараты, симптомы и настройки. Продолжить?",
+        reply_markup=builder.as_markup(),
+    )
+
+
+@router.callback_query(DeleteMeCallback.filter())
+async def cb_delete_me(
+    callback: CallbackQuery, callback_data: DeleteMeCallback, user: User
+) -> None:
+    """Подтвердить или отменить удаление."""
+    if not callback_data.confirm:
+        if callback.message is not None:
+            await callback.message.edit_text("Удаление отменено.")
+        await callback.answer()
+        return
+
+    async for session in get_session():
+        await PurgeJobRepository(session).create(user.id, user.telegram_id)
+        await session.commit()
+        break
+
+    # Кэши сбрасываются сразу, чтобы удаляемые данные больше нигде не показывались;
+    # сами строки удаляются фоновым заданием небольшими порциями
+    await invalidate_user_caches(user.id)
+    request_purge_run()
+    if callback.message is not None:
+        await callback.message.edit_text(
+            "🗑 Данные удаляются, это займет несколько минут. "
+            "Новые записи до завершения удаления тоже будут удалены."
+        )
+    await callback.answer()
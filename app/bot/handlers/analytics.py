@@ -0,0 +1,76 @@
+"""Handlers для аналитики по истории записей."""
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import BufferedInputFile, Message
+
+from app.adapters import get_session
+from app.domain.models import User
+from app.services.charts import DEFAULT_PERIOD, PERIODS, get_pain_chart
+from app.services.insights import HIGH_PAIN_SCORE, Insights, get_insights
+
+router = Router()
+
+
+def _format_metric(value: float | None) -> str:
+    return "—" if value is None else f"{value:.2f}"
+
+
+def format_insights(insights: Insights) -> str:
+    """Сформировать текст ответа /insights."""
+    text = "🔎 Анализ ваших записей\n\n"
+    text += f"Дней с записями: {insights.total_days}\n"
+    text += f"Дней с оценкой боли: {insights.scored_days}\n"
+    text += f"Дней с сильной болью (≥{HIGH_PAIN_SCORE}): {insights.high_pain_days}\n"
+    text += f"Дней с приступом: {insights.attack_days}\n"
+    text += (
+        "Корреляция приступа и оценки боли: "
+        f"{_format_metric(insights.attack_pain_correlation)}\n"
+    )
+    if not insights.symptoms:
+        text += "\nПока мало данных о симптомах. Добавляйте их в записи, чтобы увидеть связи."
+        return text
+
+    text += "\nСимптомы (lift > 1 — встречается чаще обычного):\n"
+    for sym in insights.symptoms[:10]:
+        text += (
+            f"  • {sym.name}: {sym.days} дн., "
+            f"сильная боль {sym.high_pain_days} (lift {_format_metric(sym.lift_high_pain)}), "
+            f"приступы {sym.attack_days} (lift {_format_metric(sym.lift_attack)}), "
+            f"корреляция с оценкой {_format_metric(sym.pain_correlation)}\n"
+        )
+    return text
+
+
+@router.message(Command("insights"))
+async def cmd_insights(message: Message, user: User) -> None:
+    """Показать связь симптомов с сильной болью и приступами."""
+    async for session in get_session():
+        insights = await get_insights(session, user.id)
+        if insights.total_days == 0:
+            await message.answer("У вас пока нет записей для анализа.")
+        else:
+            await message.answer(format_insights(insights))
+        break
+
+
+@router.message(Command("chart"))
+async def cmd_chart(message: Message, user: User) -> None:
+    """Отправить график боли, приступов и приема препаратов за период."""
+    args = message.text.split()[1:] if message.text else []
+    period = args[0].lower() if args else DEFAULT_PERIOD
+    if period not in PERIODS:
+        await message.answer("Укажите период: /chart " + "|".join(PERIODS))
+        return
+
+    async for session in get_session():
+        png = await get_pain_chart(session, user.id, period)
+        if png is None:
+            await message.answer("Записей за выбранный период нет.")
+            break
+
+        await message.answer_photo(
+            photo=BufferedInputFile(png, filename=f"migrebot_{period}.png"),
+            caption="Оценка боли, приступы (▼) и прием препаратов (▲).",
+        )
+        break
@@ -0,0 +1,91 @@
+"""Handlers календаря месяца."""
+
+from datetime import date
+
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+from app.adapters import get_session
+from app.domain.models import User
+from app.services.calendar import (
+    LEGEND,
+    WEEKDAYS,
+    CalendarGrid,
+    get_month_grid,
+    parse_month,
+    shift_month,
+)
+
+router = Router()
+
+
+class CalendarCallback(CallbackData, prefix="cal"):
+    """Переход к месяцу; пустой month — нажатие на ячейку."""
+
+    month: str = ""
+
+
+def _button(text: str, month: str = "") -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=text, callback_data=CalendarCallback(month=month).pack())
+
+
+def build_keyboard(grid: CalendarGrid, today: date) -> InlineKeyboardMarkup:
+    """Сетка месяца с переходами к соседним месяцам."""
+    rows = [[_button(day) for day in WEEKDAYS]]
+    rows += [[_button(cell) for cell in week] for week in grid.weeks]
+    previous = shift_month(grid.month, -1)
+    navigation = [_button(f"◀ {previous:%Y-%m}", f"{previous:%Y-%m}")]
+    following = shift_month(grid.month, 1)
+    if following <= today:
+        navigation.append(_button(f"{following:%Y-%m} ▶", f"{following:%Y-%m}"))
+    rows.append(navigation)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def format_calendar(grid: CalendarGrid) -> str:
+    """Текст над сеткой."""
+    return f"{grid.title}\n\n{grid.summary}\n{LEGEND}"
+
+
+@router.message(Command("calendar"))
+async def cmd_calendar(message: Message, user: User) -> None:
+    """Показать календарь месяца: /calendar [YYYY-MM]."""
+    today = date.today()
+    args = message.text.split()[1:] if message.text else []
+    month = parse_month(args[0]) if args else today.replace(day=1)
+    if month is None:
+        await message.answer("Укажите месяц в формате ГГГГ-ММ: /calendar 2024-05")
+        return
+    if month > today:
+        await message.answer("Этот месяц еще не наступил.")
+        return
+
+    async for session in get_session():
+        grid = await get_month_grid(session, user.id, month, today)
+        break
+    await message.answer(format_calendar(grid), reply_markup=build_keyboard(grid, today))
+
+
+@router.callback_query(CalendarCallback.filter())
+async def cb_calendar(callback: CallbackQuery, callback_data: CalendarCallback, user: User) -> None:
+    """Перейти к соседнему месяцу в том же сообщении."""
+    month = parse_month(callback_data.month) if callback_data.month else None
+    if month is None or not isinstance(callback.message, Message):
+        await callback.answer()
+        return
+
+    today = date.today()
+    async for session in get_session():
+        grid = await get_month_grid(session, user.id, month, today)
+        break
+    try:
+        await callback.message.edit_text(
+            format_calendar(grid), reply_markup=build_keyboard(grid, today)
+        )
+    except TelegramBadRequest:
+        # Повторное нажатие: сообщение уже показывает этот месяц
+        pass
+    await callback.answer()
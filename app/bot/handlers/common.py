@@ -37,20 +37,16 @@ async def cmd_help(message: Message, user: User) -> None:
         "/set_pain <уровень> — установить боль (none|mild|moderate|severe|very_severe)\n"
         "/set_notes <текст> — добавить заметки\n"
         "/set_attack — отметить приступ\n"
-        "/add_med <тип> <название> [дозировка] — добавить препарат\n"
+        "/add_med <тип> <название> [дозировка]; ... — добавить препараты\n"
+        "/add_sym <симптом>[:1-10], ... — добавить симптомы\n"
         "/recent — показать последние записи\n"
-        "/export [csv|xlsx] — выгрузка записей за 30 дней\n"
-        "/migrebotplus — статус подписки (MVP)"
+        "/export [csv|xlsx] [email] — выгрузка записей за 30 дней\n"
+        "/insights — какие симптомы связаны с сильной болью и приступами\n"
+        "/chart [week|month|quarter|year] — график боли за период\n"
+        "/calendar [ГГГГ-ММ] — календарь оценок боли и приступов за месяц\n"
+        "/search <слова> — поиск по заметкам и описаниям боли\n"
+        "/set_location — район для давления и температуры в записях\n"
+        "/set_email <адрес>|off — почта для выгрузок и ежемесячных отчетов\n"
+        "/delete_me — удалить все свои данные\n"
+        "/migrebotplus — статус и оплата подписки Migrebot+"
     )
-
-
-@router.message(Command("migrebotplus"))
-async def cmd_migrebot_plus(message: Message, user: User) -> None:
-    """Заглушка статуса Migrebot+ (MVP)."""
-    await message.answer(
-        "Migrebot+ скоро появится. Пока доступен базовый дневник и статистика.\n"
-        "Оставьте обратную связь, какие функции вам нужны в подписке."
-    )
-
-
-
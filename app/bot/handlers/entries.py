@@ -1,67 +1,54 @@
 """Handlers для работы с записями дневника."""
 
-import csv
+import asyncio
 import logging
-from collections.abc import Iterable
 from datetime import date, datetime, timedelta
-from io import BytesIO, StringIO
 
 from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from aiogram.types import BufferedInputFile, Message
-from openpyxl import Workbook
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import BufferedInputFile, CallbackQuery, InlineKeyboardMarkup, Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from pydantic import ValidationError
 
 from app.adapters import get_session
+from app.adapters.mail import MailAttachment, OutgoingMail, mail_sender
 from app.adapters.repository import EntryRepository, MedicationRepository, SymptomRepository
-from app.domain.models import Entry, MedicationType, PainLevel, User
-from app.domain.validators import EntryCreate, EntryUpdate, MedicationCreate
+from app.config import settings
+from app.domain.models import MedicationType, PainLevel, User
+from app.domain.validators import EntryCreate, EntryUpdate, MedicationCreate, SymptomCreate
+from app.services import change_log, write_queue
+from app.services.cache import LRUCache, data_versions
+from app.services.export import (
+    EXPORT_MIME_TYPES,
+    build_csv,
+    build_xlsx,
+    cache_export,
+    export_key,
+    forget_export,
+    get_cached_export,
+)
+from app.services.medication_index import MedicationSuggestion, medication_index
+from app.services.sharding import mirror_catalog, resolve_catalog
+from app.services.weather import schedule_weather
 
 logger = logging.getLogger(__name__)
 router = Router()
 
-EXPORT_HEADERS = [
-    "Дата",
-    "Уровень боли (категория)",
-    "Оценка боли (1-10)",
-    "Описание боли",
-    "Приступ",
-    "Заметки",
-]
-
-
-def _entry_to_row(entry: Entry) -> list[str]:
-    """Преобразовать запись в строку для экспорта."""
-    return [
-        entry.entry_date.isoformat(),
-        entry.pain_level.value if entry.pain_level else "",
-        str(entry.pain_score) if entry.pain_score is not None else "",
-        entry.pain_description or "",
-        "да" if entry.had_attack else "нет",
-        entry.notes or "",
-    ]
-
-
-def build_csv(entries: Iterable[Entry]) -> bytes:
-    """Сформировать CSV с записями."""
-    buffer = StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(EXPORT_HEADERS)
-    for entry in entries:
-        writer.writerow(_entry_to_row(entry))
-    return buffer.getvalue().encode("utf-8")
-
-
-def build_xlsx(entries: Iterable[Entry]) -> bytes:
-    """Сформировать XLSX с записями."""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Записи"
-    ws.append(EXPORT_HEADERS)
-    for entry in entries:
-        ws.append(_entry_to_row(entry))
-    stream = BytesIO()
-    wb.save(stream)
-    return stream.getvalue()
+
+MEDICATION_TYPE_VALUES = {medication_type.value for medication_type in MedicationType}
+
+# (пользователь, дата, версия данных) дней, запись которых уже есть.
+# Отсутствие не кэшируется: запись могла появиться в другом процессе бота.
+_existing_entries: LRUCache[tuple[int, date, int], bool] = LRUCache(maxsize=4096)
+
+
+class MedicationCallback(CallbackData, prefix="med"):
+    """Выбор препарата из подсказок."""
+
+    catalog_id: int
+    medication_type: MedicationType
 
 
 @router.message(Command("headache"))
@@ -108,8 +95,11 @@ async def cmd_entry(message: Message, user: User) -> None:
                 entry_date=today,
                 had_attack=False,
             )
-            await repo.create(entry_data)
+            entry = await repo.create(entry_data)
             await session.commit()
+            data_versions.bump(user.id)
+            await change_log.record(change_log.entry_created(entry))
+            schedule_weather(user, entry.id, today)
             await message.answer(
                 f"✅ Запись создана на {today}.\n"
                 "Установите оценку боли командой /set_score <1-10>.\n"
@@ -141,6 +131,11 @@ async def cmd_today(message: Message, user: User) -> None:
             text += f"Приступ: {'да' if entry.had_attack else 'нет'}\n"
             if entry.notes:
                 text += f"Заметки: {entry.notes}\n"
+            if entry.pressure_hpa is not None:
+                text += f"Давление: {entry.pressure_hpa:.0f} гПа"
+                if entry.temperature_c is not None:
+                    text += f", температура: {entry.temperature_c:+.0f} °C"
+                text += "\n"
             if medications:
                 text += f"\nПрепараты ({len(medications)}):\n"
                 for med in medications:
@@ -185,6 +180,39 @@ async def cmd_edit(message: Message, user: User) -> None:
         break
 
 
+async def _entry_exists(user_id: int, entry_date: date) -> bool:
+    """Есть ли у пользователя запись за день; найденные записи кэшируются."""
+    key = (user_id, entry_date, data_versions.get(user_id))
+    if _existing_entries.get(key):
+        return True
+    async for session in get_session():
+        entry = await EntryRepository(session).get_by_user_and_date(user_id, entry_date)
+        break
+    if entry is None:
+        return False
+    _existing_entries.set(key, True)
+    return True
+
+
+async def _queue_update(message: Message, user: User, data: EntryUpdate, reply: str) -> bool:
+    """Отложенная запись: поставить правку в очередь и сразу ответить.
+
+    Как и при обычной записи, правка принимается, только если запись за
+    сегодня уже создана. Возвращает False, если правку нужно записать в БД
+    как обычно.
+    """
+    if not settings.write_behind_enabled:
+        return False
+    today = date.today()
+    if not await _entry_exists(user.id, today):
+        await message.answer("Сначала создайте запись командой /entry.")
+        return True
+    if not await write_queue.enqueue(user.id, today, data):
+        return False
+    await message.answer(reply)
+    return True
+
+
 @router.message(Command("set_pain"))
 async def cmd_set_pain(message: Message, user: User) -> None:
     """Установить уровень боли."""
@@ -206,16 +234,22 @@ async def cmd_set_pain(message: Message, user: User) -> None:
         )
         return
 
+    update_data = EntryUpdate(pain_level=pain_level)
+    reply = f"✅ Уровень боли установлен: {pain_level.value}"
+    if await _queue_update(message, user, update_data, reply):
+        return
+
     async for session in get_session():
         repo = EntryRepository(session)
         entry = await repo.get_by_user_and_date(user.id, today)
         if entry is None:
             await message.answer("Сначала создайте запись командой /entry.")
         else:
-            update_data = EntryUpdate(pain_level=pain_level)
             await repo.update(entry.id, update_data)
             await session.commit()
-            await message.answer(f"✅ Уровень боли установлен: {pain_level.value}")
+            data_versions.bump(user.id)
+            await change_log.record(change_log.entry_updated(entry, update_data))
+            await message.answer(reply)
         break
 
 
@@ -238,16 +272,22 @@ async def cmd_set_score(message: Message, user: User) -> None:
         await message.answer("Оценка должна быть в диапазоне 1-10.")
         return
 
+    update_data = EntryUpdate(pain_score=score)
+    reply = f"✅ Оценка боли установлена: {score}/10."
+    if await _queue_update(message, user, update_data, reply):
+        return
+
     async for session in get_session():
         repo = EntryRepository(session)
         entry = await repo.get_by_user_and_date(user.id, today)
         if entry is None:
             await message.answer("Сначала создайте запись командой /entry.")
         else:
-            update_data = EntryUpdate(pain_score=score)
             await repo.update(entry.id, update_data)
             await session.commit()
-            await message.answer(f"✅ Оценка боли установлена: {score}/10.")
+            data_versions.bump(user.id)
+            await change_log.record(change_log.entry_updated(entry, update_data))
+            await message.answer(reply)
         break
 
 
@@ -265,16 +305,22 @@ async def cmd_set_pain_description(message: Message, user: User) -> None:
 
     description = args[0]
 
+    update_data = EntryUpdate(pain_description=description)
+    reply = "✅ Описание боли обновлено."
+    if await _queue_update(message, user, update_data, reply):
+        return
+
     async for session in get_session():
         repo = EntryRepository(session)
         entry = await repo.get_by_user_and_date(user.id, today)
         if entry is None:
             await message.answer("Сначала создайте запись командой /entry.")
         else:
-            update_data = EntryUpdate(pain_description=description)
             await repo.update(entry.id, update_data)
             await session.commit()
-            await message.answer("✅ Описание боли обновлено.")
+            data_versions.bump(user.id)
+            await change_log.record(change_log.entry_updated(entry, update_data))
+            await message.answer(reply)
         break
 
 
@@ -289,16 +335,22 @@ async def cmd_set_notes(message: Message, user: User) -> None:
 
     notes = args[0]
 
+    update_data = EntryUpdate(notes=notes)
+    reply = "✅ Заметки обновлены."
+    if await _queue_update(message, user, update_data, reply):
+        return
+
     async for session in get_session():
         repo = EntryRepository(session)
         entry = await repo.get_by_user_and_date(user.id, today)
         if entry is None:
             await message.answer("Сначала создайте запись командой /entry.")
         else:
-            update_data = EntryUpdate(notes=notes)
             await repo.update(entry.id, update_data)
             await session.commit()
-            await message.answer("✅ Заметки обновлены.")
+            data_versions.bump(user.id)
+            await change_log.record(change_log.entry_updated(entry, update_data))
+            await message.answer(reply)
         break
 
 
@@ -306,39 +358,112 @@ async def cmd_set_notes(message: Message, user: User) -> None:
 async def cmd_set_attack(message: Message, user: User) -> None:
     """Отметить приступ."""
     today = date.today()
+    update_data = EntryUpdate(had_attack=True)
+    reply = "✅ Приступ отмечен в записи."
+    if await _queue_update(message, user, update_data, reply):
+        return
+
     async for session in get_session():
         repo = EntryRepository(session)
         entry = await repo.get_by_user_and_date(user.id, today)
         if entry is None:
             await message.answer("Сначала создайте запись командой /entry.")
         else:
-            update_data = EntryUpdate(had_attack=True)
             await repo.update(entry.id, update_data)
             await session.commit()
-            await message.answer("✅ Приступ отмечен в записи.")
+            data_versions.bump(user.id)
+            await change_log.record(change_log.entry_updated(entry, update_data))
+            await message.answer(reply)
         break
 
 
+def _split_items(text: str, separators: str) -> list[str]:
+    """Разбить аргументы команды на элементы по разделителям."""
+    for sep in separators[1:]:
+        text = text.replace(sep, separators[0])
+    return [item.strip() for item in text.split(separators[0]) if item.strip()]
+
+
+def parse_medications(text: str) -> list[tuple[MedicationType, str, str | None]]:
+    """Разобрать «<тип> <название> [дозировка]; ...» в список препаратов."""
+    items = []
+    for item in _split_items(text, ";\n"):
+        parts = item.split(maxsplit=2)
+        if len(parts) < 2:
+            raise ValueError(f"Не хватает названия препарата: «{item}»")
+        try:
+            med_type = MedicationType(parts[0].lower())
+        except ValueError:
+            raise ValueError(f"Неверный тип препарата: «{parts[0]}»") from None
+        items.append((med_type, parts[1], parts[2] if len(parts) > 2 else None))
+    return items
+
+
+def parse_symptoms(text: str) -> list[tuple[str, int | None]]:
+    """Разобрать «<симптом>[:тяжесть], ...» в список симптомов."""
+    items = []
+    for item in _split_items(text, ",;\n"):
+        name, _, severity_str = item.partition(":")
+        if not severity_str:
+            head, _, tail = item.rpartition(" ")
+            if head and tail.isdigit():
+                name, severity_str = head, tail
+        name = name.strip()
+        severity_str = severity_str.strip()
+        if not name:
+            raise ValueError(f"Не указано название симптома: «{item}»")
+        if severity_str:
+            if not severity_str.isdigit() or not 1 <= int(severity_str) <= 10:
+                raise ValueError(f"Тяжесть должна быть числом 1-10: «{item}»")
+            items.append((name, int(severity_str)))
+        else:
+            items.append((name, None))
+    return items
+
+
+def _suggestions_keyboard(suggestions: list[MedicationSuggestion]) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    for suggestion in suggestions:
+        builder.button(
+            text=suggestion.name,
+            callback_data=MedicationCallback(
+                catalog_id=suggestion.catalog_id,
+                medication_type=suggestion.medication_type,
+            ),
+        )
+    builder.adjust(2)
+    return builder.as_markup()
+
+
 @router.message(Command("add_med"))
 async def cmd_add_med(message: Message, user: User) -> None:
-    """Добавить препарат."""
+    """Добавить один или несколько препаратов."""
     today = date.today()
-    args = message.text.split(maxsplit=2)[1:] if message.text else []
-    if len(args) < 2:
-        await message.answer(
-            "Используйте: /add_med <тип> <название> [дозировка]\n"
-            "Типы: preventive, abortive, other"
-        )
+    args = message.text.split(maxsplit=1)[1:] if message.text else []
+    usage = (
+        "Используйте: /add_med <тип> <название> [дозировка]\n"
+        "Несколько препаратов разделяйте «;» или переносом строки.\n"
+        "Типы: preventive, abortive, other"
+    )
+    # Без аргументов или с одним словом, не являющимся типом, — подсказки из индекса
+    prefix = args[0].strip() if args else ""
+    if not prefix or (
+        len(prefix.split()) == 1 and prefix.lower() not in MEDICATION_TYPE_VALUES
+    ):
+        suggestions = medication_index.suggest(user.id, prefix)
+        if suggestions:
+            await message.answer(
+                usage + "\n\nИли выберите из ваших частых препаратов:",
+                reply_markup=_suggestions_keyboard(suggestions),
+            )
+        else:
+            await message.answer(usage)
         return
 
-    med_type_str = args[0].lower()
-    med_name = args[1]
-    dosage = args[2] if len(args) > 2 else None
-
     try:
-        med_type = MedicationType(med_type_str)
-    except ValueError:
-        await message.answer("Неверный тип препарата. Используйте: preventive, abortive, other")
+        parsed = parse_medications(args[0])
+    except ValueError as exc:
+        await message.answer(f"{exc}. Типы: preventive, abortive, other")
         return
 
     async for session in get_session():
@@ -348,16 +473,114 @@ async def cmd_add_med(message: Message, user: User) -> None:
             await message.answer("Сначала создайте запись командой /entry.")
         else:
             med_repo = MedicationRepository(session)
-            med_data = MedicationCreate(
-                entry_id=entry.id,
-                name=med_name,
-                medication_type=med_type.value,
-                dosage=dosage,
-                taken_at=datetime.utcnow(),
+            taken_at = datetime.utcnow()
+            try:
+                med_data = [
+                    MedicationCreate(
+                        entry_id=entry.id,
+                        name=med_name,
+                        medication_type=med_type.value,
+                        dosage=dosage,
+                        taken_at=taken_at,
+                    )
+                    for med_type, med_name, dosage in parsed
+                ]
+            except ValidationError:
+                await message.answer("Слишком длинное название или дозировка препарата.")
+                break
+            # id препаратов выдает общий справочник на шарде 0
+            catalog = await resolve_catalog([data.name for data in med_data])
+            med_data = [
+                data.model_copy(update={"catalog_id": catalog_id, "name": name})
+                for data, (catalog_id, name) in zip(med_data, catalog, strict=True)
+            ]
+            medications = await med_repo.create_many(med_data)
+            await session.commit()
+            data_versions.bump(user.id)
+            await change_log.record(change_log.medications_added(user.id, medications))
+            for med in medications:
+                medication_index.add(med.catalog_id, med.name)
+                medication_index.record_usage(user.id, med.catalog_id, med.medication_type.value)
+            names = ", ".join(med.name for med in medications)
+            await message.answer(f"✅ Препараты добавлены ({len(medications)}): {names}")
+        break
+
+
+@router.callback_query(MedicationCallback.filter())
+async def cb_add_med(
+    callback: CallbackQuery, callback_data: MedicationCallback, user: User
+) -> None:
+    """Добавить препарат, выбранный из подсказок."""
+    name = medication_index.name_of(callback_data.catalog_id)
+    if name is None:
+        await callback.answer("Препарат не найден.", show_alert=True)
+        return
+
+    today = date.today()
+    async for session in get_session():
+        entry_repo = EntryRepository(session)
+        entry = await entry_repo.get_by_user_and_date(user.id, today)
+        if entry is None:
+            await callback.answer("Сначала создайте запись командой /entry.", show_alert=True)
+        else:
+            await mirror_catalog([(callback_data.catalog_id, name)])
+            med_repo = MedicationRepository(session)
+            med = await med_repo.create(
+                MedicationCreate(
+                    entry_id=entry.id,
+                    name=name,
+                    catalog_id=callback_data.catalog_id,
+                    medication_type=callback_data.medication_type,
+                    taken_at=datetime.utcnow(),
+                )
             )
-            await med_repo.create(med_data)
             await session.commit()
-            await message.answer(f"✅ Препарат добавлен: {med_name}")
+            data_versions.bump(user.id)
+            await change_log.record(change_log.medications_added(user.id, [med]))
+            medication_index.record_usage(user.id, med.catalog_id, med.medication_type.value)
+            await callback.answer(f"✅ Препарат добавлен: {med.name}")
+        break
+
+
+@router.message(Command("add_sym"))
+async def cmd_add_sym(message: Message, user: User) -> None:
+    """Добавить один или несколько симптомов."""
+    today = date.today()
+    args = message.text.split(maxsplit=1)[1:] if message.text else []
+    if not args:
+        await message.answer(
+            "Используйте: /add_sym <симптом>[:тяжесть 1-10], ...\n"
+            "Пример: /add_sym тошнота:6, светобоязнь:8, аура"
+        )
+        return
+
+    try:
+        parsed = parse_symptoms(args[0])
+    except ValueError as exc:
+        await message.answer(str(exc))
+        return
+
+    async for session in get_session():
+        entry_repo = EntryRepository(session)
+        entry = await entry_repo.get_by_user_and_date(user.id, today)
+        if entry is None:
+            await message.answer("Сначала создайте запись командой /entry.")
+        else:
+            sym_repo = SymptomRepository(session)
+            try:
+                sym_data = [
+                    SymptomCreate(entry_id=entry.id, name=name, severity=severity)
+                    for name, severity in parsed
+                ]
+            except ValidationError:
+                await message.answer("Слишком длинное название симптома.")
+                break
+            symptoms = await sym_repo.create_many(sym_data)
+            await session.commit()
+            data_versions.bump(user.id)
+            await change_log.record(change_log.symptoms_added(user.id, symptoms))
+            names = ", ".join(sym.name for sym in symptoms)
+            await message.answer(f"✅ Симптомы добавлены ({len(symptoms)}): {names}")
         break
 
 
@@ -386,14 +609,30 @@ async def cmd_recent(message: Message, user: User) -> None:
 async def cmd_export(message: Message, user: User) -> None:
     """Сформировать выгрузку записей в CSV или XLSX (30 дней)."""
     args = message.text.split()[1:] if message.text else []
+    to_email = "email" in (arg.lower() for arg in args)
+    args = [arg for arg in args if arg.lower() != "email"]
     export_format = args[0].lower() if args else "csv"
     if export_format not in {"csv", "xlsx"}:
-        await message.answer("Укажите формат: /export csv или /export xlsx")
+        await message.answer("Укажите формат: /export csv или /export xlsx [email]")
+        return
+    if to_email and (not settings.mail_enabled or not user.email):
+        await message.answer("Сначала укажите адрес: /set_email doctor@example.com")
         return
 
     today = date.today()
     start_date = today - timedelta(days=30)
 
+    key = export_key(user.id, export_format, start_date, today)
+    cached = None if to_email else get_cached_export(key)
+    if cached is not None:
+        # Данные не менялись: файл уже лежит в Telegram, повторная загрузка не нужна
+        file_id, caption = cached
+        try:
+            await message.answer_document(document=file_id, caption=caption)
+            return
+        except TelegramBadRequest:
+            forget_export(key)
+
     async for session in get_session():
         repo = EntryRepository(session)
         entries = await repo.list_by_date_range(user.id, start_date, today)
@@ -401,21 +640,42 @@ async def cmd_export(message: Message, user: User) -> None:
             await message.answer("Записей за последние 30 дней нет.")
             break
 
-        if export_format == "csv":
-            payload = build_csv(entries)
-        else:
-            payload = build_xlsx(entries)
+        # Формирование файла синхронное, поэтому выполняется вне event loop
+        builder = build_csv if export_format == "csv" else build_xlsx
+        payload = await asyncio.to_thread(builder, entries)
 
         filename = (
             f"migrebot_entries_{start_date.isoformat()}_"
             f"{today.isoformat()}.{export_format}"
         )
-        file = BufferedInputFile(payload, filename=filename)
-        await message.answer_document(
-            document=file,
-            caption=(
-                f"Выгрузка {len(entries)} записей за {start_date} — {today}.\n"
-                "Включены оценка и описание боли."
-            ),
+        caption = (
+            f"Выгрузка {len(entries)} записей за {start_date} — {today}.\n"
+            "Включены оценка и описание боли."
         )
+        if to_email:
+            # Письмо уходит из очереди в фоне, хендлер не ждет SMTP
+            queued = mail_sender.enqueue(
+                OutgoingMail(
+                    to=user.email,
+                    subject=f"Migrebot: выгрузка записей за {start_date} — {today}",
+                    body=caption,
+                    attachments=[
+                        MailAttachment(
+                            filename=filename,
+                            content=payload,
+                            mime_type=EXPORT_MIME_TYPES[export_format],
+                        )
+                    ],
+                )
+            )
+            if queued:
+                await message.answer(f"📧 Выгрузка будет отправлена на {user.email}.")
+            else:
+                await message.answer("Почта сейчас перегружена, попробуйте позже.")
+            break
+
+        file = BufferedInputFile(payload, filename=filename)
+        sent = await message.answer_document(document=file, caption=caption)
+        if sent.document is not None:
+            cache_export(key, sent.document.file_id, caption)
         break
@@ -0,0 +1,138 @@
+"""Поиск по заметкам и описаниям боли."""
+
+import hashlib
+import logging
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from redis.exceptions import RedisError
+
+from app.adapters import get_session, redis_client
+from app.adapters.repository import EntryRepository
+from app.domain.models import Entry, User
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+PAGE_SIZE = 5
+SNIPPET_LENGTH = 120
+QUERY_TTL_SECONDS = 60 * 60
+
+
+class SearchCallback(CallbackData, prefix="search"):
+    """Курсор следующей страницы результатов запроса query_id."""
+
+    query_id: str
+    rank: float
+    entry_id: int
+
+
+def _query_key(user_id: int) -> str:
+    """Хеш «query_id → запрос» с недавними поисками пользователя."""
+    return f"search:{user_id}"
+
+
+def query_id(query: str) -> str:
+    """Короткий id запроса: курсор страницы имеет смысл только для своего запроса."""
+    return hashlib.blake2b(query.encode(), digest_size=6).hexdigest()
+
+
+def _snippet(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= SNIPPET_LENGTH else text[: SNIPPET_LENGTH - 1] + "…"
+
+
+def format_results(query: str, hits: list[tuple[Entry, float]]) -> str:
+    """Сформировать текст страницы результатов."""
+    text = f"🔍 Результаты по запросу «{query}»:\n\n"
+    for entry, _ in hits:
+        text += f"📅 {entry.entry_date}"
+        if entry.pain_score is not None:
+            text += f" — {entry.pain_score}/10"
+        if entry.had_attack:
+            text += ", приступ"
+        text += "\n"
+        if entry.pain_description:
+            text += f"  Описание: {_snippet(entry.pain_description)}\n"
+        if entry.notes:
+            text += f"  Заметки: {_snippet(entry.notes)}\n"
+        text += "\n"
+    return text
+
+
+def _next_page_keyboard(query: str, hits: list[tuple[Entry, float]]) -> InlineKeyboardMarkup | None:
+    if len(hits) < PAGE_SIZE:
+        return None
+    last_entry, last_rank = hits[-1]
+    builder = InlineKeyboardBuilder()
+    builder.button(
+        text="Далее ▶",
+        callback_data=SearchCallback(
+            query_id=query_id(query), rank=last_rank, entry_id=last_entry.id
+        ),
+    )
+    return builder.as_markup()
+
+
+@router.message(Command("search"))
+async def cmd_search(message: Message, user: User) -> None:
+    """Найти записи по словам из описания боли и заметок."""
+    args = message.text.split(maxsplit=1)[1:] if message.text else []
+    if not args or not args[0].strip():
+        await message.answer("Укажите слова для поиска: /search пульсирующая висок")
+        return
+
+    query = args[0].strip()
+    async for session in get_session():
+        hits = await EntryRepository(session).search(user.id, query, limit=PAGE_SIZE)
+        if not hits:
+            await message.answer("Ничего не найдено.")
+            break
+
+        keyboard = _next_page_keyboard(query, hits)
+        if keyboard is not None:
+            # Запрос хранится в Redis: в callback_data он не помещается
+            try:
+                await redis_client.hash_set(
+                    _query_key(user.id), query_id(query), query, ex=QUERY_TTL_SECONDS
+                )
+            except (RedisError, RuntimeError):
+                logger.warning("Search pagination disabled: redis unavailable", exc_info=True)
+                keyboard = None
+        await message.answer(format_results(query, hits), reply_markup=keyboard)
+        break
+
+
+@router.callback_query(SearchCallback.filter())
+async def cb_search_next(
+    callback: CallbackQuery, callback_data: SearchCallback, user: User
+) -> None:
+    """Показать следующую страницу результатов поиска."""
+    try:
+        query = await redis_client.hash_get(_query_key(user.id), callback_data.query_id)
+    except (RedisError, RuntimeError):
+        query = None
+    if query is None:
+        await callback.answer("Поиск устарел, повторите /search.", show_alert=True)
+        return
+
+    async for session in get_session():
+        hits = await EntryRepository(session).search(
+            user.id,
+            query,
+            limit=PAGE_SIZE,
+            after=(callback_data.rank, callback_data.entry_id),
+        )
+        if not hits:
+            await callback.answer("Больше результатов нет.")
+            break
+
+        if callback.message is not None:
+            await callback.message.answer(
+                format_results(query, hits), reply_markup=_next_page_keyboard(query, hits)
+            )
+        await callback.answer()
+        break
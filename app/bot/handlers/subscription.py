@@ -0,0 +1,78 @@
+"""Подписка Migrebot+ и оплата в Telegram Stars."""
+
+import logging
+from datetime import datetime, timedelta
+
+from aiogram import F, Router
+from aiogram.filters import Command
+from aiogram.types import LabeledPrice, Message, PreCheckoutQuery
+from sqlalchemy.exc import IntegrityError
+
+from app.adapters import get_session
+from app.adapters.repository import SubscriptionRepository
+from app.config import settings
+from app.domain.models import User
+from app.services.entitlements import entitlements
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+PLUS_PLAN = "plus"
+PLUS_PAYLOAD = "migrebot_plus"
+STARS_CURRENCY = "XTR"
+
+
+@router.message(Command("migrebotplus"))
+async def cmd_migrebot_plus(message: Message, user: User) -> None:
+    """Статус Migrebot+ и счет на оплату."""
+    until = entitlements.active_until(user.id)
+    if until is not None:
+        await message.answer(
+            f"⭐ Migrebot+ активна до {until:%d.%m.%Y}.\nОплата ниже продлит подписку."
+        )
+    await message.answer_invoice(
+        title="Migrebot+",
+        description=f"Доступ к функциям Migrebot+ на {settings.plus_period_days} дней.",
+        payload=PLUS_PAYLOAD,
+        currency=STARS_CURRENCY,
+        prices=[LabeledPrice(label="Migrebot+", amount=settings.plus_price_stars)],
+    )
+
+
+@router.pre_checkout_query()
+async def on_pre_checkout(query: PreCheckoutQuery) -> None:
+    """Подтвердить оплату, если счет выставлен ботом."""
+    if query.invoice_payload != PLUS_PAYLOAD or query.currency != STARS_CURRENCY:
+        await query.answer(ok=False, error_message="Счет устарел, запросите новый: /migrebotplus")
+        return
+    await query.answer(ok=True)
+
+
+@router.message(F.successful_payment)
+async def on_successful_payment(message: Message, user: User) -> None:
+    """Продлить подписку после оплаты."""
+    payment = message.successful_payment
+    async for session in get_session():
+        repo = SubscriptionRepository(session)
+        now = datetime.utcnow()
+        current = await repo.active_until(user.id)
+        starts_at = max(now, current) if current is not None else now
+        try:
+            subscription = await repo.create(
+                user_id=user.id,
+                plan=PLUS_PLAN,
+                starts_at=starts_at,
+                expires_at=starts_at + timedelta(days=settings.plus_period_days),
+                telegram_charge_id=payment.telegram_payment_charge_id,
+                stars_amount=payment.total_amount,
+            )
+            await session.commit()
+        except IntegrityError:
+            # Повторная доставка того же платежа
+            await session.rollback()
+            logger.info("Duplicate payment %s ignored", payment.telegram_payment_charge_id)
+            return
+        break
+
+    await entitlements.notify(user.id)
+    await message.answer(f"⭐ Спасибо! Migrebot+ активна до {subscription.expires_at:%d.%m.%Y}.")
@@ -0,0 +1,52 @@
+"""Местоположение пользователя для данных о погоде."""
+
+from datetime import date
+
+from aiogram import F, Router
+from aiogram.filters import Command
+from aiogram.types import KeyboardButton, Message, ReplyKeyboardMarkup, ReplyKeyboardRemove
+
+from app.adapters import get_session
+from app.adapters.repository import EntryRepository, UserRepository
+from app.adapters.weather import weather_client
+from app.domain.models import User
+from app.services.weather import schedule_weather
+
+router = Router()
+
+
+@router.message(Command("set_location"))
+async def cmd_set_location(message: Message, user: User) -> None:
+    """Попросить местоположение для привязки давления и температуры."""
+    keyboard = ReplyKeyboardMarkup(
+        keyboard=[[KeyboardButton(text="📍 Отправить местоположение", request_location=True)]],
+        resize_keyboard=True,
+        one_time_keyboard=True,
+    )
+    await message.answer(
+        "Отправьте местоположение, чтобы к записям добавлялись атмосферное давление "
+        "и температура. Сохраняется только район (~25 км), а не точные координаты.",
+        reply_markup=keyboard,
+    )
+
+
+@router.message(F.location)
+async def on_location(message: Message, user: User) -> None:
+    """Сохранить район пользователя."""
+    latitude, longitude = weather_client.bucket(
+        message.location.latitude, message.location.longitude
+    )
+    today = date.today()
+    async for session in get_session():
+        await UserRepository(session).set_location(user.id, latitude, longitude)
+        entry = await EntryRepository(session).get_by_user_and_date(user.id, today)
+        await session.commit()
+        break
+
+    user = user.model_copy(update={"latitude": latitude, "longitude": longitude})
+    if entry is not None and entry.pressure_hpa is None:
+        schedule_weather(user, entry.id, today)
+    await message.answer(
+        "✅ Местоположение сохранено. Давление и температура будут добавляться к записям.",
+        reply_markup=ReplyKeyboardRemove(),
+    )
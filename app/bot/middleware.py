@@ -1,18 +1,92 @@
 """Middleware для бота."""
 
+import asyncio
+import cProfile
 import logging
-from time import perf_counter
+import random
+from datetime import datetime
+from pathlib import Path
+from time import monotonic, perf_counter
 from typing import Any, Awaitable, Callable
 from uuid import uuid4
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, Update, User as TelegramUser
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update, User as TelegramUser
+from redis.exceptions import RedisError
 
-from app.adapters import get_session
+from app.adapters import get_session, redis_client, tenant_key, use_shard, use_tenant
 from app.adapters.repository import UserRepository
+from app.bot.tenants import tenant_bots
+from app.config import settings
+from app.domain.models import ShardPlacement
+from app.monitoring.memory import memory_monitor, rss_bytes
+from app.services.entitlements import entitlements
+from app.services.sharding import shard_router
 
 logger = logging.getLogger(__name__)
 
+# Token bucket: KEYS[1] — состояние корзины, KEYS[2] — флаг отправленного предупреждения.
+# ARGV: емкость, пополнение в секунду, стоимость апдейта, TTL предупреждения.
+# Ответ: 1 — пропустить, -1 — отклонить и предупредить, 0 — отклонить молча.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = tokens >= cost
+if allowed then
+    tokens = tokens - cost
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+if allowed then
+    return 1
+end
+if redis.call('SET', KEYS[2], '1', 'NX', 'EX', tonumber(ARGV[4])) then
+    return -1
+end
+return 0
+"""
+
+# Стоимость команд в токенах; остальные апдейты стоят 1.
+COMMAND_COSTS = {
+    "export": 5,
+    "chart": 3,
+    "insights": 2,
+}
+
+
+def command_name(event: TelegramObject) -> str | None:
+    """Имя команды из текста сообщения (без «/» и @username бота)."""
+    if isinstance(event, Message) and event.text and event.text.startswith("/"):
+        return event.text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower() or None
+    return None
+
+
+def is_payment(event: TelegramObject) -> bool:
+    """Сообщение об успешной оплате: его нельзя отбрасывать, деньги уже списаны."""
+    return isinstance(event, Message) and event.successful_payment is not None
+
+
+def _memory_tag(event: TelegramObject, update_type: str) -> str:
+    """Метка апдейта для пиков памяти: команда или префикс callback data."""
+    command = command_name(event)
+    if command is not None:
+        return f"/{command}"
+    if isinstance(event, CallbackQuery) and event.data:
+        return f"callback:{event.data.split(':', 1)[0]}"
+    return update_type
+
 
 class LoggingMiddleware(BaseMiddleware):
     """Простая трассировка апдейтов."""
@@ -25,6 +99,7 @@ class LoggingMiddleware(BaseMiddleware):
     ) -> Any:
         trace_id = uuid4().hex
         data["trace_id"] = trace_id
+        memory_started = memory_monitor.begin() if memory_monitor.active else None
         started = perf_counter()
         try:
             return await handler(event, data)
@@ -50,17 +125,267 @@ class LoggingMiddleware(BaseMiddleware):
                 from_user = source.from_user  # type: ignore[attr-defined]
                 user_id = from_user.id if from_user else None
 
-            logger.info(
-                "trace_id=%s update_type=%s user_id=%s elapsed_ms=%.1f",
-                trace_id,
-                update_type,
-                user_id,
-                elapsed_ms,
+            if memory_started is None:
+                logger.info(
+                    "trace_id=%s update_type=%s user_id=%s elapsed_ms=%.1f",
+                    trace_id,
+                    update_type,
+                    user_id,
+                    elapsed_ms,
+                )
+            else:
+                peak = memory_monitor.end(memory_started, _memory_tag(event, update_type))
+                logger.info(
+                    "trace_id=%s update_type=%s user_id=%s elapsed_ms=%.1f "
+                    "mem_peak_kb=%.0f rss_mb=%.1f",
+                    trace_id,
+                    update_type,
+                    user_id,
+                    elapsed_ms,
+                    peak / 1024,
+                    rss_bytes() / 2**20,
+                )
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """Выборочное профилирование медленных апдейтов через cProfile.
+
+    Профилируется доля апдейтов settings.profiling_sample_rate; профиль
+    сохраняется, только если обработка заняла больше порога. Одновременно
+    активен один профайлер, поэтому в профиль попадают и другие корутины,
+    работавшие в это время на event loop.
+    """
+
+    def __init__(self) -> None:
+        self._active = False
+
+    @staticmethod
+    def _dump(profiler: cProfile.Profile, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if (
+            not settings.profiling_enabled
+            or self._active
+            or random.random() >= settings.profiling_sample_rate
+        ):
+            return await handler(event, data)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        started = perf_counter()
+        profiler.enable()
+        try:
+            return await handler(event, data)
+        finally:
+            profiler.disable()
+            self._active = False
+            elapsed_ms = (perf_counter() - started) * 1000
+            if elapsed_ms >= settings.profiling_threshold_ms:
+                command = command_name(event) or event.__class__.__name__.lower()
+                trace_id = data.get("trace_id", "notrace")
+                filename = (
+                    f"{datetime.utcnow():%Y%m%dT%H%M%S}_{command}_{trace_id}_"
+                    f"{elapsed_ms:.0f}ms.prof"
+                )
+                path = Path(settings.profiling_dir) / filename
+                try:
+                    await asyncio.to_thread(self._dump, profiler, path)
+                    logger.info(
+                        "trace_id=%s profile saved to %s elapsed_ms=%.1f",
+                        trace_id,
+                        path,
+                        elapsed_ms,
+                    )
+                except OSError:
+                    logger.warning("Failed to save profile %s", path, exc_info=True)
+
+
+class ConcurrencyMiddleware(BaseMiddleware):
+    """Ограниченное параллельное выполнение с порядком внутри пользователя.
+
+    Апдейты одного пользователя выполняются строго по очереди (FIFO-блокировка
+    на пользователя), разные пользователи — параллельно, но не больше limit
+    одновременно. Глобальный слот занимается только после получения очереди
+    пользователя, чтобы флуд одного пользователя не блокировал остальных.
+    Должен быть первым собственным внешним middleware: блокировка берется
+    до любых await, в порядке поступления апдейтов.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._semaphore = asyncio.Semaphore(limit)
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._waiting: dict[int, int] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        from_user: TelegramUser | None = data.get("event_from_user")
+        if from_user is None:
+            async with self._semaphore:
+                return await handler(event, data)
+
+        key = from_user.id
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            async with lock, self._semaphore:
+                return await handler(event, data)
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._locks[key]
+
+
+class TenantMiddleware(BaseMiddleware):
+    """Определение арендатора по боту, получившему апдейт.
+
+    Внешний middleware, первым в цепочке: ключи Redis, репозитории и кэши
+    ниже по цепочке работают в пределах этого арендатора.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        tenant_id = tenant_bots.tenant_of(data["bot"])
+        data["tenant_id"] = tenant_id
+        with use_tenant(tenant_id):
+            return await handler(event, data)
+
+
+class DeduplicationMiddleware(BaseMiddleware):
+    """Пропуск повторно доставленных апдейтов по update_id.
+
+    Внешний middleware: один SET NX в Redis на апдейт до любых хендлеров.
+    Если обработка упала, отметка снимается, чтобы повтор мог пройти.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not settings.dedup_enabled or not isinstance(event, Update):
+            return await handler(event, data)
+
+        # update_id уникален только в пределах одного бота
+        key = tenant_key(f"update:{event.update_id}")
+        try:
+            fresh = await redis_client.set_if_absent(key, b"1", ex=settings.dedup_ttl_seconds)
+        except (RedisError, RuntimeError):
+            logger.warning("Deduplication skipped: redis unavailable", exc_info=True)
+            return await handler(event, data)
+
+        if not fresh:
+            logger.info("Duplicate update skipped update_id=%s", event.update_id)
+            return None
+
+        try:
+            return await handler(event, data)
+        except Exception:
+            try:
+                await redis_client.delete(key)
+            except (RedisError, RuntimeError):
+                logger.warning("Failed to release update_id=%s", event.update_id)
+            raise
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Ограничение частоты апдейтов пользователя до обращения к БД.
+
+    Одна атомарная проверка token bucket в Redis на апдейт. Если Redis
+    недоступен, апдейт пропускается без ограничения. Сообщения об оплате
+    не ограничиваются.
+    """
+
+    def __init__(self) -> None:
+        redis_client.register_script("token_bucket", TOKEN_BUCKET_LUA)
+
+    @staticmethod
+    def _cost(event: TelegramObject) -> int:
+        command = command_name(event)
+        return COMMAND_COSTS.get(command, 1) if command else 1
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        from_user: TelegramUser | None = getattr(event, "from_user", None)
+        if not settings.throttle_enabled or from_user is None or is_payment(event):
+            return await handler(event, data)
+
+        try:
+            verdict = await redis_client.run_script(
+                "token_bucket",
+                keys=(
+                    tenant_key(f"throttle:{from_user.id}"),
+                    tenant_key(f"throttle:{from_user.id}:notice"),
+                ),
+                args=(
+                    settings.throttle_capacity,
+                    settings.throttle_refill_per_sec,
+                    self._cost(event),
+                    settings.throttle_notice_ttl,
+                ),
             )
+        except (RedisError, RuntimeError):
+            logger.warning("Throttling skipped: redis unavailable", exc_info=True)
+            return await handler(event, data)
+
+        if verdict == 1:
+            return await handler(event, data)
+
+        logger.info("Throttled update user_id=%s", from_user.id)
+        if verdict == -1:
+            text = "Слишком много запросов. Подождите немного и попробуйте снова."
+            if isinstance(event, Message):
+                await event.answer(text)
+            elif isinstance(event, CallbackQuery):
+                await event.answer(text, show_alert=False)
+        return None
+
+
+MOVING_TEXT = "⏳ Ваши данные переносятся на другой сервер, повторите через минуту."
+# Оплата во время переноса ждет его окончания, опрашивая справочник
+MOVING_POLL_SECONDS = 5.0
+MOVING_PAYMENT_WAIT_SECONDS = 600.0
 
 
 class UserMiddleware(BaseMiddleware):
-    """Middleware для получения/создания пользователя."""
+    """Middleware для получения/создания пользователя.
+
+    Сначала по справочнику шардов определяет БД пользователя и делает ее
+    текущей для хендлера.
+    """
+
+    @staticmethod
+    async def _wait_moved(telegram_id: int) -> ShardPlacement:
+        """Дождаться конца переноса пользователя (не дольше MOVING_PAYMENT_WAIT_SECONDS)."""
+        deadline = monotonic() + MOVING_PAYMENT_WAIT_SECONDS
+        while True:
+            await asyncio.sleep(MOVING_POLL_SECONDS)
+            shard_router.forget(telegram_id)
+            placement = await shard_router.resolve(telegram_id)
+            if not placement.moving or monotonic() >= deadline:
+                return placement
 
     async def __call__(
         self,
@@ -82,13 +407,59 @@ class UserMiddleware(BaseMiddleware):
         if telegram_user is None:
             return await handler(event, data)
 
-        async for session in get_session():
-            repo = UserRepository(session)
-            user = await repo.get_or_create(
-                telegram_id=telegram_user.id, username=telegram_user.username
-            )
-            data["user"] = user
-            await session.commit()
-            break
+        placement = await shard_router.resolve(telegram_user.id)
+        if placement.moving and is_payment(event):
+            # Запись на старый шард во время копирования потерялась бы
+            placement = await self._wait_moved(telegram_user.id)
+            if placement.moving:
+                logger.error(
+                    "Payment of user %s is applied on shard %d during a move",
+                    telegram_user.id,
+                    placement.shard,
+                )
+        elif placement.moving:
+            if isinstance(event, Message):
+                await event.answer(MOVING_TEXT)
+            elif isinstance(event, CallbackQuery):
+                await event.answer(MOVING_TEXT)
+            return None
+
+        # Все get_session() до конца обработки апдейта идут в шард пользователя
+        with use_shard(placement.shard):
+            async for session in get_session():
+                repo = UserRepository(session)
+                user = await repo.get_or_create(
+                    telegram_id=telegram_user.id, username=telegram_user.username
+                )
+                data["user"] = user
+                await session.commit()
+                break
+
+            return await handler(event, data)
+
+
+class EntitlementMiddleware(BaseMiddleware):
+    """Проверка Migrebot+ после UserMiddleware.
+
+    Добавляет в data флаг plus; хендлеры с флагом plus (flags={"plus": True})
+    недоступны без подписки. Проверка идет по кэшу в памяти процесса.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("user")
+        plus = user is not None and entitlements.is_plus(user.id)
+        data["plus"] = plus
+        if plus or not get_flag(data, "plus"):
+            return await handler(event, data)
 
-        return await handler(event, data)
+        text = "⭐ Эта функция доступна в Migrebot+. Подробнее: /migrebotplus"
+        if isinstance(event, Message):
+            await event.answer(text)
+        elif isinstance(event, CallbackQuery):
+            await event.answer(text, show_alert=True)
+        return None
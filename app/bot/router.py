@@ -1,19 +1,58 @@
 from aiogram import Dispatcher, Router
 
-from app.bot.handlers import common, entries
-from app.bot.middleware import LoggingMiddleware, UserMiddleware
+from app.bot.handlers import (
+    account,
+    analytics,
+    calendar,
+    common,
+    entries,
+    search,
+    subscription,
+    weather,
+)
+from app.bot.middleware import (
+    ConcurrencyMiddleware,
+    DeduplicationMiddleware,
+    EntitlementMiddleware,
+    LoggingMiddleware,
+    ProfilingMiddleware,
+    TenantMiddleware,
+    ThrottlingMiddleware,
+    UserMiddleware,
+)
+from app.config import settings
 
 main_router = Router()
 main_router.include_router(common.router)
 main_router.include_router(entries.router)
+main_router.include_router(analytics.router)
+main_router.include_router(calendar.router)
+main_router.include_router(search.router)
+main_router.include_router(weather.router)
+main_router.include_router(account.router)
+main_router.include_router(subscription.router)
 
 
 def setup_router(dp: Dispatcher) -> None:
     """Настроить роутеры и middleware."""
+    concurrency = settings.handler_concurrency or (settings.db_pool_size + settings.db_max_overflow)
+    dp.update.outer_middleware(TenantMiddleware())
+    dp.update.outer_middleware(ConcurrencyMiddleware(concurrency))
+    dp.update.outer_middleware(DeduplicationMiddleware())
     dp.message.middleware(LoggingMiddleware())
     dp.callback_query.middleware(LoggingMiddleware())
+    profiling = ProfilingMiddleware()
+    dp.message.middleware(profiling)
+    dp.callback_query.middleware(profiling)
+    # Ограничение частоты до UserMiddleware, чтобы флуд не доходил до БД
+    throttling = ThrottlingMiddleware()
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
     dp.message.middleware(UserMiddleware())
     dp.callback_query.middleware(UserMiddleware())
+    # Права проверяются по кэшу в памяти, без запроса к БД
+    entitlement = EntitlementMiddleware()
+    dp.message.middleware(entitlement)
+    dp.callback_query.middleware(entitlement)
 
     dp.include_router(main_router)
-
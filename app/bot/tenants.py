@@ -0,0 +1,37 @@
+"""Боты арендаторов, обслуживаемые одним процессом."""
+
+from collections.abc import Mapping
+
+from aiogram import Bot
+
+from app.domain.models import DEFAULT_TENANT
+
+
+class TenantBots:
+    """Соответствие арендатора и его бота.
+
+    Апдейты всех ботов идут через один Dispatcher; арендатор апдейта
+    определяется по id бота, который его получил.
+    """
+
+    def __init__(self) -> None:
+        self._bots: dict[str, Bot] = {}
+        self._tenants: dict[int, str] = {}
+
+    def add(self, tenant_id: str, bot: Bot) -> None:
+        """Зарегистрировать бота арендатора."""
+        self._bots[tenant_id] = bot
+        self._tenants[bot.id] = tenant_id
+
+    def tenant_of(self, bot: Bot) -> str:
+        """Арендатор бота; незарегистрированный бот — арендатор по умолчанию."""
+        return self._tenants.get(bot.id, DEFAULT_TENANT)
+
+    @property
+    def bots(self) -> Mapping[str, Bot]:
+        """Боты по tenant_id."""
+        return self._bots
+
+
+# Глобальный экземпляр
+tenant_bots = TenantBots()
@@ -2,9 +2,13 @@
 
 from datetime import date, datetime
 from enum import Enum
+from typing import Any
 
 from pydantic import BaseModel, Field
 
+# Арендатор (бот) по умолчанию; у него ключи Redis без префикса
+DEFAULT_TENANT = "default"
+
 
 class PainLevel(str, Enum):
     """Уровень боли."""
@@ -24,6 +28,39 @@ class MedicationType(str, Enum):
     OTHER = "other"
 
 
+class PurgeStage(str, Enum):
+    """Этап удаления данных пользователя."""
+
+    MEDICATIONS = "medications"
+    SYMPTOMS = "symptoms"
+    ENTRIES = "entries"
+    EVENTS = "events"
+    USER = "user"
+    DONE = "done"
+
+
+class ChangeEntity(str, Enum):
+    """Сущность, изменение которой попадает в журнал."""
+
+    ENTRY = "entry"
+    MEDICATION = "medication"
+    SYMPTOM = "symptom"
+
+
+class ChangeAction(str, Enum):
+    """Вид изменения."""
+
+    CREATE = "create"
+    UPDATE = "update"
+
+
+class SubscriptionStatus(str, Enum):
+    """Состояние оплаченного периода."""
+
+    ACTIVE = "active"
+    EXPIRED = "expired"
+
+
 class Entry(BaseModel):
     """Запись в дневнике."""
 
@@ -35,6 +72,8 @@ class Entry(BaseModel):
     pain_description: str | None = Field(None, max_length=2000)
     notes: str | None = None
     had_attack: bool = False
+    pressure_hpa: float | None = None
+    temperature_c: float | None = None
     created_at: datetime | None = None
     updated_at: datetime | None = None
 
@@ -47,6 +86,7 @@ class Medication(BaseModel):
 
     id: int | None = None
     entry_id: int
+    catalog_id: int | None = None
     name: str = Field(..., min_length=1, max_length=200)
     medication_type: MedicationType
     dosage: str | None = None
@@ -72,13 +112,111 @@ class User(BaseModel):
     """Пользователь бота."""
 
     id: int | None = None
+    tenant_id: str = DEFAULT_TENANT
     telegram_id: int
     username: str | None = None
     first_name: str | None = None
     last_name: str | None = None
     notification_time: str | None = None  # HH:MM format
+    latitude: float | None = None
+    longitude: float | None = None
+    email: str | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class PurgeJob(BaseModel):
+    """Задание на удаление данных пользователя."""
+
+    id: int | None = None
+    user_id: int
+    tenant_id: str = DEFAULT_TENANT
+    telegram_id: int
+    stage: PurgeStage = PurgeStage.MEDICATIONS
+    deleted_rows: int = 0
+    failures: int = 0
+    last_error: str | None = None
+    finished_at: datetime | None = None
     created_at: datetime | None = None
     updated_at: datetime | None = None
 
     class Config:
         from_attributes = True
+
+
+class Subscription(BaseModel):
+    """Оплаченный период подписки."""
+
+    id: int | None = None
+    user_id: int
+    plan: str
+    status: SubscriptionStatus = SubscriptionStatus.ACTIVE
+    starts_at: datetime
+    expires_at: datetime
+    telegram_charge_id: str
+    stars_amount: int
+    created_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class EntryEvent(BaseModel):
+    """Событие журнала изменений дневника.
+
+    changes — новые значения полей, previous — значения до изменения
+    (только для update), чтобы случайную правку можно было откатить.
+    """
+
+    id: int | None = None
+    user_id: int
+    entity: ChangeEntity
+    entity_id: int
+    action: ChangeAction
+    changes: dict[str, Any] = Field(default_factory=dict)
+    previous: dict[str, Any] | None = None
+    occurred_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class EntryMutation(BaseModel):
+    """Отложенная правка записи за день из очереди записи.
+
+    changes — поля EntryUpdate, заданные командой; запись ищется по
+    пользователю и дате, потому что при постановке в очередь ее id неизвестен.
+    """
+
+    user_id: int
+    entry_date: date
+    changes: dict[str, Any]
+    queued_at: datetime
+
+
+class WeeklySummary(BaseModel):
+    """Итоги недели одного пользователя для дайджеста."""
+
+    user_id: int
+    tenant_id: str = DEFAULT_TENANT
+    telegram_id: int
+    entry_days: int = 0
+    headache_days: int = 0
+    mean_score: float | None = None
+    attacks: int = 0
+    medications_taken: int = 0
+
+
+class ShardPlacement(BaseModel):
+    """Шард пользователя из справочника шардов."""
+
+    tenant_id: str = DEFAULT_TENANT
+    telegram_id: int
+    shard: int
+    moving: bool = False
+
+    class Config:
+        from_attributes = True
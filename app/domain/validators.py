@@ -1,11 +1,19 @@
 """Валидаторы для доменных данных."""
 
+import re
 from datetime import date, datetime
 
 from pydantic import BaseModel, Field, field_validator
 
 from app.domain.models import PainLevel
 
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def normalize_medication_name(name: str) -> str:
+    """Ключ справочника препаратов: пробелы схлопнуты, регистр нижний."""
+    return " ".join(name.split()).lower()
+
 
 class EntryCreate(BaseModel):
     """DTO для создания записи."""
@@ -44,6 +52,7 @@ class MedicationCreate(BaseModel):
     entry_id: int
     name: str = Field(..., min_length=1, max_length=200)
     medication_type: str
+    catalog_id: int | None = None
     dosage: str | None = Field(None, max_length=100)
     taken_at: datetime | None = None
 
@@ -54,3 +63,21 @@ class SymptomCreate(BaseModel):
     entry_id: int
     name: str = Field(..., min_length=1, max_length=200)
     severity: int | None = Field(None, ge=1, le=10)
+
+
+class EmailUpdate(BaseModel):
+    """DTO для адреса доставки выгрузок и отчетов."""
+
+    email: str | None = Field(None, max_length=254)
+
+    @field_validator("email")
+    @classmethod
+    def validate_email(cls, v: str | None) -> str | None:
+        """Проверка формата адреса; домен приводится к нижнему регистру."""
+        if v is None:
+            return None
+        v = v.strip()
+        if not EMAIL_RE.match(v):
+            raise ValueError("Некорректный адрес электронной почты")
+        local, domain = v.rsplit("@", 1)
+        return f"{local}@{domain.lower()}"
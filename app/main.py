@@ -1,26 +1,88 @@
 import argparse
 import asyncio
 import logging
+from collections.abc import Callable
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.bot import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
 from app import bot as bot_pkg
+from app.adapters import get_session, redis_client, shard_ids
+from app.adapters.database import DIRECTORY_SHARD, dispose_engines
+from app.adapters.mail import mail_sender
+from app.adapters.weather import weather_client
+from app.bot.tenants import tenant_bots
 from app.config import settings
+from app.monitoring.loop_lag import loop_lag_monitor
+from app.monitoring.memory import memory_monitor
+from app.scheduler import scheduler, setup_jobs
+from app.services.change_log import change_log_flusher
+from app.services.charts import shutdown_executor
+from app.services.entitlements import entitlements
+from app.services.medication_index import medication_index
+from app.services.write_queue import data_change_listener
 
 logger = logging.getLogger(__name__)
 
 
 async def run_bot() -> None:
-    bot = Bot(
-        token=settings.bot_token,
-        default=DefaultBotProperties(parse_mode=None),
-    )
+    # Одна HTTP-сессия (и пул соединений к Bot API) на всех ботов процесса
+    if settings.bot_api_url:
+        api_session = AiohttpSession(api=TelegramAPIServer.from_base(settings.bot_api_url))
+    else:
+        api_session = AiohttpSession()
+    for tenant_id, token in settings.tenant_tokens.items():
+        tenant_bots.add(
+            tenant_id,
+            Bot(token=token, session=api_session, default=DefaultBotProperties(parse_mode=None)),
+        )
+    bots = list(tenant_bots.bots.values())
     dp = Dispatcher()
     bot_pkg.register_handlers(dp)
-    await bot_pkg.setup_commands_menu(bot)
-    logger.info("Starting polling")
-    await dp.start_polling(bot)
+    if settings.loop_monitor_enabled:
+        loop_lag_monitor.start()
+    if settings.memory_monitor_enabled:
+        memory_monitor.start()
+    await redis_client.connect()
+    await weather_client.connect()
+    await entitlements.start()
+    async for session in get_session(DIRECTORY_SHARD):
+        await medication_index.load(session)
+        break
+    for shard in shard_ids():
+        if shard == DIRECTORY_SHARD:
+            continue
+        async for session in get_session(shard):
+            await medication_index.load_usage(session)
+            break
+    if settings.mail_enabled:
+        await mail_sender.start()
+    if settings.event_log_enabled:
+        await change_log_flusher.start()
+    if settings.write_behind_enabled:
+        data_change_listener.start()
+    if settings.scheduler_enabled:
+        setup_jobs(tenant_bots.bots)
+        scheduler.start()
+    for bot in bots:
+        await bot_pkg.setup_commands_menu(bot)
+    logger.info("Starting polling for %d bot(s): %s", len(bots), ", ".join(tenant_bots.bots))
+    try:
+        await dp.start_polling(*bots, tasks_concurrency_limit=settings.handler_backlog)
+    finally:
+        await scheduler.stop()
+        await entitlements.stop()
+        await mail_sender.stop()
+        await change_log_flusher.stop()
+        await data_change_listener.stop()
+        shutdown_executor()
+        await weather_client.disconnect()
+        await redis_client.disconnect()
+        await dispose_engines()
+        await loop_lag_monitor.stop()
+        await memory_monitor.stop()
 
 
 def setup_logging() -> None:
@@ -30,6 +92,20 @@ def setup_logging() -> None:
     )
 
 
+def loop_factory() -> Callable[[], asyncio.AbstractEventLoop] | None:
+    """Выбрать реализацию event loop по settings.event_loop."""
+    if settings.event_loop == "asyncio":
+        return None
+    try:
+        import uvloop
+    except ImportError:
+        if settings.event_loop == "uvloop":
+            raise
+        logger.info("uvloop is not available, using asyncio event loop")
+        return None
+    return uvloop.new_event_loop
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Migrebot MVP")
     parser.add_argument("--check", action="store_true", help="Run dependency/config check")
@@ -41,9 +117,8 @@ def main() -> None:
         logger.info("Check succeeded")
         return
 
-    asyncio.run(run_bot())
+    asyncio.run(run_bot(), loop_factory=loop_factory())
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1 @@
+"""Наблюдаемость процесса бота: задержки event loop, память."""
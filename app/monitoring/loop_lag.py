@@ -0,0 +1,117 @@
+"""Мониторинг задержки планирования event loop."""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Измеряет, насколько позже запланированного просыпается корутина.
+
+    Фоновая задача спит interval и записывает опоздание. Отдельный поток-
+    сторож следит за «пульсом» этой задачи: если loop не отвечает дольше
+    порога, в лог пишется текущий стек потока event loop — то есть код,
+    который его блокирует.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        report_interval: float = 60.0,
+        window: int = 3000,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self._samples: deque[float] = deque(maxlen=window)
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Запустить измерение в текущем event loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Остановить мониторинг."""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_report = loop.time()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self._samples.append(max(0.0, now - started - self.interval))
+            self._heartbeat = time.monotonic()
+            if now - last_report >= self.report_interval:
+                last_report = now
+                stats = self.percentiles()
+                logger.info(
+                    "loop lag ms p50=%.1f p95=%.1f p99=%.1f max=%.1f",
+                    stats["p50"],
+                    stats["p95"],
+                    stats["p99"],
+                    stats["max"],
+                )
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+            logger.warning(
+                "Event loop blocked for %.0f ms, loop thread stack:\n%s", stalled * 1000, stack
+            )
+
+    def percentiles(self) -> dict[str, float]:
+        """Перцентили задержки за последнее окно, мс."""
+        if not self._samples:
+            return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        data = sorted(self._samples)
+        last = len(data) - 1
+
+        def pick(q: float) -> float:
+            return data[min(last, round(q * last))] * 1000
+
+        return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": data[-1] * 1000}
+
+
+# Глобальный экземпляр
+loop_lag_monitor = LoopLagMonitor(
+    interval=settings.loop_lag_interval_ms / 1000,
+    threshold=settings.loop_lag_threshold_ms / 1000,
+    report_interval=settings.loop_lag_report_interval_s,
+)
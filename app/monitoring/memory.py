@@ -0,0 +1,146 @@
+"""Мониторинг памяти процесса: снимки tracemalloc, пики по командам, RSS."""
+
+import asyncio
+import linecache
+import logging
+import os
+import resource
+import sys
+import tracemalloc
+from collections import defaultdict
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int:
+    """Текущий RSS процесса; без /proc — пиковый RSS из getrusage."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS отдает байты, Linux — килобайты
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryMonitor:
+    """Инструментирование памяти долгоживущего процесса (включается явно).
+
+    Периодически снимает tracemalloc-снимок и пишет в лог места, где память
+    выросла сильнее всего с прошлого снимка, — так видны утечки. Для каждого
+    апдейта считается пик выделений, пока он обрабатывался: счетчик пика
+    общий на процесс, поэтому при параллельных апдейтах это оценка сверху.
+    Максимальные пики по командам попадают в периодический отчет.
+    """
+
+    def __init__(
+        self,
+        interval: float = 300.0,
+        frames: int = 1,
+        top: int = 10,
+    ) -> None:
+        self.interval = interval
+        self.frames = frames
+        self.top = top
+        self._previous: tracemalloc.Snapshot | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._in_flight = 0
+        self._command_peaks: dict[str, int] = defaultdict(int)
+
+    @property
+    def active(self) -> bool:
+        """Идет ли трассировка выделений."""
+        return self._task is not None
+
+    def start(self) -> None:
+        """Начать трассировку и периодические снимки."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="memory-monitor")
+
+    async def stop(self) -> None:
+        """Остановить снимки и трассировку."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._previous = None
+        tracemalloc.stop()
+
+    def begin(self) -> int:
+        """Отметить начало обработки апдейта; вернуть текущий объем выделений."""
+        if self._in_flight == 0:
+            # Пик сбрасывается, только когда других апдейтов в работе нет
+            tracemalloc.reset_peak()
+        self._in_flight += 1
+        return tracemalloc.get_traced_memory()[0]
+
+    def end(self, started_at: int, command: str) -> int:
+        """Завершить замер; вернуть пик выделений сверх начального объема, байт."""
+        self._in_flight -= 1
+        peak = max(0, tracemalloc.get_traced_memory()[1] - started_at)
+        if peak > self._command_peaks[command]:
+            self._command_peaks[command] = peak
+        return peak
+
+    def _snapshot_report(self) -> list[str]:
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        if self._previous is None:
+            stats = snapshot.statistics("lineno")[: self.top]
+            lines = [
+                f"  {stat.size / 1024:.0f} KiB in {stat.count} blocks: {stat.traceback}"
+                for stat in stats
+            ]
+        else:
+            stats = snapshot.compare_to(self._previous, "lineno")[: self.top]
+            lines = [
+                f"  {stat.size_diff / 1024:+.0f} KiB ({stat.size / 1024:.0f} KiB total, "
+                f"{stat.count_diff:+d} blocks): {stat.traceback}"
+                for stat in stats
+            ]
+        self._previous = snapshot
+        return lines
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            # Снимок и сравнение — чистый Python на сотни мс, не в event loop
+            lines = await asyncio.to_thread(self._snapshot_report)
+            current, peak = tracemalloc.get_traced_memory()
+            logger.info(
+                "memory rss_mb=%.1f traced_mb=%.1f traced_peak_mb=%.1f, top growth:\n%s",
+                rss_bytes() / 2**20,
+                current / 2**20,
+                peak / 2**20,
+                "\n".join(lines) or "  <none>",
+            )
+            if self._command_peaks:
+                worst = sorted(self._command_peaks.items(), key=lambda item: -item[1])
+                logger.info(
+                    "memory peak per command: %s",
+                    ", ".join(f"{name}={size / 1024:.0f}KiB" for name, size in worst[: self.top]),
+                )
+                self._command_peaks.clear()
+
+
+# Глобальный экземпляр
+memory_monitor = MemoryMonitor(
+    interval=settings.memory_snapshot_interval_s,
+    frames=settings.memory_trace_frames,
+    top=settings.memory_report_top,
+)
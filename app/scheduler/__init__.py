@@ -1,4 +1,40 @@
-# Планировщик уведомлений и фоновые задачи будут добавлены позже.
+"""Фоновые задачи по расписанию (отчеты, рассылки, обслуживание)."""
 
+from collections.abc import Mapping
+from functools import partial
 
+from aiogram import Bot
 
+from app.config import settings
+from app.scheduler.digest import send_weekly_digests
+from app.scheduler.reports import send_monthly_reports
+from app.scheduler.scheduler import Scheduler, scheduler
+from app.services.entitlements import expire_subscriptions
+from app.services.purge import run_pending_purges
+
+__all__ = [
+    "Scheduler",
+    "scheduler",
+    "send_monthly_reports",
+    "send_weekly_digests",
+    "setup_jobs",
+]
+
+HOUR = 60 * 60
+
+
+def setup_jobs(bots: Mapping[str, Bot]) -> None:
+    """Зарегистрировать задачи приложения; bots — боты по tenant_id."""
+    scheduler.add_job("monthly_reports", send_monthly_reports, interval=HOUR, first_delay=60)
+    if settings.digest_enabled:
+        scheduler.add_job(
+            "weekly_digest", partial(send_weekly_digests, bots), interval=HOUR, first_delay=120
+        )
+    scheduler.add_job(
+        "purge", run_pending_purges, interval=settings.purge_interval_seconds, first_delay=10
+    )
+    scheduler.add_job(
+        "expire_subscriptions",
+        expire_subscriptions,
+        interval=settings.entitlement_expiry_interval_seconds,
+    )
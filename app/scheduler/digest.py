@@ -0,0 +1,172 @@
+"""Еженедельный дайджест в Telegram."""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Mapping
+from datetime import date, datetime, timedelta
+
+from aiogram import Bot
+from redis.exceptions import RedisError
+
+from app.adapters import get_session, redis_client, shard_ids
+from app.adapters.repository import EntryRepository
+from app.bot.broadcast import Broadcaster, BroadcastMessage
+from app.config import settings
+from app.domain.models import WeeklySummary
+
+logger = logging.getLogger(__name__)
+
+# Отметки живут дольше недели, чтобы повторный запуск их видел
+SENT_MARKER_TTL = 8 * 24 * 60 * 60
+# Дайджест в очереди рассылки: если процесс упал до итога, отметка истечет,
+# и дайджест уйдет на одном из следующих запусков
+QUEUED_MARKER_TTL = 60 * 60
+QUEUED = b"queued"
+
+
+def previous_week(today: date) -> tuple[date, date]:
+    """Понедельник и воскресенье прошлой недели."""
+    start = today - timedelta(days=today.weekday() + 7)
+    return start, start + timedelta(days=6)
+
+
+def format_digest(summary: WeeklySummary, start: date, end: date) -> str:
+    """Текст дайджеста за неделю."""
+    text = f"📊 Итоги недели {start:%d.%m} — {end:%d.%m}\n\n"
+    text += f"Дней с головной болью: {summary.headache_days} из 7\n"
+    if summary.mean_score is not None:
+        text += f"Средняя оценка боли: {summary.mean_score:.1f}/10\n"
+    text += f"Приступов: {summary.attacks}\n"
+    text += f"Принято препаратов: {summary.medications_taken}\n"
+    text += "\nПодробнее: /insights и /chart"
+    return text
+
+
+def _marker(week: str, user_id: int) -> str:
+    return f"digest:sent:{week}:{user_id}"
+
+
+async def _claim(week: str, summaries: list[WeeklySummary]) -> tuple[list[WeeklySummary], int]:
+    """Занять отправку дайджеста пользователям.
+
+    Возвращает занятых сейчас и число тех, чей дайджест еще в рассылке у
+    этого или другого процесса. Отметка «отправлено» ставится только по
+    итогу отправки (см. DigestRun.on_result).
+    """
+    if not summaries:
+        return [], 0
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for summary in summaries:
+            key = _marker(week, summary.user_id)
+            pipe.set(key, QUEUED, ex=QUEUED_MARKER_TTL, nx=True)
+            pipe.get(key)
+        results = await pipe.execute()
+    claimed = results[0::2]
+    markers = results[1::2]
+    pending = [summary for summary, ok in zip(summaries, claimed, strict=True) if ok]
+    in_flight = sum(
+        1 for ok, marker in zip(claimed, markers, strict=True) if not ok and marker == QUEUED
+    )
+    return pending, in_flight
+
+
+class DigestRun:
+    """Обход пользователей каждого шарда пачками по курсору users.id.
+
+    Дедлайн проверяется между пачками: пачка, уже занятая в Redis,
+    всегда отправляется целиком. Неотправленные дайджесты освобождаются
+    для следующего запуска.
+    """
+
+    def __init__(self, start: date, end: date, deadline: float) -> None:
+        self.start = start
+        self.end = end
+        self.deadline = deadline
+        self.week = f"{start:%G-W%V}"
+        self.finished = False
+        # Дайджесты, ждущие повтора или отправки другим процессом
+        self.unsent = 0
+        # (tenant_id, chat_id) → user_id сообщений в рассылке
+        self._recipients: dict[tuple[str, int], int] = {}
+
+    async def messages(self) -> AsyncIterator[BroadcastMessage]:
+        """Сообщения дайджеста для рассылки."""
+        loop = asyncio.get_running_loop()
+        for shard in shard_ids():
+            after_id = 0
+            while True:
+                if loop.time() >= self.deadline:
+                    return
+                async for session in get_session(shard):
+                    summaries = await EntryRepository(session).weekly_summaries(
+                        after_id, settings.digest_batch_size, self.start, self.end
+                    )
+                    break
+                if not summaries:
+                    break
+                after_id = summaries[-1].user_id
+                # Дайджест получают только те, кто вел дневник на этой неделе
+                pending, in_flight = await _claim(self.week, [s for s in summaries if s.entry_days])
+                self.unsent += in_flight
+                for summary in pending:
+                    self._recipients[(summary.tenant_id, summary.telegram_id)] = summary.user_id
+                    yield BroadcastMessage(
+                        chat_id=summary.telegram_id,
+                        tenant_id=summary.tenant_id,
+                        text=format_digest(summary, self.start, self.end),
+                    )
+        self.finished = True
+
+    async def on_result(self, message: BroadcastMessage, retry: bool) -> None:
+        """Отметить дайджест отправленным или освободить его для следующего запуска."""
+        user_id = self._recipients.pop((message.tenant_id, message.chat_id))
+        key = _marker(self.week, user_id)
+        try:
+            if retry:
+                self.unsent += 1
+                await redis_client.delete(key)
+            else:
+                await redis_client.set(key, "1", ex=SENT_MARKER_TTL)
+        except (RedisError, RuntimeError):
+            logger.warning("Failed to update digest marker %s", key, exc_info=True)
+
+
+async def send_weekly_digests(bots: Mapping[str, Bot], now: datetime | None = None) -> int:
+    """Разослать дайджест за прошлую неделю всем, кто вел дневник.
+
+    bots — боты по tenant_id: каждый пользователь получает дайджест от
+    своего бота. Итоги считаются одним агрегирующим запросом на пачку из
+    DIGEST_BATCH_SIZE пользователей и сразу уходят в рассылку с лимитом
+    DIGEST_RATE_PER_SECOND. Рассылка укладывается в DIGEST_WINDOW_HOURS:
+    не успевшие и те, кому отправить не удалось, получат дайджест на
+    следующем запуске того же дня, отметки в Redis не дают отправить его
+    дважды.
+    """
+    now = now or datetime.utcnow()
+    if now.weekday() != settings.digest_weekday or now.hour < settings.digest_send_hour:
+        return 0
+    start, end = previous_week(now.date())
+    done_key = f"digest:done:{start:%G-W%V}"
+    if await redis_client.exists(done_key):
+        return 0
+
+    broadcaster = Broadcaster(
+        rate_per_second=settings.digest_rate_per_second,
+        workers=settings.digest_workers,
+        queue_size=settings.digest_batch_size,
+    )
+    deadline = asyncio.get_running_loop().time() + settings.digest_window_hours * 60 * 60
+    run = DigestRun(start, end, deadline)
+    stats = await broadcaster.send(bots, run.messages(), run.on_result)
+    if run.finished and not run.unsent:
+        await redis_client.set(done_key, "1", ex=SENT_MARKER_TTL)
+    logger.info(
+        "Weekly digest %s — %s: sent=%d blocked=%d failed=%d finished=%s",
+        start,
+        end,
+        stats.sent,
+        stats.blocked,
+        stats.failed,
+        run.finished,
+    )
+    return stats.sent
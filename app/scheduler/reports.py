@@ -0,0 +1,161 @@
+"""Ежемесячные отчеты на почту."""
+
+import asyncio
+import logging
+from datetime import date, timedelta
+
+from redis.exceptions import RedisError
+
+from app.adapters import get_session, redis_client, shard_ids, tenant_key
+from app.adapters.mail import MailAttachment, OutgoingMail, mail_sender
+from app.adapters.repository import EntryRepository, UserRepository
+from app.config import settings
+from app.domain.models import Entry, User
+from app.services.export import build_csv
+
+logger = logging.getLogger(__name__)
+
+REPORT_BATCH_SIZE = 200
+SENT_MARKER_PREFIX = "report:sent:"
+# Отметки об отправке живут дольше месяца, чтобы повторный запуск их видел
+SENT_MARKER_TTL = 40 * 24 * 60 * 60
+# Отчет в очереди отправки: если процесс упал до итога, отметка истечет,
+# и отчет уйдет на одном из следующих запусков
+QUEUED_MARKER_TTL = 6 * 60 * 60
+QUEUED = b"queued"
+
+
+def previous_month(today: date) -> tuple[date, date]:
+    """Первый и последний день предыдущего месяца."""
+    end = today.replace(day=1) - timedelta(days=1)
+    return end.replace(day=1), end
+
+
+def format_report(entries: list[Entry], start: date, end: date) -> str:
+    """Текст отчета за месяц."""
+    scores = [e.pain_score for e in entries if e.pain_score is not None]
+    attacks = sum(1 for e in entries if e.had_attack)
+    text = f"Дневник головной боли за {start:%m.%Y} ({start} — {end}).\n\n"
+    text += f"Дней с записями: {len(entries)}\n"
+    text += f"Дней с приступом: {attacks}\n"
+    if scores:
+        text += f"Средняя оценка боли: {sum(scores) / len(scores):.1f}/10\n"
+        text += f"Максимальная оценка: {max(scores)}/10\n"
+    text += "\nЗаписи по дням — во вложении (CSV).\n\nMigrebot"
+    return text
+
+
+def _marker(month: str, user_id: int) -> str:
+    return tenant_key(f"{SENT_MARKER_PREFIX}{month}:{user_id}")
+
+
+def _build_mails(
+    users: list[User], entries: dict[int, list[Entry]], start: date, end: date
+) -> list[OutgoingMail]:
+    filename = f"migrebot_{start:%Y-%m}.csv"
+    month = f"{start:%Y-%m}"
+    return [
+        OutgoingMail(
+            to=user.email,
+            subject=f"Migrebot: дневник головной боли за {start:%m.%Y}",
+            body=format_report(entries[user.id], start, end),
+            attachments=[
+                MailAttachment(
+                    filename=filename,
+                    content=build_csv(entries[user.id]),
+                    mime_type="text/csv",
+                )
+            ],
+            tag=_marker(month, user.id),
+        )
+        for user in users
+        if user.email and entries[user.id]
+    ]
+
+
+async def _claim(month: str, users: list[User]) -> tuple[list[User], int]:
+    """Занять отправку отчета пользователям.
+
+    Возвращает занятых сейчас и число тех, чей отчет еще в очереди у
+    этого или другого процесса. Отметка «отправлено» ставится только по
+    итогу отправки (см. _on_mail_result).
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user in users:
+            key = _marker(month, user.id)
+            pipe.set(key, QUEUED, ex=QUEUED_MARKER_TTL, nx=True)
+            pipe.get(key)
+        results = await pipe.execute()
+    claimed = results[0::2]
+    markers = results[1::2]
+    pending = [user for user, ok in zip(users, claimed, strict=True) if ok]
+    in_flight = sum(
+        1 for ok, marker in zip(claimed, markers, strict=True) if not ok and marker == QUEUED
+    )
+    return pending, in_flight
+
+
+async def _on_mail_result(mail: OutgoingMail, retry: bool) -> None:
+    """Отметить отчет отправленным или освободить его для следующего запуска."""
+    # Метка — ключ отметки, уже с префиксом арендатора, поставившего письмо
+    if mail.tag is None or SENT_MARKER_PREFIX not in mail.tag:
+        return
+    key = mail.tag
+    try:
+        if retry:
+            await redis_client.delete(key)
+        else:
+            await redis_client.set(key, "1", ex=SENT_MARKER_TTL)
+    except (RedisError, RuntimeError):
+        logger.warning("Failed to update report marker %s", key, exc_info=True)
+
+
+# Отметки ставятся по итогу отправки в воркерах mail_sender
+mail_sender.add_callback(_on_mail_result)
+
+
+async def send_monthly_reports(today: date | None = None) -> int:
+    """Поставить в очередь отчеты за прошлый месяц всем пользователям с почтой.
+
+    Пользователи обходятся пачками по id, записи пачки читаются одним
+    запросом. Отметки в Redis делают задачу идемпотентной: ее можно
+    перезапускать, пока не кончатся дни рассылки. Неотправленные отчеты
+    уходят на следующих запусках; месяц закрывается, когда у всех
+    получателей отчет отправлен.
+    """
+    today = today or date.today()
+    if not settings.mail_enabled or today.day > settings.report_send_days:
+        return 0
+    start, end = previous_month(today)
+    month = f"{start:%Y-%m}"
+    done_key = tenant_key(f"report:done:{month}")
+    if await redis_client.exists(done_key):
+        return 0
+
+    queued = 0
+    in_flight = 0
+    for shard in shard_ids():
+        after_id = 0
+        while True:
+            async for session in get_session(shard):
+                users = await UserRepository(session).list_with_email(after_id, REPORT_BATCH_SIZE)
+                entries = await EntryRepository(session).list_by_users_and_range(
+                    [user.id for user in users], start, end
+                )
+                break
+            if not users:
+                break
+            after_id = users[-1].id
+
+            pending, busy = await _claim(month, [user for user in users if entries[user.id]])
+            in_flight += busy
+            mails = await asyncio.to_thread(_build_mails, pending, entries, start, end)
+            for mail in mails:
+                # Ожидание места в очереди — естественное ограничение скорости рассылки
+                await mail_sender.put(mail)
+            queued += len(mails)
+
+    if not queued and not in_flight:
+        await redis_client.set(done_key, "1", ex=SENT_MARKER_TTL)
+    logger.info("Monthly reports for %s queued: %d, in flight: %d", month, queued, in_flight)
+    return queued
@@ -0,0 +1,77 @@
+"""Планировщик периодических фоновых задач."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from redis.exceptions import RedisError
+
+from app.adapters.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[], Awaitable[None]]
+
+
+class Scheduler:
+    """Запускает задачи с заданным интервалом в фоне event loop.
+
+    Перед каждым запуском берется блокировка в Redis на время интервала:
+    при нескольких экземплярах бота задача выполняется только одним из них.
+    Если Redis недоступен, запуск пропускается — задачи рассчитаны на то,
+    что их можно безопасно повторить на следующем тике.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: dict[str, tuple[JobFunc, float, float]] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def add_job(self, name: str, func: JobFunc, interval: float, first_delay: float = 0.0) -> None:
+        """Зарегистрировать задачу."""
+        self._jobs[name] = (func, interval, first_delay)
+
+    def start(self) -> None:
+        """Запустить все зарегистрированные задачи."""
+        self._tasks = [
+            asyncio.create_task(self._run(name, func, interval, first_delay), name=f"job-{name}")
+            for name, (func, interval, first_delay) in self._jobs.items()
+        ]
+
+    async def stop(self) -> None:
+        """Остановить задачи."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_now(self, name: str) -> None:
+        """Выполнить задачу немедленно, без блокировки (для ручного запуска)."""
+        func, _, _ = self._jobs[name]
+        await func()
+
+    async def _acquire(self, name: str, interval: float) -> bool:
+        try:
+            return await redis_client.set_if_absent(
+                f"scheduler:{name}", "1", ex=max(1, int(interval * 0.9))
+            )
+        except (RedisError, RuntimeError):
+            logger.warning("Scheduler lock unavailable, skipping %s", name, exc_info=True)
+            return False
+
+    async def _run(self, name: str, func: JobFunc, interval: float, first_delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(first_delay)
+        while True:
+            started = loop.time()
+            if await self._acquire(name, interval):
+                try:
+                    await func()
+                except Exception:
+                    logger.exception("Scheduled job %s failed", name)
+                else:
+                    logger.info("Scheduled job %s done in %.1f s", name, loop.time() - started)
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+
+
+# Глобальный экземпляр
+scheduler = Scheduler()
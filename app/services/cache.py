@@ -0,0 +1,62 @@
+"""Внутрипроцессные кэши и версии пользовательских данных."""
+
+from collections import OrderedDict
+from collections.abc import Hashable
+
+
+class LRUCache[K: Hashable, V]:
+    """Простой LRU-кэш с ограничением по количеству элементов."""
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, V] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        """Получить значение и отметить его как недавно использованное."""
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        """Сохранить значение, вытеснив самое старое при переполнении."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        """Удалить значение по ключу."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кэш."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DataVersions:
+    """Счетчики версий данных пользователей.
+
+    Версия увеличивается после каждого коммита, меняющего записи пользователя,
+    и входит в ключи кэшей: старые результаты просто перестают находиться.
+    """
+
+    def __init__(self) -> None:
+        self._versions: dict[int, int] = {}
+
+    def get(self, user_id: int) -> int:
+        """Текущая версия данных пользователя."""
+        return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int) -> int:
+        """Увеличить версию после изменения данных."""
+        version = self._versions.get(user_id, 0) + 1
+        self._versions[user_id] = version
+        return version
+
+
+# Глобальный экземпляр
+data_versions = DataVersions()
@@ -0,0 +1,136 @@
+"""Календарь месяца: оценки боли и приступы по дням."""
+
+from calendar import monthcalendar
+from datetime import date, timedelta
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.repository import EntryRepository
+from app.config import settings
+from app.services.cache import LRUCache, data_versions
+
+MONTH_NAMES = [
+    "Январь",
+    "Февраль",
+    "Март",
+    "Апрель",
+    "Май",
+    "Июнь",
+    "Июль",
+    "Август",
+    "Сентябрь",
+    "Октябрь",
+    "Ноябрь",
+    "Декабрь",
+]
+WEEKDAYS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+ATTACK_MARK = "⚡"
+UNSCORED_MARK = "▫️"
+EMPTY_CELL = "·"
+LEGEND = "🟢 1–3  🟡 4–6  🟠 7–8  🔴 9–10  ⚡ приступ  ▫️ без оценки"
+
+
+class CalendarGrid(BaseModel):
+    """Отрисованный календарь месяца."""
+
+    month: date
+    title: str
+    summary: str
+    # Недели по 7 подписей ячеек, с понедельника
+    weeks: list[list[str]]
+
+
+# (пользователь, месяц, версия данных); у закрытых месяцев версии нет
+_cache: LRUCache[tuple[int, date, int | None], CalendarGrid] = LRUCache(maxsize=4096)
+
+
+def parse_month(value: str) -> date | None:
+    """Первое число месяца из «YYYY-MM»; None при неверном формате."""
+    try:
+        year, month = value.split("-")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        return None
+
+
+def month_end(month: date) -> date:
+    """Последний день месяца."""
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def shift_month(month: date, delta: int) -> date:
+    """Первое число месяца через delta месяцев."""
+    index = month.year * 12 + month.month - 1 + delta
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def is_closed(month: date, today: date) -> bool:
+    """Месяц закончился, и окно правок после него прошло."""
+    return today > month_end(month) + timedelta(days=settings.calendar_edit_window_days)
+
+
+def score_mark(score: int) -> str:
+    """Цвет оценки боли."""
+    if score <= 3:
+        return "🟢"
+    if score <= 6:
+        return "🟡"
+    if score <= 8:
+        return "🟠"
+    return "🔴"
+
+
+def render_grid(month: date, days: list[tuple[date, int | None, bool]]) -> CalendarGrid:
+    """Собрать подписи ячеек и итоги месяца."""
+    by_day = {entry_date.day: (score, attack) for entry_date, score, attack in days}
+    weeks = []
+    for week in monthcalendar(month.year, month.month):
+        row = []
+        for day in week:
+            if day == 0:
+                row.append(EMPTY_CELL)
+                continue
+            score, attack = by_day.get(day, (None, False))
+            if attack:
+                mark = ATTACK_MARK
+            elif score is not None:
+                mark = score_mark(score)
+            else:
+                mark = UNSCORED_MARK if day in by_day else ""
+            row.append(f"{day}{mark}")
+        weeks.append(row)
+
+    scores = [score for _, score, _ in days if score is not None]
+    summary = f"Дней с записями: {len(days)}\n"
+    summary += f"Дней с приступом: {sum(1 for _, _, attack in days if attack)}\n"
+    if scores:
+        summary += f"Средняя оценка боли: {sum(scores) / len(scores):.1f}/10\n"
+    return CalendarGrid(
+        month=month,
+        title=f"📅 {MONTH_NAMES[month.month - 1]} {month.year}",
+        summary=summary,
+        weeks=weeks,
+    )
+
+
+async def get_month_grid(
+    session: AsyncSession, user_id: int, month: date, today: date | None = None
+) -> CalendarGrid:
+    """Календарь месяца пользователя.
+
+    Месяц читается одним запросом. Закрытые месяцы (см. is_closed) больше
+    не меняются и кэшируются без версии данных, остальные — до следующей
+    правки пользователя.
+    """
+    today = today or date.today()
+    version = None if is_closed(month, today) else data_versions.get(user_id)
+    key = (user_id, month, version)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    days = await EntryRepository(session).month_days(user_id, month, month_end(month))
+    grid = render_grid(month, days)
+    _cache.set(key, grid)
+    return grid
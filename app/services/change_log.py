@@ -0,0 +1,240 @@
+"""Журнал изменений дневника: запись в Redis Stream и пакетный сброс в Postgres."""
+
+import asyncio
+import logging
+import socket
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import datetime
+
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+from sqlalchemy.exc import DBAPIError
+
+from app.adapters import current_shard, get_session, redis_client, shard_ids
+from app.adapters.database import DIRECTORY_SHARD
+from app.adapters.repository import EntryEventRepository
+from app.config import settings
+from app.domain.models import (
+    ChangeAction,
+    ChangeEntity,
+    Entry,
+    EntryEvent,
+    Medication,
+    Symptom,
+)
+from app.domain.validators import EntryUpdate
+
+logger = logging.getLogger(__name__)
+
+STREAM = "entry_events"
+# Группа единственная, поэтому подтвержденные сообщения удаляются из потока
+GROUP = "entry-events-flusher"
+RETRY_DELAY_SECONDS = 5.0
+CLAIM_INTERVAL_SECONDS = 60.0
+
+
+def entry_created(entry: Entry) -> EntryEvent:
+    """Событие создания записи."""
+    return EntryEvent(
+        user_id=entry.user_id,
+        entity=ChangeEntity.ENTRY,
+        entity_id=entry.id,
+        action=ChangeAction.CREATE,
+        changes=entry.model_dump(mode="json", exclude={"id", "created_at", "updated_at"}),
+        occurred_at=datetime.utcnow(),
+    )
+
+
+def entry_updated(before: Entry, data: EntryUpdate) -> EntryEvent:
+    """Событие правки записи с прежними значениями измененных полей."""
+    changes = data.model_dump(mode="json", exclude_none=True)
+    return EntryEvent(
+        user_id=before.user_id,
+        entity=ChangeEntity.ENTRY,
+        entity_id=before.id,
+        action=ChangeAction.UPDATE,
+        changes=changes,
+        previous=before.model_dump(mode="json", include=set(changes)),
+        occurred_at=datetime.utcnow(),
+    )
+
+
+def medications_added(user_id: int, medications: Iterable[Medication]) -> list[EntryEvent]:
+    """События добавления препаратов."""
+    now = datetime.utcnow()
+    return [
+        EntryEvent(
+            user_id=user_id,
+            entity=ChangeEntity.MEDICATION,
+            entity_id=med.id,
+            action=ChangeAction.CREATE,
+            changes=med.model_dump(mode="json", exclude={"id"}),
+            occurred_at=now,
+        )
+        for med in medications
+    ]
+
+
+def symptoms_added(user_id: int, symptoms: Iterable[Symptom]) -> list[EntryEvent]:
+    """События добавления симптомов."""
+    now = datetime.utcnow()
+    return [
+        EntryEvent(
+            user_id=user_id,
+            entity=ChangeEntity.SYMPTOM,
+            entity_id=sym.id,
+            action=ChangeAction.CREATE,
+            changes=sym.model_dump(mode="json", exclude={"id"}),
+            occurred_at=now,
+        )
+        for sym in symptoms
+    ]
+
+
+async def record(events: EntryEvent | Iterable[EntryEvent]) -> None:
+    """Добавить события в поток; вызывается после коммита изменения.
+
+    Все события отправляются одним конвейером XADD, в Postgres хендлер не
+    ходит. Ошибка Redis не ломает ответ пользователю — событие теряется и
+    попадает в лог.
+    """
+    if not settings.event_log_enabled:
+        return
+    if isinstance(events, EntryEvent):
+        events = [events]
+    # Сбросчик пишет событие на шард пользователя
+    shard = str(current_shard.get())
+    messages = [{"event": event.model_dump_json(), "shard": shard} for event in events]
+    if not messages:
+        return
+    try:
+        await redis_client.stream_add_many(STREAM, messages, maxlen=settings.event_stream_maxlen)
+    except (RedisError, RuntimeError):
+        logger.warning("Failed to record %d entry events", len(messages), exc_info=True)
+
+
+class ChangeLogFlusher:
+    """Фоновый перенос событий из Redis Stream в таблицу entry_events.
+
+    Сообщения читаются группой потребителей и копятся до batch_size или
+    flush_interval, затем пачка пишется одним COPY и только после коммита
+    подтверждается (XACK). Неподтвержденные сообщения после перезапуска
+    дочитываются заново, а зависшие у упавшего процесса забираются через
+    XAUTOCLAIM; дубли отсекает уникальный stream_id.
+    """
+
+    def __init__(
+        self,
+        consumer: str | None = None,
+        batch_size: int = 5000,
+        flush_interval: float = 2.0,
+        claim_idle_seconds: int = 60,
+    ) -> None:
+        self.consumer = consumer or socket.gethostname()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.claim_idle_seconds = claim_idle_seconds
+        self._task: asyncio.Task[None] | None = None
+        self._stopping = asyncio.Event()
+
+    async def start(self) -> None:
+        """Запустить сбросчик."""
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run(), name="change-log-flusher")
+
+    async def stop(self, drain_seconds: float = 10.0) -> None:
+        """Сбросить накопленную пачку и остановиться."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), drain_seconds)
+        except TimeoutError:
+            logger.warning("Change log flusher did not drain in %.0f s", drain_seconds)
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        batch: list[tuple[str, dict[str, str]]] = []
+        recovered = False
+        last_claim = 0.0
+        while True:
+            try:
+                await redis_client.stream_ensure_group(STREAM, GROUP)
+                if not recovered:
+                    # Выданные этому потребителю до перезапуска, но не записанные
+                    while pending := await redis_client.stream_read_group(
+                        STREAM, GROUP, self.consumer, self.batch_size, pending=True
+                    ):
+                        await self._flush(pending)
+                    recovered = True
+                while not self._stopping.is_set():
+                    if time.monotonic() - last_claim >= CLAIM_INTERVAL_SECONDS:
+                        last_claim = time.monotonic()
+                        batch += await redis_client.stream_claim(
+                            STREAM,
+                            GROUP,
+                            self.consumer,
+                            self.claim_idle_seconds * 1000,
+                            self.batch_size,
+                        )
+                    deadline = time.monotonic() + self.flush_interval
+                    while len(batch) < self.batch_size and not self._stopping.is_set():
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        batch += await redis_client.stream_read_group(
+                            STREAM,
+                            GROUP,
+                            self.consumer,
+                            self.batch_size - len(batch),
+                            block_ms=max(1, int(min(remaining, 1.0) * 1000)),
+                        )
+                    await self._flush(batch)
+                    batch = []
+                # Остановка: дописать то, что успели прочитать
+                await self._flush(batch)
+                return
+            except (RedisError, DBAPIError, OSError):
+                # Пачка остается в памяти и в списке неподтвержденных сообщений
+                logger.warning("Change log flush of %d events failed", len(batch), exc_info=True)
+                if self._stopping.is_set():
+                    return
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+
+    async def _flush(self, batch: list[tuple[str, dict[str, str]]]) -> None:
+        if not batch:
+            return
+        by_shard: dict[int, list[tuple[str, EntryEvent]]] = defaultdict(list)
+        for message_id, fields in batch:
+            try:
+                event = EntryEvent.model_validate_json(fields["event"])
+                shard = int(fields.get("shard", DIRECTORY_SHARD))
+                if shard not in shard_ids():
+                    raise ValueError(f"unknown shard {shard}")
+            except (KeyError, ValueError, ValidationError):
+                # Повтор не поможет: сообщение подтверждается вместе с пачкой
+                logger.error("Malformed entry event %s dropped: %r", message_id, fields)
+                continue
+            by_shard[shard].append((message_id, event))
+        written = 0
+        # Пачка подтверждается после записи на все шарды; повтор отсекут дубли
+        for shard, events in by_shard.items():
+            async for session in get_session(shard):
+                written += await EntryEventRepository(session).copy_many(events)
+                await session.commit()
+                break
+        await redis_client.stream_ack(STREAM, GROUP, [message_id for message_id, _ in batch])
+        logger.debug("Flushed %d entry events (%d new)", len(batch), written)
+
+
+# Глобальный экземпляр
+change_log_flusher = ChangeLogFlusher(
+    consumer=settings.event_consumer_name,
+    batch_size=settings.event_flush_batch_size,
+    flush_interval=settings.event_flush_interval_seconds,
+    claim_idle_seconds=settings.event_claim_idle_seconds,
+)
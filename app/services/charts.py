@@ -0,0 +1,143 @@
+"""Построение графиков боли в отдельном пуле процессов."""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.repository import EntryRepository, MedicationRepository
+from app.config import settings
+from app.services.cache import LRUCache, data_versions
+
+PERIODS = {
+    "week": 7,
+    "month": 30,
+    "quarter": 90,
+    "year": 365,
+}
+DEFAULT_PERIOD = "month"
+
+_cache: LRUCache[tuple[int, str, date, int], bytes] = LRUCache(maxsize=256)
+_executor: ProcessPoolExecutor | None = None
+
+
+def _init_worker() -> None:
+    """Импортировать matplotlib один раз при старте процесса."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Получить (лениво создать) пул процессов для отрисовки."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.chart_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Остановить пул процессов."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_pain_chart(
+    days: list[date],
+    scores: list[int | None],
+    attacks: list[bool],
+    medications: list[bool],
+    title: str,
+) -> bytes:
+    """Отрисовать PNG с оценкой боли, приступами и приемом препаратов.
+
+    Выполняется в дочернем процессе, поэтому принимает только простые типы.
+    """
+    from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 4), dpi=100)
+    ax = fig.subplots()
+
+    scored = [(d, s) for d, s in zip(days, scores, strict=True) if s is not None]
+    if scored:
+        ax.plot(
+            [d for d, _ in scored],
+            [s for _, s in scored],
+            marker="o",
+            markersize=3,
+            linewidth=1.5,
+            color="tab:blue",
+            label="Оценка боли",
+        )
+    attack_days = [d for d, a in zip(days, attacks, strict=True) if a]
+    if attack_days:
+        ax.scatter(
+            attack_days, [10.5] * len(attack_days), marker="v", color="tab:red", label="Приступ"
+        )
+    med_days = [d for d, m in zip(days, medications, strict=True) if m]
+    if med_days:
+        ax.scatter(
+            med_days, [0.5] * len(med_days), marker="^", color="tab:green", label="Препараты"
+        )
+
+    ax.set_ylim(0, 11)
+    ax.set_yticks(range(1, 11))
+    ax.set_ylabel("Боль (1-10)")
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    locator = AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(ConciseDateFormatter(locator))
+    if scored or attack_days or med_days:
+        ax.legend(loc="upper left", fontsize="small")
+    fig.tight_layout()
+
+    stream = BytesIO()
+    fig.savefig(stream, format="png")
+    return stream.getvalue()
+
+
+async def get_pain_chart(
+    session: AsyncSession, user_id: int, period: str = DEFAULT_PERIOD
+) -> bytes | None:
+    """Получить PNG-график за период; None, если записей нет.
+
+    Картинка кэшируется по (пользователь, период, день, версия данных).
+    """
+    today = date.today()
+    key = (user_id, period, today, data_versions.get(user_id))
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    start_date = today - timedelta(days=PERIODS[period])
+    entries = await EntryRepository(session).list_by_date_range(user_id, start_date, today)
+    if not entries:
+        return None
+    entries.reverse()
+    with_meds = await MedicationRepository(session).entry_ids_with_medications(
+        [e.id for e in entries]
+    )
+
+    loop = asyncio.get_running_loop()
+    png = await loop.run_in_executor(
+        get_executor(),
+        render_pain_chart,
+        [e.entry_date for e in entries],
+        [e.pain_score for e in entries],
+        [e.had_attack for e in entries],
+        [e.id in with_meds for e in entries],
+        f"Боль за период {start_date} — {today}",
+    )
+    _cache.set(key, png)
+    return png
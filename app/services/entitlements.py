@@ -0,0 +1,133 @@
+"""Права доступа Migrebot+: кэш в процессе с инвалидацией через Redis."""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.adapters import current_shard, get_session, redis_client, shard_ids, use_shard
+from app.adapters.repository import SubscriptionRepository
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "entitlements"
+RECONNECT_DELAY_SECONDS = 5.0
+
+
+class Entitlements:
+    """Пользователи с активной подпиской Migrebot+.
+
+    Все активные подписки держатся в памяти процесса, поэтому проверка в
+    middleware — поиск в словаре, без запроса к БД. Покупка и истечение
+    публикуют id пользователя в канал Redis, и каждый процесс перечитывает
+    подписку только этого пользователя. Истечение отмечает задача
+    планировщика, а не проверка на каждом апдейте.
+    """
+
+    def __init__(self) -> None:
+        self._active: dict[int, datetime] = {}
+        self._listener: asyncio.Task[None] | None = None
+
+    def is_plus(self, user_id: int) -> bool:
+        """Есть ли у пользователя Migrebot+."""
+        return user_id in self._active
+
+    def active_until(self, user_id: int) -> datetime | None:
+        """Окончание оплаченного периода (UTC)."""
+        return self._active.get(user_id)
+
+    async def reload(self) -> None:
+        """Перечитать все активные подписки со всех шардов."""
+        active: dict[int, datetime] = {}
+        for shard in shard_ids():
+            async for session in get_session(shard):
+                active.update(await SubscriptionRepository(session).list_active())
+                break
+        self._active = active
+        logger.info("Entitlements loaded: %d active subscriptions", len(self._active))
+
+    async def refresh(self, user_id: int, shard: int | None = None) -> None:
+        """Перечитать подписку одного пользователя (с его шарда)."""
+        async for session in get_session(shard):
+            until = await SubscriptionRepository(session).active_until(user_id)
+            break
+        if until is None:
+            self._active.pop(user_id, None)
+        else:
+            self._active[user_id] = until
+
+    async def notify(self, user_id: int) -> None:
+        """Применить изменение подписки локально и оповестить другие процессы."""
+        await self.refresh(user_id)
+        try:
+            await redis_client.publish(CHANNEL, f"{current_shard.get()}:{user_id}")
+        except (RedisError, RuntimeError):
+            logger.warning("Entitlement change of user %s not published", user_id, exc_info=True)
+
+    async def start(self) -> None:
+        """Загрузить подписки и подписаться на изменения."""
+        await self.reload()
+        self._listener = asyncio.create_task(self._listen(), name="entitlements-listener")
+
+    async def stop(self) -> None:
+        """Остановить прослушивание канала."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _apply(self, data: bytes | str) -> None:
+        """Обновить права по сообщению «шард:user_id»; ошибка не останавливает канал."""
+        if isinstance(data, bytes):
+            data = data.decode()
+        try:
+            shard, user_id = data.split(":")
+            await self.refresh(int(user_id), int(shard))
+        except ValueError:
+            logger.error("Malformed entitlement change %r dropped", data)
+        except SQLAlchemyError:
+            logger.warning("Entitlement refresh for %r failed", data, exc_info=True)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub()
+                await pubsub.subscribe(CHANNEL)
+                # События до подписки могли быть пропущены
+                await self.reload()
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        await self._apply(message["data"])
+            except (RedisError, RuntimeError, OSError, SQLAlchemyError):
+                logger.warning("Entitlements listener disconnected", exc_info=True)
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+
+# Глобальный экземпляр
+entitlements = Entitlements()
+
+
+async def expire_subscriptions() -> None:
+    """Закрыть истекшие периоды и сбросить права затронутых пользователей."""
+    expired = 0
+    for shard in shard_ids():
+        with use_shard(shard):
+            async for session in get_session():
+                user_ids = await SubscriptionRepository(session).expire_due(datetime.utcnow())
+                await session.commit()
+                break
+            for user_id in user_ids:
+                await entitlements.notify(user_id)
+        expired += len(user_ids)
+    if expired:
+        logger.info("Expired subscriptions of %d users", expired)
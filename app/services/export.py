@@ -0,0 +1,91 @@
+"""Формирование файлов выгрузки записей."""
+
+import csv
+from collections.abc import Iterable
+from datetime import date
+from io import BytesIO, StringIO
+
+from openpyxl import Workbook
+
+from app.adapters import current_tenant
+from app.domain.models import Entry
+from app.services.cache import LRUCache, data_versions
+
+ExportKey = tuple[str, int, str, date, date, int]
+
+EXPORT_HEADERS = [
+    "Дата",
+    "Уровень боли (категория)",
+    "Оценка боли (1-10)",
+    "Описание боли",
+    "Приступ",
+    "Заметки",
+]
+
+EXPORT_MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# file_id уже загруженного в Telegram файла и подпись к нему; file_id
+# действителен только для загрузившего его бота, поэтому ключ включает арендатора
+_file_ids: LRUCache[ExportKey, tuple[str, str]] = LRUCache(maxsize=4096)
+
+
+def export_key(user_id: int, export_format: str, start: date, end: date) -> ExportKey:
+    """Ключ кэша выгрузки по версии данных пользователя.
+
+    Берется до чтения записей, чтобы правка во время формирования файла
+    не закрепила в кэше устаревший результат.
+    """
+    return (current_tenant.get(), user_id, export_format, start, end, data_versions.get(user_id))
+
+
+def get_cached_export(key: ExportKey) -> tuple[str, str] | None:
+    """file_id и подпись ранее отправленной выгрузки с теми же данными."""
+    return _file_ids.get(key)
+
+
+def cache_export(key: ExportKey, file_id: str, caption: str) -> None:
+    """Запомнить file_id отправленной выгрузки."""
+    _file_ids.set(key, (file_id, caption))
+
+
+def forget_export(key: ExportKey) -> None:
+    """Забыть выгрузку, которую Telegram больше не принимает по file_id."""
+    _file_ids.delete(key)
+
+
+def _entry_to_row(entry: Entry) -> list[str]:
+    """Преобразовать запись в строку для экспорта."""
+    return [
+        entry.entry_date.isoformat(),
+        entry.pain_level.value if entry.pain_level else "",
+        str(entry.pain_score) if entry.pain_score is not None else "",
+        entry.pain_description or "",
+        "да" if entry.had_attack else "нет",
+        entry.notes or "",
+    ]
+
+
+def build_csv(entries: Iterable[Entry]) -> bytes:
+    """Сформировать CSV с записями."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    for entry in entries:
+        writer.writerow(_entry_to_row(entry))
+    return buffer.getvalue().encode("utf-8")
+
+
+def build_xlsx(entries: Iterable[Entry]) -> bytes:
+    """Сформировать XLSX с записями."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Записи"
+    ws.append(EXPORT_HEADERS)
+    for entry in entries:
+        ws.append(_entry_to_row(entry))
+    stream = BytesIO()
+    wb.save(stream)
+    return stream.getvalue()
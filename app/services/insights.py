@@ -0,0 +1,153 @@
+"""Анализ связи симптомов с сильной болью и приступами."""
+
+import numpy as np
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.repository import EntryRepository, SymptomRepository
+from app.services.cache import LRUCache, data_versions
+
+HIGH_PAIN_SCORE = 7
+MIN_SYMPTOM_DAYS = 3
+
+
+class SymptomInsight(BaseModel):
+    """Статистика по одному симптому."""
+
+    name: str
+    days: int
+    high_pain_days: int
+    attack_days: int
+    lift_high_pain: float | None = None
+    lift_attack: float | None = None
+    pain_correlation: float | None = None
+
+
+class Insights(BaseModel):
+    """Результат анализа истории пользователя."""
+
+    total_days: int
+    scored_days: int
+    high_pain_days: int
+    attack_days: int
+    attack_pain_correlation: float | None = None
+    symptoms: list[SymptomInsight] = []
+
+
+_cache: LRUCache[int, tuple[int, Insights]] = LRUCache(maxsize=2048)
+
+
+def _lift(joint: np.ndarray, support: np.ndarray, target_total: int, n: int) -> np.ndarray:
+    """lift = P(A и B) / (P(A) * P(B)) для всех симптомов сразу."""
+    denom = support.astype(np.float64) * target_total
+    out = np.full(joint.shape, np.nan)
+    np.divide(joint * float(n), denom, out=out, where=denom > 0)
+    return out
+
+
+def _columns_corr(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Корреляция Пирсона каждой колонки x с вектором y."""
+    if x.shape[0] < 2:
+        return np.full(x.shape[1], np.nan)
+    xc = x - x.mean(axis=0)
+    yc = y - y.mean()
+    denom = np.sqrt((xc * xc).sum(axis=0) * (yc @ yc))
+    out = np.full(x.shape[1], np.nan)
+    np.divide(xc.T @ yc, denom, out=out, where=denom > 0)
+    return out
+
+
+def _as_float(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def compute_insights(
+    entries: list[tuple[int, int | None, bool]],
+    symptoms: list[tuple[int, str]],
+    high_pain_score: int = HIGH_PAIN_SCORE,
+    min_symptom_days: int = MIN_SYMPTOM_DAYS,
+) -> Insights:
+    """Посчитать совместную встречаемость, lift и корреляции.
+
+    Записи раскладываются в колонки, симптомы — в булеву матрицу
+    «день × симптом»; все метрики считаются матричными операциями.
+    """
+    n = len(entries)
+    if n == 0:
+        return Insights(total_days=0, scored_days=0, high_pain_days=0, attack_days=0)
+
+    entry_ids = np.fromiter((e[0] for e in entries), dtype=np.int64, count=n)
+    scores = np.fromiter(
+        (np.nan if e[1] is None else e[1] for e in entries), dtype=np.float64, count=n
+    )
+    attacks = np.fromiter((e[2] for e in entries), dtype=np.bool_, count=n)
+
+    scored = ~np.isnan(scores)
+    high = scored & (np.nan_to_num(scores) >= high_pain_score)
+    high_total = int(high.sum())
+    attack_total = int(attacks.sum())
+
+    attack_corr = _columns_corr(attacks[scored, None].astype(np.float64), scores[scored])
+
+    insights = Insights(
+        total_days=n,
+        scored_days=int(scored.sum()),
+        high_pain_days=high_total,
+        attack_days=attack_total,
+        attack_pain_correlation=_as_float(attack_corr[0]),
+    )
+    if not symptoms:
+        return insights
+
+    order = np.argsort(entry_ids)
+    sym_entry_ids = np.fromiter((s[0] for s in symptoms), dtype=np.int64, count=len(symptoms))
+    positions = np.searchsorted(entry_ids, sym_entry_ids, sorter=order)
+    positions = np.clip(positions, 0, n - 1)
+    rows = order[positions]
+    known = entry_ids[rows] == sym_entry_ids
+
+    names, codes = np.unique(
+        np.array([s[1].strip().lower() for s in symptoms], dtype=object), return_inverse=True
+    )
+    matrix = np.zeros((n, len(names)), dtype=np.bool_)
+    matrix[rows[known], codes[known]] = True
+
+    as_int = matrix.astype(np.int32)
+    days = as_int.sum(axis=0)
+    joint_high = as_int.T @ high.astype(np.int32)
+    joint_attack = as_int.T @ attacks.astype(np.int32)
+    lift_high = _lift(joint_high, days, high_total, n)
+    lift_attack = _lift(joint_attack, days, attack_total, n)
+    pain_corr = _columns_corr(matrix[scored].astype(np.float64), scores[scored])
+
+    selected = np.flatnonzero(days >= min_symptom_days)
+    rank = np.nan_to_num(lift_high[selected], nan=-1.0)
+    selected = selected[np.argsort(-rank, kind="stable")]
+
+    insights.symptoms = [
+        SymptomInsight(
+            name=str(names[i]),
+            days=int(days[i]),
+            high_pain_days=int(joint_high[i]),
+            attack_days=int(joint_attack[i]),
+            lift_high_pain=_as_float(lift_high[i]),
+            lift_attack=_as_float(lift_attack[i]),
+            pain_correlation=_as_float(pain_corr[i]),
+        )
+        for i in selected
+    ]
+    return insights
+
+
+async def get_insights(session: AsyncSession, user_id: int) -> Insights:
+    """Получить анализ пользователя, пересчитывая его только при изменении данных."""
+    version = data_versions.get(user_id)
+    cached = _cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    entries = await EntryRepository(session).list_score_columns(user_id)
+    symptoms = await SymptomRepository(session).list_names_by_user(user_id)
+    insights = compute_insights(entries, symptoms)
+    _cache.set(user_id, (version, insights))
+    return insights
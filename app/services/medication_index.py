@@ -0,0 +1,120 @@
+"""Внутрипроцессный префиксный индекс препаратов для подсказок."""
+
+import logging
+from bisect import bisect_left, insort
+from collections import Counter
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.repository import MedicationCatalogRepository, MedicationRepository
+from app.domain.models import MedicationType
+from app.domain.validators import normalize_medication_name
+
+logger = logging.getLogger(__name__)
+
+
+class MedicationSuggestion(BaseModel):
+    """Подсказка препарата для inline-клавиатуры."""
+
+    catalog_id: int
+    name: str
+    medication_type: MedicationType
+    count: int
+
+
+class MedicationIndex:
+    """Справочник препаратов и частота их приема по пользователям.
+
+    Названия хранятся в отсортированном массиве нормализованных имен:
+    поиск по префиксу — два bisect. Индекс загружается при старте и
+    дополняется по мере добавления препаратов, без запросов к БД.
+    """
+
+    def __init__(self) -> None:
+        self._sorted: list[tuple[str, int]] = []
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        self._usage: dict[int, Counter[tuple[int, str]]] = {}
+
+    async def load(self, session: AsyncSession) -> None:
+        """Загрузить справочник и статистику приема из БД (шарда 0)."""
+        catalog = await MedicationCatalogRepository(session).list_all()
+
+        self._names = {catalog_id: name for catalog_id, name in catalog}
+        self._ids = {normalize_medication_name(name): catalog_id for catalog_id, name in catalog}
+        self._sorted = sorted(self._ids.items())
+        self._usage = {}
+        await self.load_usage(session)
+        logger.info(
+            "Medication index loaded: %d names, %d users", len(self._names), len(self._usage)
+        )
+
+    async def load_usage(self, session: AsyncSession) -> None:
+        """Добавить статистику приема пользователей еще одного шарда."""
+        for user_id, catalog_id, med_type, count in await MedicationRepository(
+            session
+        ).usage_counts():
+            self._usage.setdefault(user_id, Counter())[(catalog_id, med_type)] += count
+
+    def lookup(self, name: str) -> tuple[int, str] | None:
+        """Найти (id, название) в справочнике по имени."""
+        catalog_id = self._ids.get(normalize_medication_name(name))
+        if catalog_id is None:
+            return None
+        return catalog_id, self._names[catalog_id]
+
+    def add(self, catalog_id: int, name: str) -> None:
+        """Добавить препарат в справочник индекса."""
+        if catalog_id in self._names:
+            return
+        key = normalize_medication_name(name)
+        self._names[catalog_id] = name
+        self._ids[key] = catalog_id
+        insort(self._sorted, (key, catalog_id))
+
+    def record_usage(self, user_id: int, catalog_id: int, medication_type: str) -> None:
+        """Учесть прием препарата пользователем."""
+        self._usage.setdefault(user_id, Counter())[(catalog_id, medication_type)] += 1
+
+    def forget_user(self, user_id: int) -> None:
+        """Удалить статистику пользователя."""
+        self._usage.pop(user_id, None)
+
+    def _prefix_ids(self, prefix: str) -> set[int]:
+        key = normalize_medication_name(prefix)
+        start = bisect_left(self._sorted, (key,))
+        end = bisect_left(self._sorted, (key + "\uffff",), lo=start)
+        return {catalog_id for _, catalog_id in self._sorted[start:end]}
+
+    def suggest(self, user_id: int, prefix: str = "", limit: int = 8) -> list[MedicationSuggestion]:
+        """Частые препараты пользователя, начинающиеся с префикса."""
+        usage = self._usage.get(user_id)
+        if not usage:
+            return []
+        allowed = self._prefix_ids(prefix) if prefix.strip() else None
+        suggestions = []
+        seen = set()
+        for (catalog_id, med_type), count in usage.most_common():
+            if catalog_id in seen or (allowed is not None and catalog_id not in allowed):
+                continue
+            seen.add(catalog_id)
+            suggestions.append(
+                MedicationSuggestion(
+                    catalog_id=catalog_id,
+                    name=self._names[catalog_id],
+                    medication_type=MedicationType(med_type),
+                    count=count,
+                )
+            )
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    def name_of(self, catalog_id: int) -> str | None:
+        """Название препарата по id справочника."""
+        return self._names.get(catalog_id)
+
+
+# Глобальный экземпляр
+medication_index = MedicationIndex()
@@ -0,0 +1,157 @@
+"""Удаление данных пользователя небольшими порциями."""
+
+import asyncio
+import logging
+
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters import get_session, redis_client, shard_ids, use_shard, use_tenant
+from app.adapters.database import DIRECTORY_SHARD
+from app.adapters.repository import (
+    EntryEventRepository,
+    EntryRepository,
+    MedicationRepository,
+    PurgeJobRepository,
+    ShardDirectoryRepository,
+    SymptomRepository,
+    UserRepository,
+)
+from app.config import settings
+from app.domain.models import PurgeJob, PurgeStage
+from app.services.cache import data_versions
+from app.services.medication_index import medication_index
+from app.services.sharding import shard_router
+
+logger = logging.getLogger(__name__)
+
+NEXT_STAGE = {
+    PurgeStage.MEDICATIONS: PurgeStage.SYMPTOMS,
+    PurgeStage.SYMPTOMS: PurgeStage.ENTRIES,
+    PurgeStage.ENTRIES: PurgeStage.EVENTS,
+    PurgeStage.EVENTS: PurgeStage.USER,
+    PurgeStage.USER: PurgeStage.DONE,
+}
+
+# Задания выполняются по одному на процесс
+_lock = asyncio.Lock()
+_background: set[asyncio.Task[None]] = set()
+
+
+async def invalidate_user_caches(user_id: int) -> None:
+    """Сбросить все кэши с данными пользователя."""
+    data_versions.bump(user_id)
+    medication_index.forget_user(user_id)
+    try:
+        await redis_client.delete(f"search:{user_id}")
+    except (RedisError, RuntimeError):
+        logger.warning("Failed to drop redis keys of user %s", user_id, exc_info=True)
+
+
+async def _delete_batch(session: AsyncSession, user_id: int, stage: PurgeStage) -> int:
+    limit = settings.purge_batch_size
+    if stage is PurgeStage.MEDICATIONS:
+        return await MedicationRepository(session).delete_batch_by_user(user_id, limit)
+    if stage is PurgeStage.SYMPTOMS:
+        return await SymptomRepository(session).delete_batch_by_user(user_id, limit)
+    if stage is PurgeStage.ENTRIES:
+        return await EntryRepository(session).delete_batch_by_user(user_id, limit)
+    if stage is PurgeStage.EVENTS:
+        # События, сброшенные позже, удалит каскад вместе с пользователем
+        return await EntryEventRepository(session).delete_batch_by_user(user_id, limit)
+    return await UserRepository(session).delete(user_id)
+
+
+async def _run_step(job: PurgeJob, stage: PurgeStage) -> PurgeStage:
+    """Удалить одну порцию в своей короткой транзакции и сохранить прогресс."""
+    async for session in get_session():
+        # Не ждать чужие блокировки: лучше повторить порцию позже
+        await session.execute(
+            text(f"SET LOCAL lock_timeout = {int(settings.purge_lock_timeout_ms)}")
+        )
+        try:
+            deleted = await _delete_batch(session, job.user_id, stage)
+        except IntegrityError:
+            # Пока шло удаление, пользователь успел добавить записи
+            await session.rollback()
+            next_stage, deleted = PurgeStage.MEDICATIONS, 0
+        else:
+            full_batch = stage is not PurgeStage.USER and deleted >= settings.purge_batch_size
+            next_stage = stage if full_batch else NEXT_STAGE[stage]
+        await PurgeJobRepository(session).advance(job.id, next_stage, deleted)
+        await session.commit()
+        return next_stage
+    return stage
+
+
+async def _record_failure(job: PurgeJob, error: DBAPIError) -> None:
+    try:
+        async for session in get_session():
+            await PurgeJobRepository(session).record_failure(job.id, str(error.orig or error))
+            await session.commit()
+            break
+    except DBAPIError:
+        logger.warning("Failed to record purge failure of user %s", job.user_id, exc_info=True)
+
+
+async def run_job(job: PurgeJob) -> None:
+    """Довести задание до конца, продолжая с сохраненного этапа.
+
+    Ошибки БД повторяются не больше PURGE_MAX_RETRIES раз подряд, затем
+    ошибка сохраняется в задании: оно продолжится на следующем запуске, а
+    остальные задания не ждут его.
+    """
+    stage = job.stage
+    pause = settings.purge_pause_ms / 1000
+    retries = 0
+    while stage is not PurgeStage.DONE:
+        try:
+            stage = await _run_step(job, stage)
+        except DBAPIError as error:
+            retries += 1
+            if retries > settings.purge_max_retries:
+                logger.error("Purge of user %s failed at %s", job.user_id, stage, exc_info=True)
+                await _record_failure(job, error)
+                return
+            logger.warning("Purge of user %s backed off at %s", job.user_id, stage, exc_info=True)
+            await asyncio.sleep(pause * 10)
+            continue
+        retries = 0
+        await asyncio.sleep(pause)
+    # Следующий апдейт пользователя заново выберет шард, как для нового
+    with use_tenant(job.tenant_id):
+        async for session in get_session(DIRECTORY_SHARD):
+            await ShardDirectoryRepository(session).delete(job.telegram_id)
+            await session.commit()
+            break
+        shard_router.forget(job.telegram_id)
+    await invalidate_user_caches(job.user_id)
+    logger.info("Purge of user %s finished", job.user_id)
+
+
+async def run_pending_purges() -> None:
+    """Выполнить все незавершенные задания на удаление на всех шардах."""
+    async with _lock:
+        for shard in shard_ids():
+            with use_shard(shard):
+                async for session in get_session():
+                    jobs = await PurgeJobRepository(session).list_pending()
+                    break
+                for job in jobs:
+                    await run_job(job)
+
+
+async def _run_logged() -> None:
+    try:
+        await run_pending_purges()
+    except Exception:
+        logger.exception("Purge run failed")
+
+
+def request_purge_run() -> None:
+    """Запустить удаление в фоне, не дожидаясь планировщика."""
+    task = asyncio.create_task(_run_logged())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
@@ -0,0 +1,117 @@
+"""Маршрутизация пользователей по шардам и общий справочник препаратов."""
+
+import logging
+import time
+from collections.abc import Iterable
+
+from app.adapters import current_shard, current_tenant, get_session, shard_ids
+from app.adapters.database import DIRECTORY_SHARD
+from app.adapters.repository import MedicationCatalogRepository, ShardDirectoryRepository
+from app.config import settings
+from app.domain.models import ShardPlacement
+from app.domain.validators import normalize_medication_name
+from app.services.cache import LRUCache
+from app.services.medication_index import medication_index
+
+logger = logging.getLogger(__name__)
+
+
+class ShardRouter:
+    """Определяет шард пользователя по справочнику на шарде 0.
+
+    Ответы кэшируются в процессе на ttl секунд. Инструмент переноса
+    (app.tools.move_user) ждет дольше ttl после отметки moving, поэтому
+    к началу копирования ни один процесс уже не пишет на старый шард.
+    """
+
+    def __init__(self, ttl: float = 30.0, maxsize: int = 100_000) -> None:
+        self.ttl = ttl
+        self._cache: LRUCache[tuple[str, int], tuple[float, ShardPlacement]] = LRUCache(
+            maxsize=maxsize
+        )
+
+    def pick_new(self, telegram_id: int) -> int:
+        """Шард для нового пользователя."""
+        candidates = settings.shard_new_users or list(shard_ids())
+        return candidates[telegram_id % len(candidates)]
+
+    async def resolve(self, telegram_id: int) -> ShardPlacement:
+        """Шард пользователя; новый пользователь закрепляется за шардом."""
+        key = (current_tenant.get(), telegram_id)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        async for session in get_session(DIRECTORY_SHARD):
+            repo = ShardDirectoryRepository(session)
+            placement = await repo.get(telegram_id)
+            if placement is None:
+                placement = await repo.assign(telegram_id, self.pick_new(telegram_id))
+                await session.commit()
+            break
+        self._cache.set(key, (time.monotonic() + self.ttl, placement))
+        return placement
+
+    def forget(self, telegram_id: int) -> None:
+        """Сбросить закэшированный шард пользователя текущего арендатора."""
+        self._cache.delete((current_tenant.get(), telegram_id))
+
+
+# Глобальный экземпляр
+shard_router = ShardRouter(ttl=settings.shard_directory_ttl_seconds)
+
+# (шард, catalog_id), уже скопированные из справочника шарда 0
+_mirrored: set[tuple[int, int]] = set()
+
+
+async def mirror_catalog(items: Iterable[tuple[int, str]]) -> None:
+    """Скопировать препараты справочника на шард текущего пользователя.
+
+    id препаратов выдает только шард 0, остальные шарды хранят копию с
+    теми же id, поэтому catalog_id из индекса подсказок годится везде.
+    """
+    shard = current_shard.get()
+    if shard == DIRECTORY_SHARD:
+        return
+    missing = [
+        (catalog_id, name) for catalog_id, name in items if (shard, catalog_id) not in _mirrored
+    ]
+    if not missing:
+        return
+    async for session in get_session():
+        await MedicationCatalogRepository(session).insert_known(missing)
+        await session.commit()
+        break
+    _mirrored.update((shard, catalog_id) for catalog_id, _ in missing)
+
+
+async def ensure_catalog(names: list[str]) -> dict[str, tuple[int, str]]:
+    """Найти или добавить препараты в общий справочник.
+
+    Возвращает «нормализованное имя → (id, название)», как
+    MedicationCatalogRepository.ensure, и копирует строки на шард
+    текущего пользователя.
+    """
+    if not names:
+        return {}
+    async for session in get_session(DIRECTORY_SHARD):
+        resolved = await MedicationCatalogRepository(session).ensure(names)
+        await session.commit()
+        break
+    await mirror_catalog(resolved.values())
+    return resolved
+
+
+async def resolve_catalog(names: list[str]) -> list[tuple[int, str]]:
+    """(id, название в справочнике) для каждого имени, в том же порядке.
+
+    Известные индексу подсказок имена не требуют запроса к шарду 0.
+    """
+    known = [medication_index.lookup(name) for name in names]
+    resolved = await ensure_catalog(
+        [name for name, hit in zip(names, known, strict=True) if hit is None]
+    )
+    await mirror_catalog(hit for hit in known if hit is not None)
+    return [
+        hit if hit is not None else resolved[normalize_medication_name(name)]
+        for name, hit in zip(names, known, strict=True)
+    ]
@@ -0,0 +1,64 @@
+"""Привязка погоды к записям дневника."""
+
+import asyncio
+import logging
+from datetime import date, datetime
+
+from app.adapters import get_session
+from app.adapters.repository import EntryRepository
+from app.adapters.weather import weather_client
+from app.config import settings
+from app.domain.models import ChangeAction, ChangeEntity, EntryEvent, User
+from app.services import change_log
+from app.services.cache import data_versions
+
+logger = logging.getLogger(__name__)
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+_background: set[asyncio.Task[None]] = set()
+
+
+async def attach_weather(
+    user_id: int, entry_id: int, latitude: float, longitude: float, day: date
+) -> None:
+    """Загрузить погоду за день и сохранить ее в записи."""
+    weather = await weather_client.get_daily(latitude, longitude, day)
+    if weather is None:
+        return
+    async for session in get_session():
+        await EntryRepository(session).set_weather(
+            entry_id, weather.pressure_hpa, weather.temperature_c
+        )
+        await session.commit()
+        break
+    data_versions.bump(user_id)
+    await change_log.record(
+        EntryEvent(
+            user_id=user_id,
+            entity=ChangeEntity.ENTRY,
+            entity_id=entry_id,
+            action=ChangeAction.UPDATE,
+            changes={"pressure_hpa": weather.pressure_hpa, "temperature_c": weather.temperature_c},
+            occurred_at=datetime.utcnow(),
+        )
+    )
+
+
+async def _attach_logged(
+    user_id: int, entry_id: int, latitude: float, longitude: float, day: date
+) -> None:
+    try:
+        await attach_weather(user_id, entry_id, latitude, longitude, day)
+    except Exception:
+        logger.exception("Failed to attach weather to entry %s", entry_id)
+
+
+def schedule_weather(user: User, entry_id: int, day: date) -> None:
+    """Привязать погоду к записи в фоне, не задерживая ответ пользователю."""
+    if not settings.weather_enabled or user.latitude is None or user.longitude is None:
+        return
+    task = asyncio.create_task(
+        _attach_logged(user.id, entry_id, user.latitude, user.longitude, day)
+    )
+    _background.add(task)
+    task.add_done_callback(_background.discard)
@@ -0,0 +1,155 @@
+"""Отложенная запись правок дневника через Redis Stream.
+
+Команды /set_* в режиме WRITE_BEHIND_ENABLED проверяют ввод, кладут правку
+в поток и сразу отвечают. Применяет правки отдельный процесс
+(app.workers.applier), после коммита он публикует id затронутых
+пользователей в канал, и бот увеличивает их версии данных.
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterable, Mapping
+from datetime import date, datetime
+
+from redis.exceptions import RedisError
+
+from app.adapters import current_shard, redis_client
+from app.config import settings
+from app.domain.models import EntryMutation
+from app.domain.validators import EntryUpdate
+from app.services.cache import data_versions
+
+logger = logging.getLogger(__name__)
+
+STREAM = "entry_mutations"
+GROUP = "entry-mutations-applier"
+CHANNEL = "data_changes"
+RECONNECT_DELAY_SECONDS = 5.0
+
+# Счетчик не примененных правок пользователя удаляется, дойдя до нуля
+RELEASE_LUA = """
+local left = redis.call('DECRBY', KEYS[1], ARGV[1])
+if left <= 0 then
+    redis.call('DEL', KEYS[1])
+end
+return left
+"""
+
+# (шард, пользователь, дата) — одна запись дневника
+EntryKey = tuple[int, int, date]
+
+
+def _pending_key(shard: int, user_id: int) -> str:
+    """Число правок пользователя в потоке: увеличивает enqueue, уменьшает acknowledge."""
+    return f"{STREAM}:pending:{shard}:{user_id}"
+
+
+async def enqueue(user_id: int, entry_date: date, data: EntryUpdate) -> bool:
+    """Поставить правку записи в очередь.
+
+    Возвращает False, если Redis недоступен: тогда вызывающий код пишет в
+    БД сам, как без отложенной записи.
+    """
+    mutation = EntryMutation(
+        user_id=user_id,
+        entry_date=entry_date,
+        changes=data.model_dump(mode="json", exclude_none=True),
+        queued_at=datetime.utcnow(),
+    )
+    shard = current_shard.get()
+    message = {"mutation": mutation.model_dump_json(), "shard": str(shard)}
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.xadd(STREAM, message, maxlen=settings.write_stream_maxlen, approximate=True)
+            pipe.incr(_pending_key(shard, user_id))
+    except (RedisError, RuntimeError):
+        logger.warning("Failed to queue entry mutation of user %s", user_id, exc_info=True)
+        return False
+    return True
+
+
+async def has_pending(user_id: int, shard: int) -> bool:
+    """Есть ли в очереди не примененные правки пользователя на шарде."""
+    return await redis_client.exists(_pending_key(shard, user_id))
+
+
+async def acknowledge(message_ids: list[str], released: Mapping[tuple[int, int], int]) -> None:
+    """Подтвердить сообщения и уменьшить счетчики правок пользователей.
+
+    released — число сообщений по (шард, пользователь). Подтверждение и
+    счетчики меняются одной транзакцией MULTI/EXEC.
+    """
+    if not message_ids:
+        return
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.xack(STREAM, GROUP, *message_ids)
+        pipe.xdel(STREAM, *message_ids)
+        for (shard, user_id), count in released.items():
+            pipe.eval(RELEASE_LUA, 1, _pending_key(shard, user_id), count)
+
+
+def coalesce(mutations: Iterable[tuple[int, EntryMutation]]) -> dict[EntryKey, EntryUpdate]:
+    """Свести правки одной записи в одну; более поздние поля побеждают.
+
+    mutations — пары (шард, правка) в порядке потока.
+    """
+    merged: dict[EntryKey, dict] = {}
+    for shard, mutation in mutations:
+        key = (shard, mutation.user_id, mutation.entry_date)
+        merged.setdefault(key, {}).update(mutation.changes)
+    return {key: EntryUpdate(**changes) for key, changes in merged.items()}
+
+
+async def publish_changes(user_ids: Iterable[int]) -> None:
+    """Сообщить ботам, что данные пользователей изменились."""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id in set(user_ids):
+            pipe.publish(CHANNEL, str(user_id))
+
+
+class DataChangeListener:
+    """Увеличивает версии данных пользователей по сообщениям из канала.
+
+    Кэши бота ключуются версией (см. DataVersions), поэтому правки,
+    примененные другим процессом, становятся видны после сообщения.
+    Сообщения, пришедшие за время разрыва соединения, теряются: такие
+    пользователи до следующей правки могут видеть кэш без нее.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Подписаться на канал изменений."""
+        self._task = asyncio.create_task(self._listen(), name="data-change-listener")
+
+    async def stop(self) -> None:
+        """Остановить прослушивание канала."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub()
+                await pubsub.subscribe(CHANNEL)
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        data_versions.bump(int(message["data"]))
+            except (RedisError, RuntimeError, OSError):
+                logger.warning("Data change listener disconnected", exc_info=True)
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+
+# Глобальный экземпляр
+data_change_listener = DataChangeListener()
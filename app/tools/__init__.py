@@ -0,0 +1 @@
+"""Служебные утилиты: нагрузочное тестирование, проверки, локальные заглушки."""
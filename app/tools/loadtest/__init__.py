@@ -0,0 +1 @@
+"""Нагрузочный тест бота против локальной заглушки Telegram Bot API."""
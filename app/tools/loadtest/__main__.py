@@ -0,0 +1,122 @@
+"""Запуск нагрузочного теста.
+
+Пример (Postgres и Redis подняты локально, миграции применены):
+
+    python -m app.tools.loadtest --users 200 --duration 60 --latency-ms 50 --rate-429 0.01
+
+Поднимает заглушку Bot API, запускает настоящий `python -m app.main`
+с BOT_API_URL, указывающим на нее, и печатает устойчивую пропускную
+способность и перцентили сквозной задержки ответа.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from aiohttp import web
+
+from app.tools.loadtest.fake_bot_api import FakeBotApi, LoadTestConfig, LoadTestStats
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Migrebot load test")
+    parser.add_argument("--users", type=int, default=100, help="Число имитируемых пользователей")
+    parser.add_argument("--duration", type=float, default=60.0, help="Длительность замера, с")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Прогрев перед замером, с")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Пауза пользователя, мс")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Задержка Bot API, мс")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument(
+        "--no-spawn",
+        action="store_true",
+        help="Не запускать бота (он уже запущен с BOT_API_URL на заглушку)",
+    )
+    parser.add_argument(
+        "--throttle",
+        action="store_true",
+        help="Оставить ограничение частоты запросов у запущенного бота",
+    )
+    return parser.parse_args()
+
+
+async def spawn_bot(api_url: str, throttle: bool = False) -> asyncio.subprocess.Process:
+    """Запустить app.main против заглушки.
+
+    Имитируемый пользователь шлет около 1000 / think-ms запросов в секунду,
+    больше пополнения token bucket, поэтому без --throttle ограничение частоты
+    выключается: иначе замер показывал бы отказы лимитера, а не емкость бота.
+    Дедупликация тоже выключается: заглушка нумерует апдейты с 1 при каждом
+    запуске, и повторный прогон отбросил бы их как уже обработанные.
+    """
+    env = {
+        **os.environ,
+        "BOT_API_URL": api_url,
+        "BOT_TOKEN": os.environ.get("BOT_TOKEN", "123456:LOADTEST"),
+        "THROTTLE_ENABLED": "true" if throttle else "false",
+        "DEDUP_ENABLED": "false",
+    }
+    return await asyncio.create_subprocess_exec(sys.executable, "-m", "app.main", env=env)
+
+
+async def run(args: argparse.Namespace) -> None:
+    api = FakeBotApi(
+        LoadTestConfig(
+            users=args.users,
+            think_time_ms=args.think_ms,
+            api_latency_ms=args.latency_ms,
+            rate_429=args.rate_429,
+        )
+    )
+    runner = web.AppRunner(api.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    api_url = f"http://{args.host}:{args.port}"
+    logger.info("Fake Bot API listening on %s", api_url)
+
+    process = None if args.no_spawn else await spawn_bot(api_url, args.throttle)
+    try:
+        api.start_users()
+        await asyncio.sleep(args.warmup)
+        # Замер начинается с нуля: прогрев не попадает ни в один счетчик
+        api.stats = LoadTestStats()
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        elapsed = time.perf_counter() - started
+        stats = api.stats
+        replied = stats.replied
+        delivered = stats.delivered
+    finally:
+        await api.stop_users()
+        if process is not None and process.returncode is None:
+            process.terminate()
+            await process.wait()
+        await runner.cleanup()
+
+    print(f"users:               {args.users}")
+    print(f"window:              {elapsed:.1f} s")
+    print(f"updates delivered:   {delivered} ({delivered / elapsed:.1f}/s)")
+    print(f"updates answered:    {replied} ({replied / elapsed:.1f}/s)")
+    print(f"reply timeouts:      {stats.timeouts}")
+    print(f"outbound API calls:  {stats.outbound_calls}")
+    print(f"429 responses:       {stats.throttled_429}")
+    print(
+        "reply latency ms:    "
+        f"p50={stats.percentile(50):.0f} p95={stats.percentile(95):.0f} "
+        f"p99={stats.percentile(99):.0f} max={stats.percentile(100):.0f}"
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Локальная заглушка Telegram Bot API для нагрузочного теста.
+
+Сервер раздает синтетические апдейты через getUpdates от имитируемых
+пользователей и принимает исходящие вызовы (sendMessage, sendDocument и т.д.)
+с настраиваемой задержкой и долей ответов 429. Каждый пользователь работает
+по замкнутому циклу: отправил команду, дождался ответа, подумал, отправил
+следующую. Время от выдачи апдейта боту до первого ответа в тот же чат —
+сквозная задержка.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+BASE_TELEGRAM_ID = 1_000_000_000
+
+SCENARIO = [
+    "/entry",
+    "/today",
+    "/set_score 6",
+    "/set_pain_desc пульсирующая боль в виске",
+    "/add_sym тошнота:5, светобоязнь:7",
+    "/add_med abortive ибупрофен 400мг",
+    "/recent",
+    "/headache",
+    "/insights",
+    "/search боль",
+    "/help",
+]
+
+REPLY_METHODS = {
+    "sendMessage",
+    "sendDocument",
+    "sendPhoto",
+    "editMessageText",
+    "answerCallbackQuery",
+}
+
+
+@dataclass
+class LoadTestConfig:
+    """Параметры нагрузки."""
+
+    users: int = 100
+    think_time_ms: float = 500.0
+    reply_timeout_s: float = 10.0
+    api_latency_ms: float = 30.0
+    rate_429: float = 0.0
+    retry_after_s: int = 1
+    batch_limit: int = 100
+
+
+@dataclass
+class LoadTestStats:
+    """Накопленные метрики."""
+
+    delivered: int = 0
+    replied: int = 0
+    timeouts: int = 0
+    outbound_calls: int = 0
+    throttled_429: int = 0
+    latencies_ms: list[float] = field(default_factory=list)
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        data = sorted(self.latencies_ms)
+        index = min(len(data) - 1, max(0, round(q / 100 * (len(data) - 1))))
+        return data[index]
+
+
+class FakeBotApi:
+    """Имитация Bot API и пользователей."""
+
+    def __init__(self, config: LoadTestConfig) -> None:
+        self.config = config
+        self.stats = LoadTestStats()
+        self._updates: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._update_id = 0
+        self._message_id = 0
+        self._pending: dict[int, float] = {}
+        self._replied: dict[int, asyncio.Event] = {}
+        self._users: list[asyncio.Task[None]] = []
+        self._running = False
+
+    # --- имитация пользователей ---
+
+    def _next_update(self, telegram_id: int, text: str) -> dict[str, Any]:
+        self._update_id += 1
+        self._message_id += 1
+        user = {
+            "id": telegram_id,
+            "is_bot": False,
+            "first_name": f"load{telegram_id - BASE_TELEGRAM_ID}",
+            "username": f"load_{telegram_id}",
+        }
+        return {
+            "update_id": self._update_id,
+            "message": {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": telegram_id, "type": "private"},
+                "from": user,
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+            },
+        }
+
+    async def _user_loop(self, telegram_id: int) -> None:
+        step = random.randrange(len(SCENARIO))
+        await asyncio.sleep(random.random() * self.config.think_time_ms / 1000)
+        while self._running:
+            event = asyncio.Event()
+            self._replied[telegram_id] = event
+            self._pending.pop(telegram_id, None)
+            await self._updates.put(self._next_update(telegram_id, SCENARIO[step]))
+            step = (step + 1) % len(SCENARIO)
+            try:
+                await asyncio.wait_for(event.wait(), self.config.reply_timeout_s)
+            except TimeoutError:
+                self.stats.timeouts += 1
+            think = random.expovariate(1000 / self.config.think_time_ms)
+            await asyncio.sleep(think)
+
+    def start_users(self) -> None:
+        """Запустить имитируемых пользователей."""
+        self._running = True
+        self._users = [
+            asyncio.create_task(self._user_loop(BASE_TELEGRAM_ID + i))
+            for i in range(self.config.users)
+        ]
+
+    async def stop_users(self) -> None:
+        """Остановить имитируемых пользователей."""
+        self._running = False
+        for task in self._users:
+            task.cancel()
+        await asyncio.gather(*self._users, return_exceptions=True)
+
+    # --- HTTP API ---
+
+    def _message(self, chat_id: int, **extra: object) -> dict[str, Any]:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "migrebot"},
+            **extra,
+        }
+
+    def _record_reply(self, chat_id: int) -> None:
+        dispatched = self._pending.pop(chat_id, None)
+        if dispatched is not None:
+            self.stats.replied += 1
+            self.stats.latencies_ms.append((time.perf_counter() - dispatched) * 1000)
+        event = self._replied.get(chat_id)
+        if event is not None:
+            event.set()
+
+    async def _get_updates(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        timeout = min(float(params.get("timeout", 0) or 0), 1.0)
+        limit = min(int(params.get("limit", 100) or 100), self.config.batch_limit)
+        batch: list[dict[str, Any]] = []
+        try:
+            batch.append(await asyncio.wait_for(self._updates.get(), timeout or 0.05))
+        except TimeoutError:
+            return []
+        while len(batch) < limit and not self._updates.empty():
+            batch.append(self._updates.get_nowait())
+        now = time.perf_counter()
+        for update in batch:
+            self._pending[update["message"]["chat"]["id"]] = now
+        self.stats.delivered += len(batch)
+        return batch
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Обработать вызов метода Bot API."""
+        method = request.match_info["method"]
+        params: dict[str, Any] = dict(await request.post())
+
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+        if method == "getMe":
+            return web.json_response(
+                {
+                    "ok": True,
+                    "result": {
+                        "id": 1,
+                        "is_bot": True,
+                        "first_name": "migrebot",
+                        "username": "migrebot_load_bot",
+                    },
+                }
+            )
+        if method not in REPLY_METHODS:
+            return web.json_response({"ok": True, "result": True})
+
+        self.stats.outbound_calls += 1
+        if self.config.api_latency_ms:
+            await asyncio.sleep(self.config.api_latency_ms / 1000)
+        if random.random() < self.config.rate_429:
+            self.stats.throttled_429 += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.config.retry_after_s}",
+                    "parameters": {"retry_after": self.config.retry_after_s},
+                },
+                status=429,
+            )
+
+        if method == "answerCallbackQuery":
+            return web.json_response({"ok": True, "result": True})
+
+        chat_id = int(params.get("chat_id", 0))
+        self._record_reply(chat_id)
+        if method == "sendDocument":
+            result = self._message(
+                chat_id,
+                document={"file_id": f"doc{self._message_id}", "file_unique_id": "d"},
+            )
+        elif method == "sendPhoto":
+            result = self._message(
+                chat_id,
+                photo=[
+                    {
+                        "file_id": f"photo{self._message_id}",
+                        "file_unique_id": "p",
+                        "width": 800,
+                        "height": 400,
+                    }
+                ],
+            )
+        else:
+            result = self._message(chat_id, text=str(params.get("text", "")))
+        return web.json_response({"ok": True, "result": result})
+
+    def make_app(self) -> web.Application:
+        """Собрать aiohttp-приложение."""
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
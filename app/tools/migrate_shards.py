@@ -0,0 +1,76 @@
+"""Применение миграций ко всем шардам.
+
+Запуск:
+
+    python -m app.tools.migrate_shards [revision]
+
+Для каждого DSN из SHARD_DSNS (или единственного POSTGRES_DSN) выполняет
+`alembic upgrade` с `-x shard=N`: по номеру env.py выбирает базу, а
+миграция 0011 настраивает последовательности id этого шарда. Шард 0
+мигрирует первым — на нем справочник шардов и строки, созданные до
+шардирования. Их максимальный id передается остальным шардам как
+`-x floor=N`, чтобы новые id не совпали со старыми.
+"""
+
+import argparse
+import asyncio
+import logging
+from argparse import Namespace
+
+from alembic.config import Config
+from sqlalchemy import pool, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from alembic import command
+from app.adapters.database import DIRECTORY_SHARD, shard_ids
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Таблицы с id из чередующихся последовательностей (см. миграцию 0011)
+SHARDED_TABLES = ("users", "entries", "medications", "symptoms", "subscriptions", "entry_events")
+
+
+async def read_id_floor(dsn: str) -> int:
+    """Максимальный id среди шардируемых таблиц базы."""
+    engine = create_async_engine(dsn, poolclass=pool.NullPool)
+    try:
+        async with engine.connect() as connection:
+            maximums = ", ".join(
+                f"(SELECT coalesce(max(id), 0) FROM {table})" for table in SHARDED_TABLES
+            )
+            return int(await connection.scalar(text(f"SELECT greatest({maximums})")))
+    finally:
+        await engine.dispose()
+
+
+def upgrade_shard(
+    shard: int, revision: str, floor: int | None = None, config_path: str = "alembic.ini"
+) -> None:
+    """Применить миграции к одному шарду."""
+    x = [f"shard={shard}"]
+    if floor is not None:
+        x.append(f"floor={floor}")
+    config = Config(config_path, cmd_opts=Namespace(x=x))
+    command.upgrade(config, revision)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run alembic upgrade on every shard")
+    parser.add_argument("revision", nargs="?", default="head")
+    parser.add_argument("--config", default="alembic.ini", help="Path to alembic.ini")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    logger.info("Upgrading shard %d to %s", DIRECTORY_SHARD, args.revision)
+    upgrade_shard(DIRECTORY_SHARD, args.revision, config_path=args.config)
+    floor = asyncio.run(read_id_floor(settings.shard_dsn_list[DIRECTORY_SHARD]))
+    for shard in shard_ids():
+        if shard == DIRECTORY_SHARD:
+            continue
+        logger.info("Upgrading shard %d to %s (id floor %d)", shard, args.revision, floor)
+        upgrade_shard(shard, args.revision, floor, args.config)
+
+
+if __name__ == "__main__":
+    main()
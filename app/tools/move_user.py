@@ -0,0 +1,223 @@
+"""Перенос пользователя на другой шард.
+
+Запуск:
+
+    python -m app.tools.move_user --telegram-id 123456 --to 1 [--tenant clinic]
+
+Порядок:
+
+1. пользователь отмечается в справочнике как переносимый (moving), и
+   инструмент ждет, пока истечет кэш справочника во всех процессах бота,
+   сбросчик журнала изменений допишет события, а applier применит правки
+   пользователя из очереди отложенной записи; с этого момента бот отвечает
+   пользователю «повторите через минуту» и ничего не пишет;
+2. строки пользователя копируются на новый шард одной транзакцией (остатки
+   прерванного прошлого переноса сначала удаляются), препараты справочника
+   копируются туда же с их id;
+3. справочник переключается на новый шард, moving снимается;
+4. строки удаляются со старого шарда.
+
+id не меняются: последовательности шардов выдают непересекающиеся id
+(миграция 0011). При ошибке до шага 3 отметка moving снимается, и
+пользователь остается на старом шарде.
+"""
+
+import argparse
+import asyncio
+import logging
+from time import monotonic
+from typing import Any
+
+from sqlalchemy import Table, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters import get_session, redis_client, shard_ids, use_tenant
+from app.adapters.database import DIRECTORY_SHARD, dispose_engines
+from app.adapters.models import (
+    EntryEventModel,
+    EntryModel,
+    MedicationCatalogModel,
+    MedicationModel,
+    SubscriptionModel,
+    SymptomModel,
+    UserModel,
+)
+from app.adapters.repository import (
+    MedicationCatalogRepository,
+    PurgeJobRepository,
+    ShardDirectoryRepository,
+    UserRepository,
+)
+from app.config import settings
+from app.domain.models import DEFAULT_TENANT
+from app.services import write_queue
+
+logger = logging.getLogger(__name__)
+
+INSERT_CHUNK = 1000
+# Запас сверх TTL кэша справочника и интервала сброса журнала
+SETTLE_SECONDS = 5.0
+# Ожидание applier, который применяет правки из очереди (app.workers.applier)
+QUEUE_POLL_SECONDS = 2.0
+QUEUE_DRAIN_TIMEOUT_SECONDS = 300.0
+
+UserRows = dict[Table, list[dict[str, Any]]]
+
+
+def _user_filters(user_id: int) -> list[tuple[Table, Any]]:
+    """Таблицы с данными пользователя в порядке вставки (родители раньше детей)."""
+    entry_ids = select(EntryModel.id).where(EntryModel.user_id == user_id)
+    return [
+        (UserModel.__table__, UserModel.id == user_id),
+        (EntryModel.__table__, EntryModel.user_id == user_id),
+        (MedicationModel.__table__, MedicationModel.entry_id.in_(entry_ids)),
+        (SymptomModel.__table__, SymptomModel.entry_id.in_(entry_ids)),
+        (SubscriptionModel.__table__, SubscriptionModel.user_id == user_id),
+        (EntryEventModel.__table__, EntryEventModel.user_id == user_id),
+    ]
+
+
+async def read_rows(session: AsyncSession, user_id: int) -> UserRows:
+    """Все строки пользователя на шарде."""
+    rows: UserRows = {}
+    for table, condition in _user_filters(user_id):
+        result = await session.execute(select(table).where(condition))
+        rows[table] = [dict(row) for row in result.mappings()]
+    return rows
+
+
+async def delete_rows(session: AsyncSession, user_id: int) -> None:
+    """Удалить строки пользователя с шарда (дети раньше родителей)."""
+    for table, condition in reversed(_user_filters(user_id)):
+        await session.execute(delete(table).where(condition))
+
+
+async def write_rows(session: AsyncSession, rows: UserRows) -> None:
+    """Вставить строки, прочитанные read_rows, с их исходными id."""
+    for table, table_rows in rows.items():
+        for start in range(0, len(table_rows), INSERT_CHUNK):
+            await session.execute(insert(table), table_rows[start : start + INSERT_CHUNK])
+
+
+async def _catalog_items(catalog_ids: set[int]) -> list[tuple[int, str]]:
+    if not catalog_ids:
+        return []
+    async for session in get_session(DIRECTORY_SHARD):
+        result = await session.execute(
+            select(MedicationCatalogModel.id, MedicationCatalogModel.name).where(
+                MedicationCatalogModel.id.in_(catalog_ids)
+            )
+        )
+        return [tuple(row) for row in result.all()]
+    return []
+
+
+async def _set_moving(telegram_id: int, moving: bool) -> None:
+    async for session in get_session(DIRECTORY_SHARD):
+        await ShardDirectoryRepository(session).set_moving(telegram_id, moving)
+        await session.commit()
+        break
+
+
+async def _wait_queue_drained(user_id: int, shard: int) -> None:
+    """Дождаться, пока applier применит правки пользователя из очереди."""
+    deadline = monotonic() + QUEUE_DRAIN_TIMEOUT_SECONDS
+    while await write_queue.has_pending(user_id, shard):
+        if monotonic() >= deadline:
+            raise SystemExit(f"Entry mutations of user {user_id} are still queued, not moving")
+        logger.info("Waiting for queued entry mutations of user %s", user_id)
+        await asyncio.sleep(QUEUE_POLL_SECONDS)
+
+
+async def move_user(telegram_id: int, target: int) -> None:
+    """Перенести пользователя на шард target."""
+    if target not in shard_ids():
+        raise SystemExit(f"Unknown shard {target}")
+    async for session in get_session(DIRECTORY_SHARD):
+        placement = await ShardDirectoryRepository(session).get(telegram_id)
+        break
+    if placement is None:
+        raise SystemExit(f"User {telegram_id} is not in the shard directory")
+    source = placement.shard
+    if source == target:
+        logger.info("User %s is already on shard %d", telegram_id, target)
+        return
+
+    async for session in get_session(source):
+        user = await UserRepository(session).get_by_telegram_id(telegram_id)
+        if user is None:
+            raise SystemExit(f"User {telegram_id} not found on shard {source}")
+        purge = await PurgeJobRepository(session).get_pending_by_user(user.id)
+        break
+    if purge is not None:
+        raise SystemExit(f"User {telegram_id} has a pending purge, not moving")
+
+    await _set_moving(telegram_id, True)
+    try:
+        settle = (
+            settings.shard_directory_ttl_seconds
+            + settings.event_flush_interval_seconds
+            + SETTLE_SECONDS
+        )
+        logger.info("User %s marked as moving, waiting %.0f s", telegram_id, settle)
+        await asyncio.sleep(settle)
+        await _wait_queue_drained(user.id, source)
+
+        async for session in get_session(source):
+            rows = await read_rows(session, user.id)
+            break
+        medications = rows[MedicationModel.__table__]
+        catalog = await _catalog_items({row["catalog_id"] for row in medications})
+
+        async for session in get_session(target):
+            await delete_rows(session, user.id)
+            if target != DIRECTORY_SHARD:
+                await MedicationCatalogRepository(session).insert_known(catalog)
+            await write_rows(session, rows)
+            await session.commit()
+            break
+    except BaseException:
+        await _set_moving(telegram_id, False)
+        raise
+
+    async for session in get_session(DIRECTORY_SHARD):
+        await ShardDirectoryRepository(session).move(telegram_id, target)
+        await session.commit()
+        break
+    logger.info(
+        "User %s switched to shard %d (%s)",
+        telegram_id,
+        target,
+        ", ".join(f"{table.name}={len(table_rows)}" for table, table_rows in rows.items()),
+    )
+
+    async for session in get_session(source):
+        await delete_rows(session, user.id)
+        await session.commit()
+        break
+    logger.info("User %s removed from shard %d", telegram_id, source)
+
+
+async def _run(tenant_id: str, telegram_id: int, target: int) -> None:
+    await redis_client.connect()
+    try:
+        with use_tenant(tenant_id):
+            await move_user(telegram_id, target)
+    finally:
+        await redis_client.disconnect()
+        await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move a user to another shard")
+    parser.add_argument("--telegram-id", type=int, required=True)
+    parser.add_argument("--to", type=int, required=True, help="Target shard number")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Bot the user belongs to")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    asyncio.run(_run(args.tenant, args.telegram_id, args.to))
+
+
+if __name__ == "__main__":
+    main()
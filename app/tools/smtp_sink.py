@@ -0,0 +1,131 @@
+"""Локальный SMTP-приемник для проверки рассылок.
+
+Пример:
+
+    python -m app.tools.smtp_sink --port 2525 --save-dir /tmp/mail
+
+и бот с MAIL_ENABLED=true SMTP_HOST=127.0.0.1 SMTP_PORT=2525. Приемник
+принимает любые письма, по желанию сохраняет их в .eml и периодически
+печатает число соединений и писем — по нему видно, что письма идут
+пачками по переиспользуемым соединениям. --fail-rate отвечает 451 на
+часть писем, чтобы проверить повторы; с --reject-code 550 отказ
+постоянный, и такие письма повторяться не должны.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class SmtpSink:
+    """Минимальный SMTP-сервер: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def __init__(
+        self, save_dir: Path | None = None, fail_rate: float = 0.0, reject_code: int = 451
+    ) -> None:
+        self.save_dir = save_dir
+        self.fail_rate = fail_rate
+        self.reject_code = reject_code
+        self.connections = 0
+        self.messages = 0
+        self.rejected = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обслужить одно SMTP-соединение."""
+        self.connections += 1
+
+        async def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 migrebot-sink ESMTP")
+        recipients: list[str] = []
+        try:
+            while line := await reader.readline():
+                command = line.decode("utf-8", "replace").strip()
+                verb = command[:4].upper()
+                if verb == "EHLO":
+                    writer.write(b"250-migrebot-sink\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+                    await writer.drain()
+                elif verb == "HELO":
+                    await reply("250 migrebot-sink")
+                elif verb == "MAIL":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.partition(":")[2].strip(" <>"))
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = await self._read_data(reader)
+                    if random.random() < self.fail_rate:
+                        self.rejected += 1
+                        await reply(self._rejection())
+                        continue
+                    self.messages += 1
+                    self._save(data)
+                    await reply("250 OK: queued")
+                elif verb in {"RSET", "NOOP"}:
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _rejection(self) -> str:
+        if self.reject_code >= 500:
+            return f"{self.reject_code} Message rejected permanently"
+        return f"{self.reject_code} Temporary failure, try again later"
+
+    async def _read_data(self, reader: asyncio.StreamReader) -> bytes:
+        lines = []
+        while (line := await reader.readline()) not in {b".\r\n", b".\n", b""}:
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        return b"".join(lines)
+
+    def _save(self, data: bytes) -> None:
+        if self.save_dir is None:
+            return
+        self.save_dir.mkdir(parents=True, exist_ok=True)
+        (self.save_dir / f"{self.messages:06d}.eml").write_bytes(data)
+
+
+async def run(args: argparse.Namespace) -> None:
+    sink = SmtpSink(save_dir=args.save_dir, fail_rate=args.fail_rate, reject_code=args.reject_code)
+    server = await asyncio.start_server(sink.handle, args.host, args.port)
+    logger.info("SMTP sink listening on %s:%s", args.host, args.port)
+    async with server:
+        while True:
+            await asyncio.sleep(args.report_interval)
+            logger.info(
+                "connections: %d, messages: %d, rejected: %d",
+                sink.connections,
+                sink.messages,
+                sink.rejected,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--save-dir", type=Path, default=None, help="Куда сохранять .eml")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Доля отказов")
+    parser.add_argument("--reject-code", type=int, default=451, help="Код отказа (4xx или 5xx)")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Период отчета, с")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Локальная заглушка погодного API (формат Open-Meteo).
+
+Пример:
+
+    python -m app.tools.weather_stub --port 8090 --latency-ms 200
+
+и бот с WEATHER_API_URL=http://127.0.0.1:8090. Заглушка отдает
+детерминированные почасовые давление и температуру, зависящие от
+координат и даты, и периодически печатает число обращений — по нему
+видно, что пользователи одной ячейки сетки стоят одного запроса.
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+from collections import Counter
+from datetime import date
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherStub:
+    """Обработчик /v1/forecast со счетчиком запросов."""
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.calls: Counter[tuple[str, str, str]] = Counter()
+
+    def hourly(self, latitude: float, longitude: float, day: date) -> dict[str, list]:
+        """Почасовые значения за день."""
+        phase = day.toordinal() / 3 + latitude + longitude
+        pressure = [
+            round(1013 + 12 * math.sin(phase) + 2 * math.sin(hour / 24 * math.tau), 1)
+            for hour in range(24)
+        ]
+        temperature = [
+            round(10 - abs(latitude) / 4 + 6 * math.sin((hour - 8) / 24 * math.tau), 1)
+            for hour in range(24)
+        ]
+        return {
+            "time": [f"{day.isoformat()}T{hour:02d}:00" for hour in range(24)],
+            "pressure_msl": pressure,
+            "temperature_2m": temperature,
+        }
+
+    async def forecast(self, request: web.Request) -> web.Response:
+        query = request.query
+        try:
+            latitude = float(query["latitude"])
+            longitude = float(query["longitude"])
+            day = date.fromisoformat(query["start_date"])
+        except (KeyError, ValueError):
+            return web.json_response({"error": True, "reason": "bad request"}, status=400)
+
+        self.calls[(query["latitude"], query["longitude"], query["start_date"])] += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if self.error_rate and sum(self.calls.values()) % round(1 / self.error_rate) == 0:
+            return web.json_response({"error": True, "reason": "stub failure"}, status=503)
+        return web.json_response(
+            {
+                "latitude": latitude,
+                "longitude": longitude,
+                "hourly": self.hourly(latitude, longitude, day),
+            }
+        )
+
+    def make_app(self) -> web.Application:
+        """Собрать aiohttp-приложение."""
+        app = web.Application()
+        app.router.add_get("/v1/forecast", self.forecast)
+        return app
+
+
+async def run(args: argparse.Namespace) -> None:
+    stub = WeatherStub(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    runner = web.AppRunner(stub.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    logger.info("Weather stub listening on http://%s:%s", args.host, args.port)
+    try:
+        while True:
+            await asyncio.sleep(args.report_interval)
+            logger.info(
+                "upstream calls: %d total, %d distinct buckets",
+                sum(stub.calls.values()),
+                len(stub.calls),
+            )
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Weather API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Задержка ответа, мс")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 503")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Период отчета, с")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
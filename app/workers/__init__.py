@@ -0,0 +1 @@
+"""Отдельные фоновые процессы, работающие рядом с ботом."""
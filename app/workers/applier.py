@@ -0,0 +1,201 @@
+"""Применение отложенных правок дневника из Redis Stream.
+
+Запуск (рядом с ботом, запущенным с WRITE_BEHIND_ENABLED=true):
+
+    python -m app.workers.applier
+
+Процесс читает поток entry_mutations группой потребителей, копит пачку до
+WRITE_BATCH_SIZE сообщений или WRITE_FLUSH_INTERVAL_SECONDS, сводит правки
+одной записи в один UPDATE и применяет пачку одной транзакцией на шард.
+Правки применяются только к существующим записям, как и без отложенной
+записи: правка записи, удаленной после постановки в очередь, логируется и
+отбрасывается. Сообщения подтверждаются только после коммита; при сбое БД
+пачка повторяется, и повтор безопасен — правки лишь задают значения полей.
+"""
+
+import asyncio
+import logging
+import signal
+import socket
+import time
+from collections import Counter
+
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+from sqlalchemy.exc import DBAPIError
+
+from app.adapters import get_session, redis_client, shard_ids, use_shard
+from app.adapters.database import dispose_engines
+from app.adapters.repository import EntryRepository
+from app.config import settings
+from app.domain.models import EntryEvent, EntryMutation
+from app.domain.validators import EntryUpdate
+from app.services import change_log, write_queue
+from app.services.write_queue import GROUP, STREAM, EntryKey, coalesce, publish_changes
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY_SECONDS = 5.0
+CLAIM_INTERVAL_SECONDS = 60.0
+
+
+class MutationApplier:
+    """Читает очередь правок и применяет их пачками."""
+
+    def __init__(
+        self,
+        consumer: str | None = None,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        claim_idle_seconds: int = 60,
+    ) -> None:
+        self.consumer = consumer or socket.gethostname()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.claim_idle_seconds = claim_idle_seconds
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Дописать прочитанную пачку и завершиться."""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Применять правки до вызова stop()."""
+        batch: list[tuple[str, dict[str, str]]] = []
+        recovered = False
+        last_claim = 0.0
+        while True:
+            try:
+                await redis_client.stream_ensure_group(STREAM, GROUP)
+                if not recovered:
+                    # Выданные этому потребителю до перезапуска, но не примененные
+                    while pending := await redis_client.stream_read_group(
+                        STREAM, GROUP, self.consumer, self.batch_size, pending=True
+                    ):
+                        await self.apply(pending)
+                    recovered = True
+                while not self._stopping.is_set():
+                    if time.monotonic() - last_claim >= CLAIM_INTERVAL_SECONDS:
+                        last_claim = time.monotonic()
+                        batch += await redis_client.stream_claim(
+                            STREAM,
+                            GROUP,
+                            self.consumer,
+                            self.claim_idle_seconds * 1000,
+                            self.batch_size,
+                        )
+                    deadline = time.monotonic() + self.flush_interval
+                    while len(batch) < self.batch_size and not self._stopping.is_set():
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        batch += await redis_client.stream_read_group(
+                            STREAM,
+                            GROUP,
+                            self.consumer,
+                            self.batch_size - len(batch),
+                            block_ms=max(1, int(min(remaining, 1.0) * 1000)),
+                        )
+                    await self.apply(batch)
+                    batch = []
+                await self.apply(batch)
+                return
+            except (RedisError, DBAPIError, OSError):
+                # Пачка остается в памяти и в списке неподтвержденных сообщений
+                logger.warning("Applying %d entry mutations failed", len(batch), exc_info=True)
+                if self._stopping.is_set():
+                    return
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+
+    async def apply(self, batch: list[tuple[str, dict[str, str]]]) -> None:
+        """Применить пачку сообщений и подтвердить ее."""
+        if not batch:
+            return
+        mutations: list[tuple[int, EntryMutation]] = []
+        released: Counter[tuple[int, int]] = Counter()
+        for message_id, fields in batch:
+            try:
+                mutation = EntryMutation.model_validate_json(fields["mutation"])
+                shard = int(fields["shard"])
+                released[(shard, mutation.user_id)] += 1
+                EntryUpdate.model_validate(mutation.changes)
+                if shard not in shard_ids():
+                    raise ValueError(f"unknown shard {shard}")
+            except (KeyError, ValueError, ValidationError):
+                # Повтор не поможет: сообщение подтверждается вместе с пачкой
+                logger.error("Malformed entry mutation %s dropped: %r", message_id, fields)
+                continue
+            mutations.append((shard, mutation))
+
+        by_shard: dict[int, dict[EntryKey, EntryUpdate]] = {}
+        for key, data in coalesce(mutations).items():
+            by_shard.setdefault(key[0], {})[key] = data
+        for shard, updates in by_shard.items():
+            events = await self._apply_shard(shard, updates)
+            with use_shard(shard):
+                await change_log.record(events)
+            await publish_changes(event.user_id for event in events)
+        await write_queue.acknowledge([message_id for message_id, _ in batch], released)
+        logger.debug(
+            "Applied %d entry mutations as %d entry updates",
+            len(batch),
+            sum(len(updates) for updates in by_shard.values()),
+        )
+
+    async def _apply_shard(
+        self, shard: int, updates: dict[EntryKey, EntryUpdate]
+    ) -> list[EntryEvent]:
+        """Применить сведенные правки одного шарда одной транзакцией."""
+        events: list[EntryEvent] = []
+        async for session in get_session(shard):
+            repo = EntryRepository(session)
+            existing = await repo.lock_by_user_dates(
+                [(user_id, entry_date) for _, user_id, entry_date in updates]
+            )
+            for (_, user_id, entry_date), data in updates.items():
+                entry = existing.get((user_id, entry_date))
+                if entry is None:
+                    # Бот проверил запись до постановки в очередь: ее удалили позже
+                    logger.warning(
+                        "Entry mutation of user %s for missing entry %s dropped",
+                        user_id,
+                        entry_date,
+                    )
+                    continue
+                await repo.apply_update(entry.id, data)
+                events.append(change_log.entry_updated(entry, data))
+            await session.commit()
+            break
+        return events
+
+
+async def run() -> None:
+    """Работать до SIGTERM или SIGINT."""
+    applier = MutationApplier(
+        consumer=settings.write_consumer_name,
+        batch_size=settings.write_batch_size,
+        flush_interval=settings.write_flush_interval_seconds,
+        claim_idle_seconds=settings.write_claim_idle_seconds,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, applier.stop)
+    await redis_client.connect()
+    try:
+        logger.info("Entry mutation applier started")
+        await applier.run()
+    finally:
+        await redis_client.disconnect()
+        await dispose_engines()
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=settings.log_level,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
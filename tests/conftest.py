@@ -0,0 +1,56 @@
+"""Общие фикстуры тестов."""
+
+import os
+from collections.abc import AsyncIterator
+
+import pytest
+from sqlalchemy import pool, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.adapters.database import dispose_engines
+from app.config import settings
+
+CONNECT_TIMEOUT_SECONDS = 5
+
+
+async def connect_or_skip(dsn: str) -> AsyncEngine:
+    """Движок для базы dsn; тест пропускается, если база недоступна."""
+    engine = create_async_engine(
+        dsn, poolclass=pool.NullPool, connect_args={"timeout": CONNECT_TIMEOUT_SECONDS}
+    )
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except (OSError, SQLAlchemyError) as exc:
+        await engine.dispose()
+        pytest.skip(f"Postgres недоступен ({dsn}): {exc}")
+    return engine
+
+
+@pytest.fixture
+async def db_session() -> AsyncIterator[AsyncSession]:
+    """Сессия к DATABASE_URL (по умолчанию POSTGRES_DSN); изменения откатываются."""
+    engine = await connect_or_skip(os.environ.get("DATABASE_URL", settings.postgres_dsn))
+    try:
+        async with AsyncSession(engine) as session:
+            yield session
+            await session.rollback()
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def two_shards() -> AsyncIterator[None]:
+    """Пропустить тест, если SHARD_DSNS не задает двух доступных шардов."""
+    dsns = settings.shard_dsn_list
+    if len(dsns) < 2:
+        pytest.skip("SHARD_DSNS не задает двух шардов")
+    for dsn in dsns[:2]:
+        engine = await connect_or_skip(dsn)
+        await engine.dispose()
+    try:
+        yield
+    finally:
+        # Пулы приложения привязаны к циклу событий теста
+        await dispose_engines()
@@ -0,0 +1,91 @@
+"""Планы запросов EntryRepository.
+
+Каждый читающий метод репозитория вызывается через сессию, которая перед
+выполнением запроса снимает его план через EXPLAIN. Последовательное
+сканирование запрещено на время проверки (enable_seqscan = off), поэтому
+Seq Scan в плане означает, что для запроса нет подходящего индекса, а Sort —
+что индекс не отдает строки в нужном порядке (см. покрывающий индекс
+ix_entries_user_date_covering из миграции 0005).
+"""
+
+from collections.abc import Awaitable, Callable
+from datetime import date, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import Result, ScalarResult, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+
+from app.adapters.repository import EntryRepository
+
+FORBIDDEN_NODES = {"Seq Scan", "Sort", "Incremental Sort"}
+
+# Поиск упорядочен по релевантности, которую индекс отдать не может
+ALLOWED_NODES: dict[str, set[str]] = {"search": {"Sort"}}
+
+
+class PlanCapturingSession:
+    """Обертка над AsyncSession, записывающая план каждого запроса."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+        self.plans: list[tuple[str, dict[str, Any]]] = []
+
+    async def _explain(self, statement: Executable) -> None:
+        connection = await self._session.connection()
+        compiled = statement.compile(dialect=connection.dialect)
+        params = compiled.construct_params()
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}",
+            tuple(params[name] for name in compiled.positiontup or ()),
+        )
+        self.plans.append((str(compiled), result.scalar_one()[0]["Plan"]))
+
+    async def execute(self, statement: Executable) -> Result[Any]:
+        await self._explain(statement)
+        return await self._session.execute(statement)
+
+    async def scalars(self, statement: Executable) -> ScalarResult[Any]:
+        await self._explain(statement)
+        return await self._session.scalars(statement)
+
+
+def plan_nodes(plan: dict[str, Any]) -> list[str]:
+    """Типы всех узлов плана."""
+    nodes = [plan["Node Type"]]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def entry_queries() -> dict[str, Callable[[EntryRepository], Awaitable[Any]]]:
+    """Читающие запросы EntryRepository с типичными аргументами."""
+    today = date.today()
+    return {
+        "get_by_id": lambda repo: repo.get_by_id(1),
+        "get_by_user_and_date": lambda repo: repo.get_by_user_and_date(1, today),
+        "list_by_user": lambda repo: repo.list_by_user(1, limit=10),
+        "list_by_date_range": lambda repo: repo.list_by_date_range(
+            1, today - timedelta(days=30), today
+        ),
+        "list_by_users_and_range": lambda repo: repo.list_by_users_and_range(
+            [1, 2, 3], today - timedelta(days=30), today
+        ),
+        "search": lambda repo: repo.search(1, "боль", after=(0.5, 100)),
+        "list_score_columns": lambda repo: repo.list_score_columns(1),
+        "month_days": lambda repo: repo.month_days(1, today.replace(day=1), today),
+    }
+
+
+@pytest.mark.parametrize("name", list(entry_queries()))
+async def test_entry_query_uses_index(db_session: AsyncSession, name: str) -> None:
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    capturing = PlanCapturingSession(db_session)
+    await entry_queries()[name](EntryRepository(capturing))  # type: ignore[arg-type]
+
+    assert capturing.plans
+    for sql, plan in capturing.plans:
+        nodes = plan_nodes(plan)
+        bad = set(nodes) & (FORBIDDEN_NODES - ALLOWED_NODES.get(name, set()))
+        assert not bad, f"{name}: {' -> '.join(nodes)}\n{sql}"
@@ -0,0 +1,123 @@
+"""Отметки ежемесячных отчетов по итогам отправки через локальный SMTP-приемник."""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import fakeredis
+import pytest
+
+from app.adapters import redis_client, use_tenant
+from app.adapters.mail import MailSender, OutgoingMail
+from app.scheduler import reports
+from app.tools.smtp_sink import SmtpSink
+
+MONTH = "2024-03"
+WAIT_SECONDS = 5.0
+
+
+@pytest.fixture
+async def fake_redis(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[fakeredis.FakeAsyncRedis]:
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(redis_client, "_client", client)
+    yield client
+    await client.aclose()
+
+
+async def start_sender(sink: SmtpSink, max_attempts: int = 3) -> tuple[asyncio.Server, MailSender]:
+    server = await asyncio.start_server(sink.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    sender = MailSender(
+        sender="bot@example.com",
+        host="127.0.0.1",
+        port=port,
+        timeout=WAIT_SECONDS,
+        connections=1,
+        max_attempts=max_attempts,
+        retry_base_delay=0.01,
+    )
+    sender.add_callback(reports._on_mail_result)
+    await sender.start()
+    return server, sender
+
+
+async def wait_idle(sink: SmtpSink) -> None:
+    """Дождаться, пока приемник получит письма и перестанет их получать.
+
+    Повторы идут по таймеру, поэтому пустая очередь еще не значит, что
+    попытки кончились.
+    """
+    seen = 0
+    async with asyncio.timeout(WAIT_SECONDS):
+        while True:
+            await asyncio.sleep(0.2)
+            total = sink.messages + sink.rejected
+            if total and total == seen:
+                return
+            seen = total
+
+
+async def send_report(sink: SmtpSink, tenant_id: str = "default", max_attempts: int = 3) -> str:
+    """Отправить один отчет, дождавшись итога; вернуть ключ отметки."""
+    with use_tenant(tenant_id):
+        key = reports._marker(MONTH, 1)
+    await redis_client.set(key, reports.QUEUED, ex=reports.QUEUED_MARKER_TTL)
+    server, sender = await start_sender(sink, max_attempts)
+    try:
+        await sender.put(
+            OutgoingMail(to="user@example.com", subject="Отчет", body="Текст", tag=key)
+        )
+        await wait_idle(sink)
+        await sender.stop(drain_seconds=WAIT_SECONDS)
+    finally:
+        server.close()
+        await server.wait_closed()
+    return key
+
+
+@pytest.mark.parametrize("tenant_id", ["default", "second-bot"])
+async def test_sent_report_is_marked(fake_redis, tenant_id):
+    sink = SmtpSink()
+
+    key = await send_report(sink, tenant_id)
+
+    assert key.startswith("report:sent:" if tenant_id == "default" else f"{tenant_id}:report:")
+    assert sink.messages == 1
+    assert await redis_client.get(key) == "1"
+
+
+async def test_exhausted_retries_release_marker(fake_redis):
+    sink = SmtpSink(fail_rate=1.0, reject_code=451)
+
+    key = await send_report(sink, max_attempts=2)
+
+    assert sink.rejected == 2
+    assert await redis_client.get(key) is None
+
+
+async def test_permanent_rejection_is_not_retried(fake_redis):
+    sink = SmtpSink(fail_rate=1.0, reject_code=550)
+
+    key = await send_report(sink, max_attempts=3)
+
+    assert sink.rejected == 1
+    assert await redis_client.get(key) == "1"
+
+
+async def test_unsent_report_on_stop_releases_marker(fake_redis):
+    sink = SmtpSink()
+    with use_tenant("default"):
+        key = reports._marker(MONTH, 1)
+    await redis_client.set(key, reports.QUEUED, ex=reports.QUEUED_MARKER_TTL)
+    server, sender = await start_sender(sink)
+    try:
+        # Воркеры остановлены до отправки: письмо остается в очереди
+        for task in sender._workers:
+            task.cancel()
+        await sender.put(OutgoingMail(to="user@example.com", subject="Отчет", body="", tag=key))
+        await sender.stop(drain_seconds=0.1)
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    assert sink.messages == 0
+    assert await redis_client.get(key) is None
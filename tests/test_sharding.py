@@ -0,0 +1,59 @@
+"""Пользователи на двух шардах (нужны SHARD_DSNS с двумя доступными базами)."""
+
+import uuid
+
+from app.adapters import get_session, use_tenant
+from app.adapters.repository import ShardDirectoryRepository, UserRepository
+from app.config import settings
+from app.services.sharding import ShardRouter
+
+# Шард k выдает id вида n * 64 + k (миграция 0011_sharding)
+SHARD_ID_STEP = 64
+USERS_PER_SHARD = 3
+
+
+async def test_users_get_unique_ids_on_their_shards(two_shards, monkeypatch):
+    monkeypatch.setattr(settings, "shard_new_users", [0, 1])
+    router = ShardRouter(ttl=0)
+    telegram_ids = range(9_000_000_000, 9_000_000_000 + 2 * USERS_PER_SHARD)
+    created: dict[int, tuple[int, int]] = {}
+
+    # Отдельный арендатор не пересекается с настоящими пользователями
+    with use_tenant(f"test-{uuid.uuid4().hex[:16]}"):
+        try:
+            for telegram_id in telegram_ids:
+                placement = await router.resolve(telegram_id)
+                async for session in get_session(placement.shard):
+                    user = await UserRepository(session).create(telegram_id)
+                    await session.commit()
+                    break
+                created[telegram_id] = (placement.shard, user.id)
+
+            ids = [user_id for _, user_id in created.values()]
+            assert len(set(ids)) == len(ids)
+            assert {shard for shard, _ in created.values()} == {0, 1}
+            for shard, user_id in created.values():
+                assert user_id % SHARD_ID_STEP == shard
+
+            for telegram_id, (shard, user_id) in created.items():
+                assert (await router.resolve(telegram_id)).shard == shard
+                async for session in get_session(shard):
+                    user = await UserRepository(session).get_by_telegram_id(telegram_id)
+                    break
+                assert user is not None and user.id == user_id
+                async for session in get_session(1 - shard):
+                    other = await UserRepository(session).get_by_telegram_id(telegram_id)
+                    break
+                assert other is None
+        finally:
+            for shard, user_id in created.values():
+                async for session in get_session(shard):
+                    await UserRepository(session).delete(user_id)
+                    await session.commit()
+                    break
+            async for session in get_session(0):
+                directory = ShardDirectoryRepository(session)
+                for telegram_id in telegram_ids:
+                    await directory.delete(telegram_id)
+                await session.commit()
+                break
@@ -0,0 +1,117 @@
+"""Погодный клиент против локальной заглушки API."""
+
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import date
+
+import pytest
+from aiohttp import web
+
+from app.adapters.weather import WeatherClient
+from app.services import weather as weather_service
+from app.services.cache import data_versions
+from app.tools.weather_stub import WeatherStub
+
+DAY = date(2024, 3, 1)
+
+
+async def start_stub(stub: WeatherStub) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(stub.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+@pytest.fixture
+async def stub_client(
+    request: pytest.FixtureRequest,
+) -> AsyncIterator[tuple[WeatherStub, WeatherClient]]:
+    """Заглушка и подключенный к ней клиент; параметры заглушки — через indirect."""
+    options = getattr(request, "param", {})
+    stub = WeatherStub(
+        latency_ms=options.get("latency_ms", 0.0), error_rate=options.get("error_rate", 0.0)
+    )
+    runner, base_url = await start_stub(stub)
+    client = WeatherClient(base_url=base_url, timeout=options.get("timeout", 5.0))
+    await client.connect()
+    try:
+        yield stub, client
+    finally:
+        await client.disconnect()
+        await runner.cleanup()
+
+
+@pytest.mark.parametrize("stub_client", [{"latency_ms": 100}], indirect=True)
+async def test_concurrent_lookups_share_one_request(stub_client):
+    stub, client = stub_client
+    # Все координаты попадают в одну ячейку сетки 0.25°
+    coordinates = [(55.75 + i * 0.001, 37.62 - i * 0.001) for i in range(20)]
+
+    results = await asyncio.gather(
+        *(client.get_daily(latitude, longitude, DAY) for latitude, longitude in coordinates)
+    )
+
+    assert sum(stub.calls.values()) == 1
+    assert all(result is not None for result in results)
+    assert len({result.pressure_hpa for result in results}) == 1
+
+
+async def test_repeated_lookup_hits_cache(stub_client):
+    stub, client = stub_client
+
+    first = await client.get_daily(55.75, 37.62, DAY)
+    second = await client.get_daily(55.76, 37.61, DAY)
+
+    assert first is not None
+    assert second == first
+    assert sum(stub.calls.values()) == 1
+
+
+@pytest.mark.parametrize(
+    "stub_client",
+    [{"error_rate": 1.0}, {"latency_ms": 500, "timeout": 0.1}],
+    indirect=True,
+    ids=["error", "timeout"],
+)
+async def test_upstream_failure_returns_none(stub_client):
+    stub, client = stub_client
+
+    assert await client.get_daily(55.75, 37.62, DAY) is None
+    # Неудача не кэшируется: следующий запрос снова идет наверх
+    assert await client.get_daily(55.75, 37.62, DAY) is None
+    assert sum(stub.calls.values()) == 2
+
+
+async def test_attach_weather_bumps_data_version(stub_client, monkeypatch):
+    _, client = stub_client
+    saved: list[tuple[int, float | None, float | None]] = []
+
+    class FakeSession:
+        async def commit(self) -> None:
+            pass
+
+    async def fake_get_session():
+        yield FakeSession()
+
+    class FakeRepository:
+        def __init__(self, session) -> None:
+            pass
+
+        async def set_weather(self, entry_id, pressure_hpa, temperature_c) -> None:
+            saved.append((entry_id, pressure_hpa, temperature_c))
+
+    async def fake_record(event) -> None:
+        pass
+
+    monkeypatch.setattr(weather_service, "weather_client", client)
+    monkeypatch.setattr(weather_service, "get_session", fake_get_session)
+    monkeypatch.setattr(weather_service, "EntryRepository", FakeRepository)
+    monkeypatch.setattr(weather_service.change_log, "record", fake_record)
+    version = data_versions.get(42)
+
+    await weather_service.attach_weather(42, 7, 55.75, 37.62, DAY)
+
+    assert [entry_id for entry_id, _, _ in saved] == [7]
+    assert data_versions.get(42) == version + 1